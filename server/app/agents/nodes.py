@@ -9,6 +9,7 @@ from app.agents.state import AgentState
 from app.core.retriever import hybrid_search
 from app.core.reranker import get_reranked_scores
 from app.core.monitor import monitor
+from app.core.exhibits import render_all, scores_of
 from app.engine import SkillLoader, PromptRenderer, SkillExecutor, registry as schema_registry
 
 logger = logging.getLogger(__name__)
@@ -19,6 +20,29 @@ _skill_loader = SkillLoader()
 _skill_renderer = PromptRenderer(_skill_loader)
 executor = SkillExecutor(loader=_skill_loader, renderer=_skill_renderer, schema_registry=schema_registry)
 
+# Headroom for the skill's prompt template around the rendered variables.
+TEMPLATE_RESERVE_TOKENS = 1024
+
+
+def _pack_evidence(skill, documents, *prompt_parts: str) -> str:
+    """Packs ranked evidence into what is left of ``skill.model``'s window.
+
+    The budget subtracts the completion (``max_tokens``), the other prompt
+    variables and a template reserve. Exhibits are rendered into citation
+    envelopes here; reranker scores drive admission when every item has one,
+    otherwise reranker order stands in for the score.
+    """
+    prompt_tokens = TEMPLATE_RESERVE_TOKENS + sum(monitor.count_tokens(part) for part in prompt_parts)
+    packed = monitor.pack_context(
+        render_all(documents), skill.model, prompt_tokens=prompt_tokens, scores=scores_of(documents),
+    )
+    if packed.dropped:
+        logger.info(
+            "%s: dropped %d/%d evidence chunks over a %d-token budget (ranks %s)",
+            skill.name, len(packed.dropped), len(documents), packed.budget, packed.dropped,
+        )
+    return packed.text
+
 
 async def retrieve_node(state: AgentState):
     """Librarian — hybrid search + reranking. Config loaded from ``agents/librarian/SKILL.md``.
@@ -92,7 +116,7 @@ async def distill_node(state: AgentState):
     skill = executor.get_skill("editor")
     empty_response = skill.config.get("empty_context_response", "NO RELEVANT EVIDENCE")
 
-    context_text = monitor.guard_context(state["documents"])
+    context_text = _pack_evidence(skill, state["documents"], state["question"])
     if not context_text.strip():
         return {"generation": empty_response, "status": "thinking", "active_node": "Editor"}
 
@@ -112,7 +136,6 @@ async def distill_node(state: AgentState):
         }
     except Exception as e:
         logger.warning("Editor fail-safe triggered: %s", e)
-        context_text = monitor.guard_context(state["documents"])
         fallback = executor.apply_fail_safe(context_text, "editor")
         return {"generation": fallback, "status": "thinking", "active_node": "Editor"}
 
@@ -120,7 +143,7 @@ async def distill_node(state: AgentState):
 async def strategist_node(state: AgentState):
     """Strategist — comparative cross-document analysis. Config from ``agents/strategist/SKILL.md``."""
     skill = executor.get_skill("strategist")
-    context_text = monitor.guard_context(state["documents"])
+    context_text = _pack_evidence(skill, state["documents"], state["question"])
     result = await executor.execute_llm(
         skill_name="strategist",
         variables={"question": state["question"], "context": context_text},
@@ -184,8 +207,7 @@ async def grade_generation_node(state: AgentState):
     intensify = command is not None and intensify_flag in command
     threshold = thresholds["intensify"] if intensify else thresholds["default"]
 
-    context_list = state["documents"]
-    context_str = "\n\n".join(context_list)
+    context_str = _pack_evidence(skill, state["documents"], generation)
 
     try:
         result = await executor.execute_llm(
@@ -1,5 +1,6 @@
 from typing import TypedDict, List, Dict, Any, Optional
 from typing_extensions import NotRequired
+from app.core.exhibits import Evidence
 
 class AgentState(TypedDict):
     """
@@ -22,7 +23,9 @@ class AgentState(TypedDict):
     # --- Working Memory ---
     # comparison_map: Intermediate JSON extraction for multi-doc audits
     comparison_map: Dict[str, Any]
-    documents: List[str]
+    # documents: retrieved Exhibits (or pre-rendered exhibit strings from skills),
+    # rendered into citation envelopes only when a prompt is built
+    documents: List[Evidence]
     
     # --- Output State ---
     generation: str
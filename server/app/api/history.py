@@ -1,8 +1,7 @@
-import asyncio
 from fastapi import APIRouter, Depends, HTTPException, Query, Path
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, cast, Optional
-from app.core.database import db
+from typing import List, Dict, Optional
+from app.core.repository import repo
 from app.core.auth import get_current_user
 
 router = APIRouter()
@@ -32,21 +31,12 @@ async def get_user_documents(
     SOTA Document Fetcher:
     Retrieves the latest documents asynchronously.
     """
-    if not db:
+    if not repo:
         raise HTTPException(status_code=503, detail="Vault DB Offline")
 
     try:
-        # Non-blocking Database Call
-        res = await asyncio.to_thread(
-            lambda: db.table("documents")
-            .select("filename, status, created_at")
-            .eq("user_id", user_id)
-            .order("created_at", desc=True)
-            .limit(limit)
-            .execute()
-        )
-        
-        return cast(List[Dict[str, Any]], res.data)
+        # Non-blocking Database Call (awaited on the shared HTTP/2 pool)
+        return await repo.list_documents(user_id, limit)
     except Exception as e:
         print(f"❌ DOCUMENT FETCH ERROR: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve vault ledger")
@@ -62,35 +52,21 @@ async def get_document_chat_history(
 ):
     """
     V4.6 SOTA History Hydrator:
-    Fetches the latest conversation efficiently, offloaded to a background thread.
+    Fetches the latest conversation efficiently over the async vault repository.
     """
-    if not db:
+    if not repo:
         raise HTTPException(status_code=503, detail="Vault DB Offline")
 
     try:
         # 1. Non-blocking Document ID Fetch
-        doc_res = await asyncio.to_thread(
-            lambda: db.table("documents").select("id").eq("filename", filename).eq("user_id", user_id).execute()
-        )
-        doc_data = cast(List[Dict[str, Any]], doc_res.data)
+        doc_id = await repo.document_id(user_id, filename)
         
-        if not doc_data:
+        if not doc_id:
             return [] # Cleanly return empty history if document doesn't exist
 
-        doc_id = doc_data[0]['id']
-
         # 2. Non-blocking Messages Fetch (Smart Chronology)
-        # We fetch the LATEST 'limit' messages first (desc=True)
-        msg_res = await asyncio.to_thread(
-            lambda: db.table("chat_messages")
-            .select("id, role, content, metrics, created_at")
-            .eq("document_id", doc_id)
-            .order("created_at", desc=True) # Get newest first
-            .limit(limit)
-            .execute()
-        )
-        
-        messages = cast(List[Dict[str, Any]], msg_res.data)
+        # We fetch the LATEST 'limit' messages first (newest first)
+        messages = await repo.recent_messages(doc_id, limit, columns="id, role, content, metrics, created_at")
         
         # 3. Reverse the array in Python so the UI displays Oldest -> Newest
         return messages[::-1]
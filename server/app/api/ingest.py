@@ -1,119 +1,177 @@
 import os
 import uuid
+import hashlib
 import math
+import time
 import asyncio
-from typing import Optional, List, Any, Dict, cast
-from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, Depends, Path
+from dataclasses import asdict
+from typing import Optional, Any, Dict, Tuple, AsyncIterator
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Path
 from pydantic import BaseModel
 
-from app.core.database import db
-from app.core.chunking import chunker
-from app.core.embeddings import get_embedding
+from app.core.repository import repo
+from app.core.ingestion import (
+    StreamingIngestor, IngestStats, Section, ProgressCallback,
+    delete_document_chunks, delete_chunks, fetch_chunk_fingerprints, update_chunk_metadata
+)
+from app.core.jobs import QUEUED, RUNNING, get_job_queue
+from app.core.conversion import conversion_pool
 from app.core.auth import get_current_user
 
-# Lazy Initialization for Docling
-_converter = None
-
-def get_converter():
-    global _converter
-    if _converter is None:
-        print("AXIOM-CORE: Waking up Docling V2 Intelligence...")
-        from docling.document_converter import DocumentConverter # type: ignore
-        _converter = DocumentConverter()
-    return _converter
+async def docling_sections(file_path: str) -> AsyncIterator[Section]:
+    """
+    Converts the PDF in the pre-warmed Docling process pool and yields its
+    markdown page by page, each page range as soon as it is parsed.
+    """
+    async for page_no, markdown in conversion_pool.convert(file_path):
+        yield page_no, markdown
 
 router = APIRouter()
 TEMP_DIR = "/tmp/axiom_ingest"
 
-# --- HELPER: CONCURRENT VECTORIZATION ---
-async def fetch_embedding_concurrently(chunk_text: str, semaphore: asyncio.Semaphore) -> List[float]:
-    """Bounds concurrent requests to NVIDIA to prevent 429 Rate Limits."""
-    async with semaphore:
-        return await asyncio.to_thread(get_embedding, chunk_text, input_type="document")
+# --- THE SOTA INGESTION ENGINE (run by app.worker) ---
+class DocumentBusy(Exception):
+    """Another upload of this filename is still being ingested."""
+
+async def register_document(filename: str, user_id: str, file_hash: Optional[str] = None, status: str = "processing") -> Optional[int]:
+    """
+    Writes the "processing" row up front so the UI never polls into a 404.
+    A re-upload under the same filename reuses the existing document so its
+    chunks can be diffed instead of re-embedded. Raises DocumentBusy while an
+    earlier run still owns the row: two runs on one document would diff
+    against, and roll back, each other's chunks.
+    """
+    if not repo: return None
+    fields: Dict[str, Any] = {"status": status}
+    if file_hash: fields["file_hash"] = file_hash
+    document_id = await repo.document_id(user_id, filename)
+    if document_id:
+        if not await repo.acquire_document(document_id, fields):
+            job = await get_job_queue().latest(user_id, filename)
+            if job and job.status in (QUEUED, RUNNING):
+                raise DocumentBusy(filename)
+            # "processing" with no live job: an ingest that died before its job was queued
+            await repo.update_document(document_id, fields)
+        return document_id
+    return await repo.insert_document({"filename": filename, "user_id": user_id, "is_permanent": False, **fields})
+
+async def find_indexed_duplicate(user_id: str, file_hash: str, filename: str) -> Optional[Dict[str, Any]]:
+    """An already-indexed document of this user with identical bytes, preferring the same filename."""
+    if not repo: return None
+    matches = await repo.indexed_documents_with_hash(user_id, file_hash)
+    return next((m for m in matches if m["filename"] == filename), matches[0] if matches else None)
+
+async def clone_document(source_id: int, filename: str, user_id: str, file_hash: str) -> Optional[int]:
+    """Indexes identical bytes under a new filename by copying chunk rows (vectors included) in SQL."""
+    if not repo: return None
+    document_id = await register_document(filename, user_id, file_hash)
+    if not document_id: return None
+    cloned = await repo.clone_document_chunks(source_id, document_id)
+    source = await repo.document_counts(source_id) or {}
+    await repo.update_document(document_id, {
+        "status": "indexed", "chunk_count": cloned,
+        "token_count": source.get("token_count"), "page_count": source.get("page_count"),
+    })
+    return document_id
+
+async def mark_document_error(document_id: Optional[int], filename: str, user_id: str) -> None:
+    if not repo: return
+    if document_id:
+        await repo.update_document(document_id, {"status": "error"})
+    else:
+        await repo.update_documents_named(user_id, filename, {"status": "error"})
+
+async def process_document(
+    file_path: str,
+    filename: str,
+    user_id: str,
+    document_id: Optional[int] = None,
+    on_progress: Optional[ProgressCallback] = None,
+) -> IngestStats:
+    """
+    Parses, chunks, embeds and indexes one PDF, then flips the document to "indexed".
+    Raises on failure after rolling back streamed chunks; the job worker owns
+    retries, the terminal "error" status and temp-file cleanup.
+    """
+    print(f"AXIOM-CORE: Parsing {filename} (Async Mode)")
+
+    # 1. Registration (normally done by /upload; kept for direct callers)
+    if not document_id:
+        document_id = await register_document(filename, user_id)
+    if not document_id: raise RuntimeError("DB Insert Failed")
+
+    # Chunks of the previous revision; anything newer than the watermark belongs to this run
+    existing = await fetch_chunk_fingerprints(document_id)
+    watermark = max((row["id"] for row in existing), default=0)
 
-# --- THE SOTA BACKGROUND ENGINE ---
-async def process_document(file_path: str, filename: str, user_id: str) -> None:
     try:
-        print(f"AXIOM-CORE: Parsing {filename} (Async Mode)")
-        
-        # FIX: 1. IMMEDIATE DB REGISTRATION
-        # This writes "processing" to Supabase instantly so the UI doesn't 404
-        document_id: Optional[int] = None
-        if db:
-            doc_res = await asyncio.to_thread(
-                lambda: db.table("documents").insert({
-                    "filename": filename, "user_id": user_id, "status": "processing", "is_permanent": False 
-                }).execute()
-            )
-            data = cast(List[Dict[str, Any]], doc_res.data)
-            if data: document_id = data[0].get('id')
-
-        if not document_id: raise RuntimeError("DB Insert Failed")
-
-        # 2. CPU-Bound Task Offloading (Docling Neural Network)
-        # Now the UI has the processing signal while this heavy task runs!
-        converter = get_converter()
-        conv_result = await asyncio.to_thread(converter.convert, file_path)
-        markdown_content = conv_result.document.export_to_markdown()
-
-        # 3. Chunking
-        chunks = chunker.split_text(markdown_content)
-        print(f"AXIOM-CORE: Vectorizing {len(chunks)} chunks concurrently...")
-
-        # 4. SOTA: Concurrent Batch Vectorization (Massive Speedup)
-        # Limit to 5 parallel connections to respect NVIDIA NIM rate limits
-        semaphore = asyncio.Semaphore(5) 
-        tasks =[fetch_embedding_concurrently(chunk, semaphore) for chunk in chunks]
-        vectors = await asyncio.gather(*tasks)
-
-        # 5. Assemble Payload
-        data_payload: List[Dict[str, Any]] =[]
-        for i, (chunk_text, vector) in enumerate(zip(chunks, vectors)):
-            data_payload.append({
-                "document_id": document_id, "user_id": user_id, "content": chunk_text,
-                "embedding": vector, "metadata": {"index": i, "source": filename, "engine": "docling-v2-nim"}
-            })
+        # 2. Streaming Pipeline: parse → chunk → (diff) → embed → insert with bounded queues
+        if on_progress: await on_progress("converting", {})
+        ingestor = StreamingIngestor(
+            document_id=document_id, user_id=user_id, filename=filename,
+            on_progress=on_progress, existing=existing
+        )
+        stats = await ingestor.run(docling_sections(file_path))
+        print(f"AXIOM-CORE: Streamed {stats.chunks} chunks from {stats.sections} sections ({stats.reused} reused).")
 
-        # 6. Non-Blocking Batch DB Insertion (Mypy-Safe)
-        if db:
-            # Strictly typed helper function to satisfy Mypy
-            def insert_batch(batch_data: List[Dict[str, Any]]) -> None:
-                db.table("document_chunks").insert(cast(Any, batch_data)).execute()
-
-            BATCH_SIZE = 50
-            for j in range(0, len(data_payload), BATCH_SIZE):
-                batch = data_payload[j : j + BATCH_SIZE]
-                # Pass the function and its arguments natively to to_thread
-                await asyncio.to_thread(insert_batch, batch)
-            
-            # Helper for the status update to avoid another lambda
-            def update_status() -> None:
-                db.table("documents").update({"status": "indexed"}).eq("id", document_id).execute()
-                
-            await asyncio.to_thread(update_status)
-
-        print(f"COMPLETE: {filename} indexed successfully.")
-        
+        # 3. Reconcile with the previous revision
+        await update_chunk_metadata(ingestor.metadata_updates)
+        await delete_chunks(ingestor.vanished_ids)
+
+        # 4. Status Flip (sizes land on the document row so /metadata never counts chunks)
+        if on_progress: await on_progress("finalizing", asdict(stats))
+        if repo:
+            await repo.update_document(document_id, {
+                "status": "indexed", "chunk_count": stats.chunks,
+                "token_count": stats.tokens, "page_count": stats.pages,
+            })
     except Exception as e:
         print(f"❌ INGESTION FAILED: {str(e)}")
-        if db: 
-            await asyncio.to_thread(
-                lambda: db.table("documents").update({"status": "error"}).eq("filename", filename).execute()
-            )
-    finally:
-        if os.path.exists(file_path): os.remove(file_path)
+        # Streamed chunks are already live; drop this run's rows (the previous revision stays) before any retry
+        await delete_document_chunks(document_id, watermark)
+        raise
+
+    print(f"COMPLETE: {filename} indexed successfully.")
+    return stats
 
 # --- ROUTES ---
 
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(256 * 1024 * 1024)))
+
+async def spool_upload(file: UploadFile, file_path: str, max_bytes: int) -> str:
+    """
+    Streams the upload to disk in fixed-size chunks, hashing in the same pass,
+    so memory stays O(chunk) regardless of PDF size. Returns the sha256 hex.
+    Raises 413 (and removes the partial file) once max_bytes is exceeded.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    f = await asyncio.to_thread(open, file_path, "wb")
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(status_code=413, detail=f"Protocol Violation: Document exceeds {max_bytes // (1024 * 1024)} MB.")
+            digest.update(chunk)
+            await asyncio.to_thread(f.write, chunk)
+    except BaseException:
+        f.close()
+        os.remove(file_path)
+        raise
+    f.close()
+    return digest.hexdigest()
+
 @router.post("/upload")
 async def ingest_document(
-    background_tasks: BackgroundTasks, 
     file: UploadFile = File(...),
     user_id: str = Depends(get_current_user)
 ):
     """File Upload Handler with Path Traversal Protection"""
     if not file.filename or not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Protocol Violation: PDF Document Required.")
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Protocol Violation: Document exceeds {MAX_UPLOAD_BYTES // (1024 * 1024)} MB.")
 
     try:
         os.makedirs(TEMP_DIR, exist_ok=True)
@@ -121,53 +179,66 @@ async def ingest_document(
         safe_filename = os.path.basename(file.filename)
         file_path = f"{TEMP_DIR}/{uuid.uuid4()}_{safe_filename}"
         
-        # Async file read/write
-        content = await file.read()
-        await asyncio.to_thread(lambda: open(file_path, "wb").write(content))
+        # Chunked async spool to disk (size limit + content hash in the same pass)
+        file_hash = await spool_upload(file, file_path, MAX_UPLOAD_BYTES)
         
-        # FastAPI Native Async Background Task
-        background_tasks.add_task(process_document, file_path, safe_filename, user_id)
+        try:
+            # Dedup: identical bytes already indexed for this user cost no Docling or NIM work
+            duplicate = await find_indexed_duplicate(user_id, file_hash, safe_filename)
+            if duplicate:
+                os.remove(file_path)
+                if duplicate["filename"] != safe_filename:
+                    await clone_document(duplicate["id"], safe_filename, user_id, file_hash)
+                print(f"AXIOM-CORE: {safe_filename} deduplicated against {duplicate['filename']}.")
+                return {"status": "indexed", "filename": safe_filename, "deduplicated": True}
+
+            # Durable hand-off: the worker pool claims the job, survives API restarts and retries failures
+            document_id = await register_document(safe_filename, user_id, file_hash)
+        except DocumentBusy:
+            if os.path.exists(file_path): os.remove(file_path)
+            raise HTTPException(status_code=409, detail=f"{safe_filename} is still being ingested. Retry once it is indexed.")
+        job = await get_job_queue().enqueue(user_id, safe_filename, file_path, document_id)
         
-        return {"status": "queued", "filename": safe_filename}
+        return {"status": "queued", "filename": safe_filename, "job_id": job.id}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/status/{filename}")
 async def get_ingestion_status(filename: str = Path(...), user_id: str = Depends(get_current_user)):
-    if not db: return {"status": "error", "message": "DB Offline"}
-    res = await asyncio.to_thread(
-        lambda: db.table("documents").select("status").eq("filename", filename).eq("user_id", user_id).order("created_at", desc=True).limit(1).execute()
-    )
-    data = cast(List[Dict[str, Any]], res.data)
-    return {"status": data[0].get('status', 'unknown')} if data else {"status": "not_found"}
+    """Document status ("processing" | "indexed" | "error") plus the ingest job's stage and progress."""
+    job = await get_job_queue().latest(user_id, filename)
+    job_view = job.public_view() if job else {}
+    if not repo: return {"status": "error", "message": "DB Offline", **job_view}
+    doc = await repo.latest_document(user_id, filename, columns="status")
+    return {"status": doc.get('status', 'unknown'), **job_view} if doc else {"status": "not_found"}
 
 @router.get("/latest")
 async def get_latest_document(user_id: str = Depends(get_current_user)):
-    if not db: return {"status": "error"}
-    res = await asyncio.to_thread(
-        lambda: db.table("documents").select("filename, status").eq("user_id", user_id).order("created_at", desc=True).limit(1).execute()
-    )
-    data = cast(List[Dict[str, Any]], res.data)
-    return {"status": "success", "filename": data[0].get("filename"), "doc_status": data[0].get("status")} if data else {"status": "none"}
+    if not repo: return {"status": "error"}
+    doc = await repo.latest_document(user_id, columns="filename, status")
+    return {"status": "success", "filename": doc.get("filename"), "doc_status": doc.get("status")} if doc else {"status": "none"}
 
 @router.get("/metadata/{filename}")
 async def get_document_metadata(filename: str = Path(...), user_id: str = Depends(get_current_user)):
-    if not db: return {"status": "error"}
-    res = await asyncio.to_thread(
-        lambda: db.table("documents").select("*").eq("filename", filename).eq("user_id", user_id).order("created_at", desc=True).limit(1).execute()
-    )
-    data_list = cast(List[Dict[str, Any]], res.data)
-    if not data_list: return {"status": "not_found"}
-    doc_data = data_list[0]
-    
-    chunks = await asyncio.to_thread(
-        lambda: db.table("document_chunks").select("id", count=cast(Any, "exact")).eq("document_id", doc_data['id']).execute()
+    if not repo: return {"status": "error"}
+    doc_data = await repo.latest_document(
+        user_id, filename, columns="id, status, created_at, is_permanent, chunk_count, token_count, page_count"
     )
+    if not doc_data: return {"status": "not_found"}
+
+    chunk_count = doc_data.get('chunk_count')
+    if chunk_count is None:
+        # NULL until the first ingestion of this document completes; only then is an exact count needed
+        chunk_count = await repo.count_chunks(document_id=doc_data['id'])
     return {
         "filename": filename,
         "status": doc_data.get('status'),
         "created_at": doc_data.get('created_at'),
-        "chunk_count": chunks.count if chunks.count else 0,
+        "chunk_count": chunk_count,
+        "token_count": doc_data.get('token_count'),
+        "page_count": doc_data.get('page_count'),
         "is_permanent": doc_data.get('is_permanent', False)
     }
 
@@ -176,19 +247,15 @@ class SaveRequest(BaseModel):
 
 @router.post("/save")
 async def save_document_to_vault(req: SaveRequest, user_id: str = Depends(get_current_user)):
-    if db:
-        await asyncio.to_thread(
-            lambda: db.table("documents").update({"is_permanent": True}).eq("filename", req.filename).eq("user_id", user_id).execute()
-        )
+    if repo:
+        await repo.update_documents_named(user_id, req.filename, {"is_permanent": True})
         return {"status": "persisted"}
     return {"status": "error"}
 
 @router.delete("/documents/{filename}")
 async def delete_document(filename: str = Path(...), user_id: str = Depends(get_current_user)):
-    if not db: raise HTTPException(status_code=500, detail="Vault DB Offline")
-    await asyncio.to_thread(
-        lambda: db.table("documents").delete().eq("filename", filename).eq("user_id", user_id).execute()
-    )
+    if not repo: raise HTTPException(status_code=500, detail="Vault DB Offline")
+    await repo.delete_documents_named(user_id, filename)
     return {"status": "purged", "filename": filename}
 
 def sanitize_float(val: Any) -> float:
@@ -198,45 +265,42 @@ def sanitize_float(val: Any) -> float:
     except (TypeError, ValueError):
         return 0.0
 
+# Dashboard polls hit a per-process snapshot; the counters themselves are trigger-maintained
+TELEMETRY_TTL_SECONDS = float(os.getenv("TELEMETRY_CACHE_TTL_SECONDS", "5"))
+_telemetry_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
 @router.get("/telemetry")
 async def get_system_telemetry(user_id: str = Depends(get_current_user)):
-    """Async offloaded telemetry aggregation."""
-    if not db: return {"chunks": "--", "persistence": "--", "blocked": "--", "latency": "--"}
-    
+    """Single-row read of the user's materialized telemetry (migrations 008, 011), TTL-cached."""
+    if not repo: return {"chunks": "--", "persistence": "--", "blocked": "--", "latency": "--"}
+
+    cached = _telemetry_cache.get(user_id)
+    if cached is not None and time.monotonic() - cached[0] < TELEMETRY_TTL_SECONDS:
+        return cached[1]
+
     try:
-        docs_res = await asyncio.to_thread(lambda: db.table("documents").select("id, is_permanent").eq("user_id", user_id).execute())
-        docs = cast(List[Dict[str, Any]], docs_res.data)
-        
-        total_docs = len(docs)
-        persisted_docs = sum(1 for d in docs if d.get("is_permanent", False))
+        row = await repo.user_telemetry(user_id) or {}
+
+        total_docs = int(row.get("documents") or 0)
+        persisted_docs = int(row.get("permanent_documents") or 0)
         persistence_rate = f"{int((persisted_docs / total_docs) * 100)}%" if total_docs > 0 else "0%"
-        
-        chunks_res = await asyncio.to_thread(lambda: db.table("document_chunks").select("id", count=cast(Any, "exact")).eq("user_id", user_id).execute())
-        total_chunks = chunks_res.count if chunks_res.count else 0
-        
-        logs_res = await asyncio.to_thread(lambda: db.table("audit_logs").select("faithfulness, precision, relevance, latency").eq("user_id", user_id).order("created_at", desc=True).limit(50).execute())
-        logs = cast(List[Dict[str, Any]], logs_res.data)
-        
-        avg_faith, avg_prec, avg_rel, avg_latency, blocked = 0.0, 0.0, 0.0, 0.0, 0
-        
-        if logs:
-            total_logs = len(logs)
-            avg_faith = sum(sanitize_float(l.get("faithfulness", 0.0)) for l in logs) / total_logs
-            avg_prec = sum(sanitize_float(l.get("precision", 0.0)) for l in logs) / total_logs
-            avg_rel = sum(sanitize_float(l.get("relevance", 0.0)) for l in logs) / total_logs
-            blocked = sum(1 for l in logs if sanitize_float(l.get("faithfulness", 0.0)) < 0.8)
-            
-            valid_latencies =[sanitize_float(l.get("latency", 0.0)) for l in logs if sanitize_float(l.get("latency", 0.0)) > 0]
-            if valid_latencies:
-                avg_latency = sum(valid_latencies) / len(valid_latencies)
-            
-        return {
-            "chunks": str(total_chunks),
+
+        telemetry = {
+            "chunks": str(int(row.get("chunks") or 0)),
             "persistence": persistence_rate,
-            "blocked": str(blocked),
-            "latency": f"{sanitize_float(avg_latency):.1f}s",
-            "ragas": {"faithfulness": sanitize_float(avg_faith), "precision": sanitize_float(avg_prec), "relevance": sanitize_float(avg_rel)}
+            "blocked": str(int(row.get("blocked") or 0)),
+            "latency": f"{sanitize_float(row.get('latency')):.1f}s",
+            "ragas": {
+                "faithfulness": sanitize_float(row.get("faithfulness")),
+                "precision": sanitize_float(row.get("precision")),
+                "relevance": sanitize_float(row.get("relevance")),
+            },
         }
     except Exception as e:
         print(f"❌ TELEMETRY ERROR: {e}")
         return {"chunks": "--", "persistence": "--", "blocked": "--", "latency": "--"}
+
+    if len(_telemetry_cache) >= 4096:
+        _telemetry_cache.clear()
+    _telemetry_cache[user_id] = (time.monotonic(), telemetry)
+    return telemetry
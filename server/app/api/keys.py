@@ -1,11 +1,9 @@
 import secrets
 import hashlib
-import asyncio
 from fastapi import APIRouter, Depends, HTTPException, Path
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, cast
 from app.core.auth import get_current_user
-from app.core.database import db
+from app.core.repository import repo
 
 router = APIRouter()
 
@@ -30,19 +28,12 @@ def generate_secure_key():
 @router.post("/")
 async def create_api_key(req: CreateKeyRequest, user_id: str = Depends(get_current_user)):
     """Generates a new API key. The raw key is returned ONLY ONCE."""
-    if not db: raise HTTPException(503, "DB Offline")
+    if not repo: raise HTTPException(503, "DB Offline")
     
     full_key, key_hash, key_hint = generate_secure_key()
     
     # Non-blocking DB Insert
-    await asyncio.to_thread(
-        lambda: db.table("api_keys").insert({
-            "user_id": user_id,
-            "name": req.name,
-            "key_value": key_hash, 
-            "key_hint": key_hint   
-        }).execute()
-    )
+    await repo.create_api_key(user_id, req.name, key_hash, key_hint)
     
     return {
         "status": "success", 
@@ -54,17 +45,9 @@ async def create_api_key(req: CreateKeyRequest, user_id: str = Depends(get_curre
 @router.get("/")
 async def list_api_keys(user_id: str = Depends(get_current_user)):
     """Lists all active API keys using their secure hints asynchronously."""
-    if not db: raise HTTPException(503, "DB Offline")
+    if not repo: raise HTTPException(503, "DB Offline")
     
-    res = await asyncio.to_thread(
-        lambda: db.table("api_keys")
-        .select("id, name, created_at, last_used_at, is_active, key_hint")
-        .eq("user_id", user_id)
-        .order("created_at", desc=True)
-        .execute()
-    )
-    
-    return {"keys": cast(List[Dict[str, Any]], res.data)}
+    return {"keys": await repo.list_api_keys(user_id)}
 
 @router.delete("/{key_id}")
 async def revoke_api_key(
@@ -72,13 +55,7 @@ async def revoke_api_key(
     user_id: str = Depends(get_current_user)
 ):
     """Instantly revokes an API key (Sets is_active to False) without freezing the UI."""
-    if not db: raise HTTPException(503, "DB Offline")
+    if not repo: raise HTTPException(503, "DB Offline")
     
-    await asyncio.to_thread(
-        lambda: db.table("api_keys")
-        .update({"is_active": False})
-        .eq("id", key_id)
-        .eq("user_id", user_id)
-        .execute()
-    )
+    await repo.revoke_api_key(user_id, key_id)
     return {"status": "revoked", "id": key_id}
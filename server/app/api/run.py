@@ -1,15 +1,17 @@
 import time
 import math
 import json
-import asyncio
+from datetime import datetime, timezone
 from fastapi import APIRouter, HTTPException, Depends, Request
 from sse_starlette.sse import EventSourceResponse
 from pydantic import BaseModel
 from app.agents.graph import app_graph
 from app.agents.state import AgentState
 from app.core.auth import get_current_user
-from app.core.database import db
-from typing import Dict, Any, cast, List, AsyncGenerator
+from app.core.repository import repo
+from app.core.write_behind import write_behind
+from app.core.background import spawn
+from typing import Dict, Any, Optional, Tuple, cast, List, AsyncGenerator
 
 router = APIRouter()
 
@@ -31,12 +33,45 @@ def sanitize_float(val: Any) -> float:
     except (TypeError, ValueError):
         return 0.0
 
-# --- 2. STREAMING ENDPOINT ---
+# --- 2. CONVERSATION MEMORY (async, off the token path) ---
+async def load_memory(user_id: str, filename: str, with_history: bool) -> Tuple[Optional[int], List[Dict[str, str]]]:
+    """Document id + last 5 turns (oldest first). Never raises: memory is optional."""
+    if not repo: return None, []
+    try:
+        doc_id = await repo.document_id(user_id, filename)
+        if not doc_id or not with_history:
+            return doc_id, []
+        raw_hist = await repo.recent_messages(doc_id, 5, user_id=user_id)
+        return doc_id, cast(List[Dict[str, str]], raw_hist[::-1])
+    except Exception as e:
+        print(f"AXM-MEM: History hydration failed: {e}")
+        return None, []
+
+def persist_turn(
+    doc_id: int, user_id: str, question: str, answer: str, metrics: Dict[str, float],
+    latency: float, asked_at: datetime, answered_at: datetime
+) -> None:
+    """
+    Queues the finished turn on the write-behind buffer (coalesced into bulk
+    INSERTs across requests). Timestamps are stamped here, so rows keep their
+    real chronology however late the flush lands.
+    """
+    write_behind.add("chat_messages", {"document_id": doc_id, "user_id": user_id, "role": "user", "content": question, "metrics": None, "created_at": asked_at.isoformat()})
+    write_behind.add("chat_messages", {"document_id": doc_id, "user_id": user_id, "role": "assistant", "content": answer, "metrics": metrics, "created_at": answered_at.isoformat()})
+    write_behind.add("audit_logs", {"user_id": user_id, "question": question, "faithfulness": metrics.get("faithfulness", 0.0), "latency": latency, "created_at": answered_at.isoformat()})
+
+# --- 3. STREAMING ENDPOINT ---
 @router.post("/verify")
 async def run_verification(
     payload: VerificationRequest,
     user_id: str = Depends(get_current_user)
 ):
+    # Prefetch memory now, so the lookups overlap the SSE handshake instead of following it.
+    # Tracked (and drained at shutdown) even if the client leaves before the stream starts.
+    primary_file = payload.filenames[0] if payload.filenames else "vault"
+    is_root_reset = payload.question.strip().startswith("/axm ..")
+    memory = spawn(load_memory(user_id, primary_file, with_history=not is_root_reset))
+
     async def event_generator() -> AsyncGenerator[Dict[str, Any], None]:
         try:
             # FIX 1: Nginx/Vercel Buffer Flush
@@ -48,25 +83,10 @@ async def run_verification(
             }
 
             start_time = time.time()
+            asked_at = datetime.now(timezone.utc)
             print(f"--- STREAM STARTED FOR: {payload.question[:30]}... ---")
 
-            history_buffer: List[Dict[str, str]] =[]
-            is_root_reset = payload.question.strip().startswith("/axm ..")
-
-            if db and not is_root_reset:
-                try:
-                    primary_file = payload.filenames[0] if payload.filenames else "vault"
-                    doc_res = db.table("documents").select("id").eq("filename", primary_file).eq("user_id", user_id).execute()
-                    
-                    doc_rows = cast(List[Dict[str, Any]], doc_res.data)
-                    if doc_rows:
-                        doc_id = doc_rows[0]['id']
-                        hist_res = db.table("chat_messages").select("role, content").eq("document_id", doc_id).eq("user_id", user_id).order("created_at", desc=True).limit(5).execute()
-                        
-                        raw_hist = cast(List[Dict[str, str]], hist_res.data)
-                        history_buffer = raw_hist[::-1]
-                except Exception as e:
-                    print(f"AXM-MEM: History hydration failed: {e}")
+            doc_id, history_buffer = await memory
 
             initial_state: AgentState = {
                 "question": payload.question, 
@@ -138,19 +158,9 @@ async def run_verification(
             actual_latency = round(time.time() - start_time, 2)
             safe_metrics = {k: sanitize_float(v) for k, v in final_metrics.items()}
 
-            if db:
-                try:
-                    primary_file = payload.filenames[0] if payload.filenames else "vault"
-                    doc_res = db.table("documents").select("id").eq("filename", primary_file).eq("user_id", user_id).execute()
-                    doc_data = cast(List[Dict[str, Any]], doc_res.data)
-                    
-                    if doc_data:
-                        doc_id = doc_data[0]['id']
-                        db.table("chat_messages").insert({"document_id": doc_id, "user_id": user_id, "role": "user", "content": payload.question}).execute()
-                        db.table("chat_messages").insert({"document_id": doc_id, "user_id": user_id, "role": "assistant", "content": full_generation, "metrics": safe_metrics}).execute()
-                        db.table("audit_logs").insert({"user_id": user_id, "question": payload.question, "faithfulness": safe_metrics.get("faithfulness", 0.0), "latency": actual_latency}).execute()
-                except Exception as log_err:
-                    print(f"SSE DB ERROR: {log_err}")
+            # Write-behind: persistence never delays audit_complete or other users' streams
+            if repo and doc_id:
+                persist_turn(doc_id, user_id, payload.question, full_generation, safe_metrics, actual_latency, asked_at, datetime.now(timezone.utc))
 
             yield {
                 "event": "audit_complete",
@@ -161,6 +171,9 @@ async def run_verification(
             error_msg = str(e)
             print(f"❌ MASTER STREAM CRASH: {error_msg}")
             yield {"event": "error", "data": json.dumps({"detail": f"Backend Engine Disconnected: {error_msg}"})}
+        finally:
+            # Client gone mid-stream: stop the prefetch instead of leaving it orphaned
+            memory.cancel()
 
     # stream small node_update events instead of holding them in a buffer bucket.
     return EventSourceResponse(
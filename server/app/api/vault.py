@@ -1,9 +1,8 @@
-import asyncio
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, cast
-from app.core.database import db
-from app.core.embeddings import get_embedding
+from typing import List
+from app.core.repository import repo
+from app.core.embeddings import aget_embedding, to_pgvector
 from app.core.auth import get_current_user
 
 router = APIRouter()
@@ -31,36 +30,18 @@ async def search_vault(
     """
     SOTA Hybrid Interrogator:
     Executes a parallel Vector + Keyword search across the user's entire vault.
-    Now utilizes asyncio thread-pooling for non-blocking execution.
+    Fully async: embedding and RPC are both awaited on shared HTTP/2 pools.
     """
-    if not db:
+    if not repo:
         raise HTTPException(status_code=503, detail="Vault Engine Offline")
 
     try:
-        # 1. Non-Blocking Embedding Generation
-        # Offload the synchronous NVIDIA network call to a background thread
-        query_vector = await asyncio.to_thread(
-            get_embedding, 
-            text=req.query, 
-            input_type="query"
-        )
+        # 1. Native Async Embedding Generation
+        # Awaited directly on the shared HTTP/2 pool; no default-executor thread consumed
+        query_vector = await aget_embedding(req.query, input_type="query")
 
-        # 2. Prepare RPC Parameters
-        rpc_params = {
-            "query_text": req.query,
-            "query_embedding": query_vector,
-            "match_count": req.limit,
-            "target_user_id": user_id
-        }
-        
-        # 3. Non-Blocking Database Execution
-        # Offload the synchronous Supabase HTTP request to prevent event loop freezing
-        res = await asyncio.to_thread(
-            lambda: db.rpc("hybrid_vault_search", rpc_params).execute()
-        )
-        
-        # 4. Strict Type Casting & Return
-        return cast(List[Dict[str, Any]], res.data)
+        # 2. Non-Blocking Database Execution (PostgREST RPC, no executor thread)
+        return await repo.hybrid_vault_search(req.query, to_pgvector(query_vector), req.limit, user_id)
 
     except Exception as e:
         print(f"❌ VAULT SEARCH ERROR: {str(e)}")
@@ -2,12 +2,12 @@ import os
 import requests
 import hashlib
 import asyncio
-from datetime import datetime
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, jwk
-from typing import Optional, Dict, Any, List, cast
-from app.core.database import db
+from typing import Optional, Dict, Any
+from app.core.repository import repo
+from app.core.background import spawn
 
 # --- Security Configuration ---
 security = HTTPBearer()
@@ -58,31 +58,28 @@ async def get_current_user(auth: HTTPAuthorizationCredentials = Depends(security
     # PATH A: AXIOM API KEY (MCP / IDE / CLI)
     # ==========================================
     if token.startswith("axm_live_") or token.startswith("axm_test_"):
-        if not db:
+        if not repo:
             raise HTTPException(status_code=503, detail="Auth Database Offline")
             
         token_hash = hashlib.sha256(token.encode()).hexdigest()
             
         # 1. Non-Blocking High-speed lookup
-        res = await asyncio.to_thread(
-            lambda: db.table("api_keys").select("user_id, is_active").eq("key_value", token_hash).execute()
-        )
-        key_data = cast(List[Dict[str, Any]], res.data)
+        key_data = await repo.find_api_key(token_hash)
         
         # 2. Reject if invalid or revoked
-        if not key_data or not key_data[0].get("is_active"):
+        if not key_data or not key_data.get("is_active"):
             raise HTTPException(status_code=401, detail="Invalid or Revoked Axiom API Key.")
             
         # 3. SOTA: Fire-and-Forget Timestamp Update (Zero added latency for the user)
-        def update_timestamp():
+        async def update_timestamp() -> None:
             try:
-                db.table("api_keys").update({"last_used_at": datetime.utcnow().isoformat()}).eq("key_value", token_hash).execute()
+                await repo.touch_api_key(token_hash)
             except Exception as e:
                 print(f"⚠️ Timestamp Update Failed (Non-fatal): {e}")
                 
-        asyncio.create_task(asyncio.to_thread(update_timestamp))
+        spawn(update_timestamp())
         
-        return str(key_data[0]["user_id"])
+        return str(key_data["user_id"])
 
     # ==========================================
     # PATH B: CLERK JWT (Web Browser Dashboard)
@@ -0,0 +1,19 @@
+import asyncio
+from typing import Any, Coroutine, Set
+
+# Strong references for fire-and-forget tasks (the event loop only keeps weak ones)
+_tasks: Set["asyncio.Task[Any]"] = set()
+
+def spawn(coro: Coroutine[Any, Any, Any]) -> "asyncio.Task[Any]":
+    """Schedules work that must not delay the response (persistence, timestamps)."""
+    task = asyncio.create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
+async def drain(timeout: float = 10.0) -> None:
+    """Waits for in-flight background work (lifespan shutdown)."""
+    pending = [t for t in _tasks if not t.done()]
+    if pending:
+        print(f"AXIOM-CORE: Draining {len(pending)} background tasks...")
+        await asyncio.wait(pending, timeout=timeout)
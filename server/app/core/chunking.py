@@ -1,35 +1,113 @@
+import os
 import re
 import asyncio
-from typing import List, Optional
+from bisect import bisect_left
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 import tiktoken
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+# Structural hierarchy: paragraphs/table blocks, then lines (table rows), sentences, words
+SEPARATORS = ["\n\n", "\n", ". ", " "]
+
+# Whole table block: header + delimiter + every following pipe row
+TABLE_BLOCK = re.compile(r'^\|[^\n]*\|\n\|[ \t:|-]*-[ \t:|-]*\|(?:\n\|[^\n]*\|)*', re.MULTILINE)
+
+# Sanitization. Measured on CPython, str.translate with non-ASCII deletions and
+# a combined alternation regex are both slower than the legacy passes; what wins
+# is replacing the MULTILINE trailing-whitespace regex with one split/rstrip/join
+# sweep over lines, and skipping the zero-width and newline-run passes unless
+# their pattern is present. Still up to three passes, in the legacy order
+# (newline runs first), so output is identical: a run broken by a
+# whitespace-only or zero-width line is not collapsed.
+_NEWLINE_RUN = re.compile(r'\n{3,}')
+
+def _clean(text: str) -> str:
+    if "\n\n\n" in text: text = _NEWLINE_RUN.sub("\n\n", text)
+    if '\u200b' in text: text = text.replace('\u200b', '')
+    if '\ufeff' in text: text = text.replace('\ufeff', '')
+    return "\n".join([line.rstrip(" \t") for line in text.split("\n")])
+
+def sanitize_markdown(text: str) -> str:
+    return _clean(text).strip()
+
+class MarkdownSanitizer:
+    """
+    Streaming variant for text that arrives in pieces: feed() each piece,
+    then flush(). Input is only cleaned up to the start of the newline run
+    before its last line, so no line and no newline run straddles a cut,
+    and trailing whitespace of the output is held back until more text
+    follows. The joined output equals sanitize_markdown(joined input).
+    """
+    def __init__(self) -> None:
+        self._carry = ""   # raw input that may still join a line or newline run
+        self._held = ""    # cleaned whitespace, dropped if nothing follows it
+        self._started = False
+
+    def feed(self, piece: str) -> str:
+        text = self._carry + piece
+        tail = text.rstrip("\n")
+        last_break = tail.rfind("\n")
+        if last_break < 0:
+            self._carry = text
+            return ""
+        cut = len(tail[:last_break].rstrip("\n"))
+        body, self._carry = text[:cut], text[cut:]
+        return self._emit(_clean(body))
+
+    def flush(self) -> str:
+        out = self._emit(_clean(self._carry))
+        self._carry, self._held, self._started = "", "", False
+        return out
+
+    def _emit(self, out: str) -> str:
+        if not self._started:
+            out = out.lstrip()
+            if not out:
+                return ""
+            self._started = True
+        body = out.rstrip()
+        if not body:
+            self._held += out
+            return ""
+        out, self._held = self._held + body, out[len(body):]
+        return out
+
+class Chunk(NamedTuple):
+    text: str
+    tokens: int
+    # Structural metadata, e.g. {"table": 0, "rows": [1, 12]} for a row group
+    meta: Dict[str, Any] = {}
 
 class AxiomChunker:
     """
     SOTA Token-Aware Chunker (V4.6 Enterprise).
     Preserves structural Markdown (Tables/Headers) for Financial/Legal accuracy.
+    Token-native: the sanitized page is encoded exactly once and every cut is
+    made on token offsets aligned to the separator hierarchy, so chunk sizes
+    and token counts come for free (no re-encoding of overlapping substrings).
     Includes async offloading to prevent GIL freezes on massive PDFs.
     """
-    def __init__(self, chunk_size: int = 400, chunk_overlap: int = 50):
+    def __init__(
+        self,
+        chunk_size: int = 400,
+        chunk_overlap: int = 50,
+        max_tokens: int = 510,
+        resplit_overlap: int = 32,
+        table_mode: bool = True,
+    ):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        # Table-aware mode: markdown tables become header-carrying row groups
+        self.table_mode = table_mode
+        # 510 allows 2 tokens overhead for embedding engine system prompts
+        self.max_tokens = max_tokens
+        self.resplit_overlap = resplit_overlap
         self.tokenizer: Optional[tiktoken.Encoding] = None
-        self.splitter: Optional[RecursiveCharacterTextSplitter] = None
 
     def _lazy_init(self) -> None:
         """Fires only when the first document needs to be chunked."""
-        if self.tokenizer is None or self.splitter is None:
-            print("AXIOM-CORE: Initializing Tiktoken & Semantic Splitters...")
+        if self.tokenizer is None:
+            print("AXIOM-CORE: Initializing Tiktoken Token-Native Splitter...")
             self.tokenizer = tiktoken.get_encoding("cl100k_base")
-            
-            # SOTA Splitter: Respects structural boundaries
-            self.splitter = RecursiveCharacterTextSplitter(
-                chunk_size=self.chunk_size,
-                chunk_overlap=self.chunk_overlap,
-                length_function=self._count_tokens,
-                # Prioritize splitting on double newlines to keep table rows intact
-                separators=["\n\n", "\n", ". ", " ", ""]
-            )
 
     def _count_tokens(self, text: str) -> int:
         if self.tokenizer is None:
@@ -39,38 +117,101 @@ class AxiomChunker:
     def _sanitize_markdown(self, text: str) -> str:
         """
         SOTA Preservative Sanitization:
-        Strips invisible/junk characters but STRICTLY PRESERVES tables, 
+        Strips invisible/junk characters but STRICTLY PRESERVES tables,
         lists, and headers which are vital for vector semantics.
         """
-        # Remove massive blocks of empty newlines (e.g., page breaks)
-        text = re.sub(r'\n{3,}', '\n\n', text)
-        # Remove zero-width spaces and weird unicode artifacts
-        text = text.replace('\u200b', '').replace('\ufeff', '')
-        # Clean trailing whitespace on lines without destroying the line itself
-        text = re.sub(r'[ \t]+$', '', text, flags=re.MULTILINE)
-        return text.strip()
+        # Page-break newline runs, zero-width artifacts, trailing line whitespace
+        return sanitize_markdown(text)
 
-    def split_text(self, text: str) -> List[str]:
-        """Synchronous split (Internal use)"""
+    def split_chunks(self, text: str) -> List[Chunk]:
+        """Synchronous split returning chunks with token counts and structural metadata."""
         self._lazy_init()
-        
+        if not self.tokenizer:
+            raise RuntimeError("Tokenizer failed to initialize")
+
         # PHASE 1: PRESERVATIVE SANITIZATION
         clean_text = self._sanitize_markdown(text)
-        
-        # PHASE 2: SMART SPLITTING
-        if not self.splitter:
-            raise RuntimeError("Splitter failed to initialize")
-            
-        raw_chunks = self.splitter.split_text(clean_text)
-        
+        if not clean_text:
+            return []
+
+        # PHASE 2: SINGLE ENCODE + TOKEN-OFFSET CUTS (tables as row groups)
+        doc = _TokenizedText(clean_text, self.tokenizer)
+        chunks: List[Chunk] = []
+        cursor = 0
+        tables = TABLE_BLOCK.finditer(clean_text) if self.table_mode else iter(())
+        for table_index, table in enumerate(tables):
+            chunks.extend(self._split_prose(doc, cursor, doc.token_at(table.start())))
+            chunks.extend(self._split_table(doc, table, table_index))
+            cursor = doc.token_at(table.end())
+        chunks.extend(self._split_prose(doc, cursor, doc.n_tokens))
+        return chunks
+
+    def _split_prose(self, doc: "_TokenizedText", lo: int, hi: int) -> List[Chunk]:
+        if lo >= hi:
+            return []
         # PHASE 3: GUARDRAILS (NVIDIA NIM 512-Token Limit Compliance)
-        valid_chunks =[]
-        for c in raw_chunks:
-            # 510 allows 2 tokens overhead for embedding engine system prompts
-            if self._count_tokens(c) <= 510: 
-                valid_chunks.append(c)
-        
-        return valid_chunks
+        # Windows never exceed the embedder limit, even if chunk_size is configured above it
+        size = min(self.chunk_size, self.max_tokens)
+        return [Chunk(t, n) for t, n in doc.texts(doc.split(lo, hi, 0, size, self.chunk_overlap))]
+
+    def _split_table(self, doc: "_TokenizedText", table: "re.Match[str]", table_index: int) -> List[Chunk]:
+        """
+        Packs whole rows into groups of up to chunk_size tokens, each prefixed
+        with the header + delimiter rows. Text is cut on row (char) boundaries;
+        counts come from the token offset table.
+        """
+        lines = table.group(0).split("\n")
+        header_text = "\n".join(lines[:2]) + "\n"
+        row_starts = [table.start() + len(header_text)]
+        for line in lines[2:]:
+            row_starts.append(row_starts[-1] + len(line) + 1)
+        if not lines[2:]:
+            return self._split_prose(doc, doc.token_at(table.start()), doc.token_at(table.end()))
+        header_tokens = doc.token_at(row_starts[0]) - doc.token_at(table.start())
+        row_tokens = [max(doc.token_at(b) - doc.token_at(a), 1) for a, b in zip(row_starts, row_starts[1:])]
+
+        # Greedy row packing: (first_row, end_row, body_tokens)
+        budget = min(self.chunk_size, self.max_tokens) - header_tokens
+        groups: List[Tuple[int, int, int]] = []
+        first, used = 0, 0
+        for i, tokens in enumerate(row_tokens):
+            if i > first and used + tokens > budget:
+                groups.append((first, i, used))
+                first, used = i, 0
+            used += tokens
+        groups.append((first, len(row_tokens), used))
+
+        chunks: List[Chunk] = []
+        for first, end, used in groups:
+            meta = {"table": table_index, "rows": [first + 1, end]}
+            if header_tokens + used > self.max_tokens:
+                # Only a single row can overflow: it is re-split, never dropped
+                lo, hi = doc.token_at(row_starts[first]), doc.token_at(row_starts[end])
+                chunks.extend(self._resplit(doc, header_text, header_tokens, lo, hi, meta))
+                continue
+            body = doc.text[row_starts[first] : row_starts[end] - 1]
+            chunks.append(Chunk(header_text + body, header_tokens + used, meta))
+        return chunks
+
+    def _resplit(
+        self, doc: "_TokenizedText", header_text: str, header_tokens: int, lo: int, hi: int, meta: Dict[str, Any]
+    ) -> List[Chunk]:
+        """
+        Cuts a table row too wide for the embedder into row-aligned token
+        windows within max_tokens, tagged {"resplit": True}. Every window
+        repeats the header rows so column semantics survive the cut, unless
+        the header alone would take more than half the budget.
+        """
+        meta = {**meta, "resplit": True}
+        if header_tokens * 2 > self.max_tokens:
+            return [Chunk(t, n, meta) for t, n in doc.texts(doc.split(lo, hi, 1, self.max_tokens, self.resplit_overlap))]
+        budget = self.max_tokens - header_tokens
+        windows = doc.texts(doc.split(lo, hi, 1, budget, min(self.resplit_overlap, budget // 2)))
+        return [Chunk(header_text + body, header_tokens + count, meta) for body, count in windows]
+
+    def split_text(self, text: str) -> List[str]:
+        """Synchronous split (Internal use)"""
+        return [chunk.text for chunk in self.split_chunks(text)]
 
     async def asplit_text(self, text: str) -> List[str]:
         """
@@ -79,9 +220,98 @@ class AxiomChunker:
         """
         return await asyncio.to_thread(self.split_text, text)
 
+    async def asplit_chunks(self, text: str) -> List[Chunk]:
+        return await asyncio.to_thread(self.split_chunks, text)
+
+
+class _TokenizedText:
+    """One encode of a sanitized page plus the token→char offset table used for every cut."""
+    def __init__(self, text: str, tokenizer: tiktoken.Encoding):
+        self.text = text
+        tokens = tokenizer.encode(text)
+        _, offsets = tokenizer.decode_with_offsets(tokens)
+        self.n_tokens = len(tokens)
+        # starts[i] = char offset of token i; starts[n] = end of text
+        self.starts: List[int] = list(offsets) + [len(text)]
+        self._cuts: Dict[str, List[int]] = {}
+
+    def cuts(self, sep: str) -> List[int]:
+        """Token indices at which a piece begins right after `sep` (computed once per separator)."""
+        if sep not in self._cuts:
+            found: List[int] = []
+            for m in re.finditer(re.escape(sep), self.text):
+                idx = self.token_at(m.end())
+                if 0 < idx < self.n_tokens and (not found or found[-1] != idx):
+                    found.append(idx)
+            self._cuts[sep] = found
+        return self._cuts[sep]
+
+    def split(self, lo: int, hi: int, level: int, size: int, overlap: int) -> List[Tuple[int, int]]:
+        """Recursive split of tokens [lo, hi) following the separator hierarchy."""
+        if hi - lo <= size:
+            return [(lo, hi)]
+        if level >= len(SEPARATORS):
+            # Last resort: fixed token windows
+            step = max(size - overlap, 1)
+            windows: List[Tuple[int, int]] = []
+            start = lo
+            while True:
+                windows.append((start, min(start + size, hi)))
+                if start + size >= hi:
+                    return windows
+                start += step
+
+        all_cuts = self.cuts(SEPARATORS[level])
+        inner = all_cuts[bisect_left(all_cuts, lo + 1) : bisect_left(all_cuts, hi)]
+        if not inner:
+            return self.split(lo, hi, level + 1, size, overlap)
+
+        out: List[Tuple[int, int]] = []
+        window: List[Tuple[int, int]] = []
+        for a, b in zip([lo] + inner, inner + [hi]):
+            if b - a > size:
+                # Oversized piece: flush what we have, then descend a level
+                if window:
+                    out.append((window[0][0], window[-1][1]))
+                    window = []
+                out.extend(self.split(a, b, level + 1, size, overlap))
+                continue
+            if window and b - window[0][0] > size:
+                out.append((window[0][0], window[-1][1]))
+                # Carry trailing pieces forward as overlap
+                while window and (window[-1][1] - window[0][0] > overlap or b - window[0][0] > size):
+                    window.pop(0)
+            window.append((a, b))
+        if window:
+            out.append((window[0][0], window[-1][1]))
+        return out
+
+    def token_at(self, char_pos: int) -> int:
+        """First token starting at or after a char offset."""
+        return bisect_left(self.starts, char_pos, 0, self.n_tokens)
+
+    def texts(self, spans: List[Tuple[int, int]]) -> List[Tuple[str, int]]:
+        return [piece for piece in (self.text_of(lo, hi) for lo, hi in spans) if piece]
+
+    def _blank(self, i: int) -> bool:
+        return self.text[self.starts[i] : self.starts[i + 1]].isspace()
+
+    def text_of(self, lo: int, hi: int) -> Optional[Tuple[str, int]]:
+        """Chunk text and its token count, with whitespace-only edge tokens trimmed."""
+        while lo < hi and self._blank(lo):
+            lo += 1
+        while hi > lo and self._blank(hi - 1):
+            hi -= 1
+        if lo >= hi:
+            return None
+        return self.text[self.starts[lo] : self.starts[hi]].strip(), hi - lo
+
 
 # Singleton Instance
-chunker = AxiomChunker()
+chunker = AxiomChunker(
+    resplit_overlap=int(os.getenv("CHUNK_RESPLIT_OVERLAP", "32")),
+    table_mode=os.getenv("CHUNK_TABLE_MODE", "true").lower() == "true",
+)
 
 def get_chunks(text: str) -> List[str]:
     """Universal synchronous interface."""
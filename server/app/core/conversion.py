@@ -0,0 +1,139 @@
+import os
+import asyncio
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Callable, List, Optional, Tuple
+
+# (page_no, markdown); page_no is None when Docling exposes no pages
+PageMarkdown = Tuple[Optional[int], str]
+
+# Per-process converter: built once by the pool initializer, reused for every file
+_converter: Any = None
+
+def get_converter() -> Any:
+    global _converter
+    if _converter is None:
+        print(f"AXIOM-CORE: Waking up Docling V2 Intelligence (pid {os.getpid()})...")
+        from docling.document_converter import DocumentConverter # type: ignore
+        from docling.datamodel.base_models import InputFormat # type: ignore
+        _converter = DocumentConverter()
+        # Load layout/table models now instead of on the first real upload
+        _converter.initialize_pipeline(InputFormat.PDF)
+    return _converter
+
+def convert_pages(file_path: str) -> List[PageMarkdown]:
+    """Converts one PDF and exports markdown page by page (runs inside a pool worker)."""
+    document = get_converter().convert(file_path).document
+    page_numbers = sorted(document.pages.keys())
+    if not page_numbers:
+        return [(None, document.export_to_markdown())]
+    return [(page_no, document.export_to_markdown(page_no=page_no)) for page_no in page_numbers]
+
+def split_pdf(file_path: str, pages_per_range: int) -> List[Tuple[int, str]]:
+    """
+    Writes consecutive page ranges of a PDF to sibling sub-PDFs.
+    Returns (page_offset, path) pairs; a PDF that fits in one range is returned as is.
+    """
+    from pypdf import PdfReader, PdfWriter # type: ignore
+    reader = PdfReader(file_path)
+    total = len(reader.pages)
+    if pages_per_range <= 0 or total <= pages_per_range:
+        return [(0, file_path)]
+
+    base, _ = os.path.splitext(file_path)
+    ranges: List[Tuple[int, str]] = []
+    for start in range(0, total, pages_per_range):
+        writer = PdfWriter()
+        for i in range(start, min(start + pages_per_range, total)):
+            writer.add_page(reader.pages[i])
+        path = f"{base}.p{start + 1}.pdf"
+        with open(path, "wb") as f:
+            writer.write(f)
+        ranges.append((start, path))
+    return ranges
+
+def _ready() -> int:
+    return os.getpid()
+
+
+class ConversionPool:
+    """
+    Pre-Warmed Docling Process Pool (V4.6).
+    Each worker process builds its DocumentConverter once in the initializer,
+    so parsing runs on real cores (no GIL contention between uploads) and no
+    request pays the model cold start. workers=0 keeps the in-thread path.
+
+    Page-parallel mode (pages_per_range > 0, needs workers > 1): large PDFs
+    are split into page ranges that convert concurrently and are yielded in
+    order with their original page numbers as soon as each range (and every
+    range before it) is done, so the ingestion pipeline chunks and embeds the
+    head of a document while its tail is still parsing. Layout context does
+    not cross a range boundary, so keep ranges in the tens of pages.
+    """
+    def __init__(
+        self,
+        workers: int,
+        pages_per_range: int = 0,
+        task: Callable[[str], List[PageMarkdown]] = convert_pages,
+        initializer: Optional[Callable[[], Any]] = get_converter,
+    ):
+        self.workers = workers
+        self.pages_per_range = pages_per_range
+        self._task = task
+        self._initializer = initializer
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self) -> None:
+        if self.workers <= 0 or self._executor is not None:
+            return
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=self._initializer,
+        )
+        # Workers spawn on demand; one no-op per slot forces them all up (and warm) now
+        for _ in range(self.workers):
+            self._executor.submit(_ready)
+        print(f"AXIOM-CORE: Docling pool warming ({self.workers} processes).")
+
+    async def convert(self, file_path: str) -> AsyncIterator[PageMarkdown]:
+        """Yields (page_no, markdown) in page order; a single range arrives in one piece."""
+        if self._executor is None or self.workers < 2 or self.pages_per_range <= 0:
+            for page in await self._convert_one(file_path):
+                yield page
+            return
+
+        ranges = await asyncio.to_thread(split_pdf, file_path, self.pages_per_range)
+        tasks = [asyncio.ensure_future(self._convert_one(path)) for _, path in ranges]
+        try:
+            # Ordered drain: range k is released once ranges 1..k are converted
+            for (offset, _), task in zip(ranges, tasks):
+                for page_no, markdown in await task:
+                    # Sub-PDFs number their pages from 1; shift back to the source document
+                    yield (None if page_no is None else page_no + offset, markdown)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for _, path in ranges:
+                if path != file_path and os.path.exists(path):
+                    os.remove(path)
+
+    async def _convert_one(self, file_path: str) -> List[PageMarkdown]:
+        if self._executor is None:
+            return await asyncio.to_thread(self._task, file_path)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._task, file_path)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Singleton Instance (started by the ingestion worker; DOCLING_WORKERS=0 disables the pool,
+# DOCLING_PAGES_PER_RANGE>0 enables page-parallel conversion)
+conversion_pool = ConversionPool(
+    workers=int(os.getenv("DOCLING_WORKERS", "1")),
+    pages_per_range=int(os.getenv("DOCLING_PAGES_PER_RANGE", "0")),
+)
@@ -0,0 +1,147 @@
+import os
+import asyncio
+import sqlite3
+import hashlib
+import threading
+import numpy as np # type: ignore
+from collections import OrderedDict
+from typing import Dict, List, Mapping, Optional, Sequence, Union
+
+VectorLike = Union[np.ndarray, Sequence[float]]
+
+class EmbeddingCache:
+    """
+    Content-Addressed Embedding Cache (V4.6).
+    Tier 1: bounded in-process LRU of float32 vectors.
+    Tier 2 (optional): SQLite file of raw float32 blobs, survives restarts.
+    Keys are (model, input_type, dimensions, sha256(text)), so identical text
+    is never sent to NIM twice for the same model configuration.
+    """
+    def __init__(self, max_entries: int = 4096, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                self._conn = sqlite3.connect(path, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+                )
+                self._conn.commit()
+                print(f"AXIOM-CORE: Persistent embedding cache attached at {path}")
+            except sqlite3.Error as e:
+                print(f"⚠️ EMBEDDING CACHE DISK TIER DISABLED: {e}")
+                self._conn = None
+
+    @staticmethod
+    def make_key(model: str, input_type: str, dimensions: int, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{model}|{input_type}|{dimensions}|{digest}"
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        """Caller must hold the lock."""
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Resolves keys against the LRU, then the disk tier. Misses are absent from the result."""
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            pending: List[str] = []
+            for key in keys:
+                vector = self._lru.get(key)
+                if vector is not None:
+                    self._lru.move_to_end(key)
+                    found[key] = vector
+                else:
+                    pending.append(key)
+
+            if pending and self._conn is not None:
+                unique = list(dict.fromkeys(pending))
+                # SQLite caps bound parameters; 500 is well under every build's limit
+                for i in range(0, len(unique), 500):
+                    part = unique[i : i + 500]
+                    marks = ",".join("?" * len(part))
+                    rows = self._conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", part
+                    ).fetchall()
+                    for key, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32) # read-only view
+                        self._remember(key, vector)
+                        found[key] = vector
+                self.disk_hits += sum(1 for key in pending if key in found)
+
+            hit_count = sum(1 for key in keys if key in found)
+            self.hits += hit_count
+            self.misses += len(keys) - hit_count
+        return found
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: Mapping[str, VectorLike]) -> None:
+        if not items:
+            return
+        with self._lock:
+            arrays = {k: np.asarray(v, dtype=np.float32) for k, v in items.items()}
+            for key, vector in arrays.items():
+                # Cached vectors are shared between callers, so freeze them
+                vector.setflags(write=False)
+                self._remember(key, vector)
+            if self._conn is not None:
+                try:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                        [(k, v.tobytes()) for k, v in arrays.items()],
+                    )
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    print(f"⚠️ EMBEDDING CACHE WRITE FAILED: {e}")
+
+    def put(self, key: str, vector: VectorLike) -> None:
+        self.put_many({key: vector})
+
+    async def aget_many(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        """get_many for the event loop: with a disk tier attached the lookup runs in a thread."""
+        if self._conn is None:
+            return self.get_many(keys)
+        return await asyncio.to_thread(self.get_many, keys)
+
+    async def aput_many(self, items: Mapping[str, VectorLike]) -> None:
+        if self._conn is None or not items:
+            self.put_many(items)
+            return
+        await asyncio.to_thread(self.put_many, items)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._lru),
+            }
+
+    def clear(self) -> None:
+        """Drops the in-process tier and resets counters (disk tier is left intact)."""
+        with self._lock:
+            self._lru.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+
+# Singleton Instance (disk tier is opt-in via EMBEDDING_CACHE_PATH)
+embedding_cache = EmbeddingCache(
+    max_entries=int(os.getenv("EMBEDDING_CACHE_SIZE", "4096")),
+    path=os.getenv("EMBEDDING_CACHE_PATH") or None,
+)
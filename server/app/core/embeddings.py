@@ -1,19 +1,54 @@
 import os
+import base64
+import asyncio
 import threading
+import httpx
 import numpy as np # type: ignore
-from typing import List, Any, Optional
-from openai import OpenAI
+from typing import Dict, List, Any, Optional, Sequence, Iterator, Tuple
+from openai import OpenAI, AsyncOpenAI
+from app.core.embedding_cache import EmbeddingCache, embedding_cache
+
+NIM_BASE_URL = "https://integrate.api.nvidia.com/v1"
+
+# A vector travels as a contiguous float32 ndarray from NIM to Postgres
+Vector = np.ndarray
+
+# pgvector text literal: 7 significant digits = float32 precision, half the bytes of repr()
+_PG_FORMATS: Dict[int, str] = {}
+
+def to_pgvector(vector: Any) -> str:
+    """Serializes a vector once into pgvector's compact text form '[x,y,...]'."""
+    arr = np.asarray(vector, dtype=np.float32)
+    fmt = _PG_FORMATS.get(arr.shape[0])
+    if fmt is None:
+        fmt = _PG_FORMATS.setdefault(arr.shape[0], "[" + ",".join(["%.7g"] * arr.shape[0]) + "]")
+    return fmt % tuple(arr.tolist())
 
 class EmbeddingAdapter:
     """
     SOTA Multilingual Inference Adapter (V4.6 Thread-Safe).
     Upgraded to Llama-Nemotron-Embed-1B-v2 for global sovereign audits.
     Native Integration via 0.3.7 Update.
+    Async path (aembed/aembed_batch) runs on a shared HTTP/2 connection pool.
     """
     _instance: Optional['EmbeddingAdapter'] = None
     _client: Optional[OpenAI] = None
+    _async_client: Optional[AsyncOpenAI] = None
+    _async_loop: Optional[asyncio.AbstractEventLoop] = None
+    _async_gate: Optional[asyncio.Semaphore] = None
     _model_name: str = "nvidia/llama-nemotron-embed-1b-v2"
-    
+    _dimensions: int = 1024
+
+    # Request packing budget for embed_batch (NIM caps inputs per call)
+    max_batch_items: int = int(os.getenv("EMBED_BATCH_MAX_ITEMS", "50"))
+    max_batch_tokens: int = int(os.getenv("EMBED_BATCH_MAX_TOKENS", "16384"))
+
+    # Async concurrency is bounded by sockets: in-flight requests <= pool size
+    max_connections: int = int(os.getenv("EMBED_MAX_CONNECTIONS", "5"))
+
+    # Content-addressed cache: identical text is embedded once per model config
+    _cache: EmbeddingCache = embedding_cache
+
     # THE SHIELD: Thread lock for concurrent batching in ingest.py
     _lock: threading.Lock = threading.Lock()
 
@@ -24,67 +59,287 @@ class EmbeddingAdapter:
                     cls._instance = super(EmbeddingAdapter, cls).__new__(cls)
         return cls._instance
 
+    @staticmethod
+    def _api_key() -> str:
+        # SOTA: Fetch key at runtime, not import time
+        api_key = os.getenv("NVIDIA_API_KEY")
+        if not api_key:
+            raise RuntimeError("CRITICAL: NVIDIA_API_KEY missing.")
+        return api_key.strip() # Strip removes hidden newlines!
+
     def _lazy_init(self) -> None:
         """Thread-safe initialization of the NVIDIA client."""
         if self._client is not None:
-            return 
+            return
 
         with self._lock:
             if self._client is not None:
                 return
 
-            # SOTA: Fetch key at runtime, not import time
-            api_key = os.getenv("NVIDIA_API_KEY")
-            if not api_key:
-                raise RuntimeError("CRITICAL: NVIDIA_API_KEY missing.")
-
+            api_key = self._api_key()
             print(f"AXIOM-CORE: Multilingual Link Established via {self._model_name} (Native)")
-            
+
             self._client = OpenAI(
-                base_url="https://integrate.api.nvidia.com/v1",
-                api_key=api_key.strip(), # Strip removes hidden newlines!
-                max_retries=5, 
+                base_url=NIM_BASE_URL,
+                api_key=api_key,
+                max_retries=5,
                 timeout=60.0
             )
 
-    def _normalize(self, vector: List[float]) -> List[float]:
-        """Mathematically enforces Unit Length (L2 Norm) for pgvector speed."""
-        arr = np.array(vector)
-        norm = np.linalg.norm(arr)
-        if norm == 0:
-            return vector
-        return (arr / norm).tolist()
+    def _lazy_init_async(self) -> None:
+        """
+        Builds the AsyncOpenAI client over one shared HTTP/2 pool.
+        Re-created if the running event loop changes (pools are loop-bound).
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is not None and self._async_loop is loop:
+            return
+
+        api_key = self._api_key()
+        print(f"AXIOM-CORE: Async HTTP/2 Link Established via {self._model_name}")
+
+        http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(60.0, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=30.0,
+            ),
+        )
+        self._async_client = AsyncOpenAI(
+            base_url=NIM_BASE_URL,
+            api_key=api_key,
+            max_retries=5,
+            http_client=http_client,
+        )
+        self._async_loop = loop
+        self._async_gate = asyncio.Semaphore(self.max_connections)
+
+    async def aclose(self) -> None:
+        """Releases the shared HTTP/2 pool (called at lifespan shutdown)."""
+        if self._async_client is not None:
+            await self._async_client.close()
+        self._async_client = None
+        self._async_loop = None
+        self._async_gate = None
+
+    def _zero(self) -> Vector:
+        return np.zeros(self._dimensions, dtype=np.float32)
+
+    def _request_kwargs(self, texts: List[str], target_type: str) -> Dict[str, Any]:
+        return {
+            "input": texts,
+            "model": self._model_name,
+            # base64 float32 payloads decode straight into numpy buffers (no per-float objects)
+            "encoding_format": "base64",
+            "extra_body": {
+                "input_type": target_type,
+                "truncate": "END",
+                "dimensions": self._dimensions # Forces compatibility with Supabase schema
+            }
+        }
+
+    def _parse(self, response: Any) -> List[Vector]:
+        """
+        Decodes a response into one contiguous (n, dims) float32 matrix,
+        L2-normalizes it in place and returns its rows in request order.
+        """
+        ordered = sorted(response.data, key=lambda d: d.index)
+        matrix = np.empty((len(ordered), self._dimensions), dtype=np.float32)
+        for row, item in zip(matrix, ordered):
+            raw = item.embedding
+            if isinstance(raw, str):
+                row[:] = np.frombuffer(base64.b64decode(raw), dtype=np.float32)[:self._dimensions]
+            else:
+                row[:] = raw[:self._dimensions]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+        return list(matrix)
+
+    def _request(self, texts: List[str], target_type: str) -> List[Vector]:
+        """Single NIM round trip (sync client)."""
+        response = self._client.embeddings.create(**self._request_kwargs(texts, target_type)) # type: ignore
+        return self._parse(response)
+
+    async def _arequest(self, texts: List[str], target_type: str) -> List[Vector]:
+        """Single NIM round trip (async client, gated by the pool size)."""
+        async with self._async_gate: # type: ignore
+            response = await self._async_client.embeddings.create( # type: ignore
+                **self._request_kwargs(texts, target_type)
+            )
+        return self._parse(response)
 
-    def embed_text(self, text: str, is_query: bool = False) -> List[float]:
+    def embed_text(self, text: str, is_query: bool = False) -> Vector:
         """Transmits text to NVIDIA grid and returns a normalized 1024-D vector."""
-        self._lazy_init()
-        
-        if self._client is None:
-            return[0.0] * 1024
-
-        try:
-            target_type = "query" if is_query else "passage"
-            
-            response = self._client.embeddings.create(
-                input=[text],
-                model=self._model_name,
-                extra_body={
-                    "input_type": target_type, 
-                    "truncate": "END",
-                    "dimensions": 1024 # Forces compatibility with Supabase schema
-                }
+        return self.embed_batch([text], input_type="query" if is_query else "passage")[0]
+
+    async def aembed(self, text: str, input_type: str = "query") -> Vector:
+        """Native async single-text embedding (no thread hop)."""
+        return (await self.aembed_batch([text], input_type=input_type))[0]
+
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """Cheap upper-bound token estimate (~3 chars/token) used for request packing."""
+        return len(text) // 3 + 1
+
+    def _pack_batches(
+        self, texts: Sequence[str], token_counts: Optional[Sequence[int]] = None
+    ) -> Iterator[range]:
+        """Yields index ranges that respect both the item and the token budget."""
+        start, budget = 0, 0
+        for i, text in enumerate(texts):
+            tokens = token_counts[i] if token_counts is not None else self._estimate_tokens(text)
+            full = (i - start) >= self.max_batch_items
+            over = i > start and budget + tokens > self.max_batch_tokens
+            if full or over:
+                yield range(start, i)
+                start, budget = i, 0
+            budget += tokens
+        if start < len(texts):
+            yield range(start, len(texts))
+
+    def _keys(self, texts: Sequence[str], target_type: str) -> List[str]:
+        return [
+            EmbeddingCache.make_key(self._model_name, target_type, self._dimensions, t)
+            for t in texts
+        ]
+
+    def _plan(
+        self,
+        keys: List[str],
+        cached: Dict[str, np.ndarray],
+        texts: Sequence[str],
+        token_counts: Optional[Sequence[int]],
+    ) -> Tuple[List[str], List[str], Optional[List[int]]]:
+        """
+        Returns (miss_keys, miss_texts, miss_counts) for the keys the cache did not resolve.
+        Only unique cache misses travel to NIM (repeated headers/boilerplate embed once).
+        """
+        first_index: Dict[str, int] = {}
+        for i, k in enumerate(keys):
+            if k not in cached:
+                first_index.setdefault(k, i)
+        miss_keys = list(first_index)
+        miss_texts = [texts[i] for i in first_index.values()]
+        miss_counts = (
+            [token_counts[i] for i in first_index.values()] if token_counts is not None else None
+        )
+        return miss_keys, miss_texts, miss_counts
+
+    def _assemble(
+        self, keys: List[str], cached: Dict[str, np.ndarray], fresh: Dict[str, Vector]
+    ) -> List[Vector]:
+        vectors: List[Vector] = []
+        for k in keys:
+            vector = cached.get(k)
+            if vector is None:
+                vector = fresh.get(k)
+            vectors.append(vector if vector is not None else self._zero())
+        return vectors
+
+    def embed_batch(
+        self,
+        texts: Sequence[str],
+        input_type: str = "passage",
+        token_counts: Optional[Sequence[int]] = None,
+    ) -> List[Vector]:
+        """
+        Packs many texts into each NIM request (bounded by max_batch_items and
+        max_batch_tokens). Cache hits skip the network entirely. Output order
+        matches input order. A failed request degrades to zero-vectors for that
+        batch only.
+        """
+        if not texts:
+            return []
+
+        target_type = "query" if input_type == "query" else "passage"
+        keys = self._keys(texts, target_type)
+        cached = self._cache.get_many(keys)
+        miss_keys, miss_texts, miss_counts = self._plan(keys, cached, texts, token_counts)
+
+        fresh: Dict[str, Vector] = {}
+        if miss_keys:
+            self._lazy_init()
+            if self._client is None:
+                return [self._zero() for _ in texts]
+
+            for batch in self._pack_batches(miss_texts, miss_counts):
+                try:
+                    vectors = self._request([miss_texts[i] for i in batch], target_type)
+                    fresh.update({miss_keys[i]: v for i, v in zip(batch, vectors)})
+                except Exception as e:
+                    print(f"⚠️ NEURAL LINK FAILURE (batch of {len(batch)}): {str(e)}")
+
+        # Zero-vector fallbacks are never cached
+        self._cache.put_many(fresh)
+        return self._assemble(keys, cached, fresh)
+
+    async def aembed_batch(
+        self,
+        texts: Sequence[str],
+        input_type: str = "passage",
+        token_counts: Optional[Sequence[int]] = None,
+    ) -> List[Vector]:
+        """
+        Async twin of embed_batch. Packed batches are sent concurrently over the
+        shared HTTP/2 pool; at most max_connections requests are in flight.
+        """
+        if not texts:
+            return []
+
+        target_type = "query" if input_type == "query" else "passage"
+        keys = self._keys(texts, target_type)
+        # The SQLite tier is blocking I/O under a thread lock: keep it off the event loop
+        cached = await self._cache.aget_many(keys)
+        miss_keys, miss_texts, miss_counts = self._plan(keys, cached, texts, token_counts)
+
+        fresh: Dict[str, Vector] = {}
+        if miss_keys:
+            self._lazy_init_async()
+            if self._async_client is None:
+                return [self._zero() for _ in texts]
+
+            batches = list(self._pack_batches(miss_texts, miss_counts))
+            results = await asyncio.gather(
+                *(self._arequest([miss_texts[i] for i in batch], target_type) for batch in batches),
+                return_exceptions=True,
             )
-            raw_vector = response.data[0].embedding
-            return self._normalize(raw_vector[:1024])
+            for batch, result in zip(batches, results):
+                if isinstance(result, BaseException):
+                    print(f"⚠️ NEURAL LINK FAILURE (batch of {len(batch)}): {str(result)}")
+                    continue
+                fresh.update({miss_keys[i]: v for i, v in zip(batch, result)})
 
-        except Exception as e:
-            print(f"⚠️ NEURAL LINK FAILURE: {str(e)}")
-            return[0.0] * 1024 
+        # Zero-vector fallbacks are never cached
+        await self._cache.aput_many(fresh)
+        return self._assemble(keys, cached, fresh)
 
 # Singleton Instance
 _engine = EmbeddingAdapter()
 
-def get_embedding(text: str, input_type: str = "query") -> List[float]:
+def get_embedding(text: str, input_type: str = "query") -> Vector:
     """Universal thread-safe interface for the Axiom Engine."""
     is_query = True if input_type == "query" else False
     return _engine.embed_text(text, is_query=is_query)
+
+def get_embeddings(
+    texts: Sequence[str],
+    input_type: str = "passage",
+    token_counts: Optional[Sequence[int]] = None,
+) -> List[Vector]:
+    """Batched interface: one NIM round trip per packed batch instead of per text."""
+    return _engine.embed_batch(texts, input_type=input_type, token_counts=token_counts)
+
+async def aget_embedding(text: str, input_type: str = "query") -> Vector:
+    """Native async interface (awaited directly by retrieval paths)."""
+    return await _engine.aembed(text, input_type=input_type)
+
+async def aget_embeddings(
+    texts: Sequence[str],
+    input_type: str = "passage",
+    token_counts: Optional[Sequence[int]] = None,
+) -> List[Vector]:
+    """Native async batched interface (awaited directly by ingestion)."""
+    return await _engine.aembed_batch(texts, input_type=input_type, token_counts=token_counts)
@@ -0,0 +1,60 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from app.core.monitor import monitor
+
+@dataclass(slots=True)
+class Exhibit:
+    """
+    Structured Evidence Record (V4.6).
+    Retrieval rows travel through the graph as Exhibits; the
+    --- EXHIBIT_START_ID_n --- envelope is only rendered at prompt time.
+    """
+    ref: int                            # exhibit number cited in the envelope
+    filename: str
+    content: str
+    chunk_id: Optional[int] = None
+    document_id: Optional[int] = None
+    similarity: Optional[float] = None
+    fts_rank: Optional[float] = None
+    score: Optional[float] = None       # reranker relevance, when reranked
+    token_count: Optional[int] = None   # ingest-time count of `content`
+
+    @classmethod
+    def from_row(cls, ref: int, row: Dict[str, Any]) -> "Exhibit":
+        return cls(
+            ref=ref,
+            filename=row["filename"],
+            content=row["content"],
+            chunk_id=row.get("id"),
+            document_id=row.get("document_id"),
+            similarity=row.get("similarity"),
+            fts_rank=row.get("fts_rank"),
+            token_count=row.get("token_count"),
+        )
+
+    def render(self) -> str:
+        head = f"--- EXHIBIT_START_ID_{self.ref} ---\nFILE_SOURCE: {self.filename}\nDATA_CONTENT: "
+        tail = f"\n--- EXHIBIT_END_ID_{self.ref} ---"
+        envelope = f"{head}{self.content}{tail}"
+        if self.token_count is not None:
+            # Stored count + frame: context packing never re-encodes the chunk
+            monitor.remember(envelope, int(self.token_count) + monitor.count_tokens(head + tail))
+        return envelope
+
+# Pre-rendered strings (code / dataset exhibits built by the skills) remain valid evidence
+Evidence = Union[Exhibit, str]
+
+def from_rows(rows: Sequence[Dict[str, Any]]) -> List[Exhibit]:
+    return [Exhibit.from_row(i + 1, row) for i, row in enumerate(rows)]
+
+def render(evidence: Evidence) -> str:
+    return evidence.render() if isinstance(evidence, Exhibit) else evidence
+
+def render_all(documents: Sequence[Evidence]) -> List[str]:
+    return [render(doc) for doc in documents]
+
+def scores_of(documents: Sequence[Evidence]) -> Optional[List[float]]:
+    """Reranker scores when every item carries one, else None (rank order applies)."""
+    scores = [doc.score for doc in documents if isinstance(doc, Exhibit) and doc.score is not None]
+    return scores if len(scores) == len(documents) else None
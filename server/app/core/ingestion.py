@@ -0,0 +1,207 @@
+import asyncio
+import hashlib
+from dataclasses import dataclass, asdict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core.repository import repo
+from app.core.chunking import chunker
+from app.core.embeddings import aget_embeddings, to_pgvector
+
+# End-of-stream marker passed between stages
+_DONE: Any = object()
+
+# (page_no, markdown) pairs; page_no is None when the parser exposes no pages
+Section = Tuple[Optional[int], str]
+
+# (stage, progress) reporter, e.g. the job queue's per-stage progress
+ProgressCallback = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+@dataclass
+class IngestStats:
+    sections: int = 0
+    chunks: int = 0
+    inserted: int = 0
+    reused: int = 0
+    tokens: int = 0
+    resplit: int = 0  # windows cut from table rows too wide for the embedder
+    pages: Optional[int] = None  # highest page number seen; None when no section had one
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class StreamingIngestor:
+    """
+    Bounded-Queue Ingestion Pipeline (V4.6).
+    parse → chunk → embed → insert run as concurrent stages joined by small
+    queues, so backpressure from NIM or Postgres throttles the parser and only
+    a few batches of vectors are ever alive at once. Chunks are inserted as
+    soon as they are embedded, making the head of a document searchable while
+    its tail is still being processed.
+
+    Incremental mode: given the document's existing chunks, a chunk whose
+    content hash already exists keeps its row (and vector) and only has its
+    position metadata refreshed; whatever is left over afterwards has vanished
+    from the new revision (see vanished_ids).
+    """
+    def __init__(
+        self,
+        document_id: int,
+        user_id: str,
+        filename: str,
+        embed_batch_size: int = 50,
+        insert_batch_size: int = 50,
+        queue_depth: int = 4,
+        engine_tag: str = "docling-v2-nim",
+        on_progress: Optional[ProgressCallback] = None,
+        existing: Optional[List[Dict[str, Any]]] = None,
+    ):
+        self.document_id = document_id
+        self.user_id = user_id
+        self.filename = filename
+        self.embed_batch_size = embed_batch_size
+        self.insert_batch_size = insert_batch_size
+        self.queue_depth = queue_depth
+        self.engine_tag = engine_tag
+        self.on_progress = on_progress
+        self.stats = IngestStats()
+        # content_hash -> existing rows {id, metadata}; duplicates are matched one-to-one
+        self._reusable: Dict[str, List[Dict[str, Any]]] = {}
+        for row in existing or []:
+            # Legacy rows without a hash never match, so they count as vanished
+            self._reusable.setdefault(row.get("content_hash") or "", []).append(row)
+        self.metadata_updates: List[Tuple[int, Dict[str, Any]]] = []
+
+    async def run(self, sections: AsyncIterator[Section]) -> IngestStats:
+        chunk_q: asyncio.Queue = asyncio.Queue(maxsize=self.queue_depth)
+        row_q: asyncio.Queue = asyncio.Queue(maxsize=self.queue_depth)
+        tasks = [
+            asyncio.create_task(self._chunk_stage(sections, chunk_q)),
+            asyncio.create_task(self._embed_stage(chunk_q, row_q)),
+            asyncio.create_task(self._insert_stage(row_q)),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # One failed stage must not leave the others blocked on a full queue
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        return self.stats
+
+    async def _chunk_stage(self, sections: AsyncIterator[Section], out: asyncio.Queue) -> None:
+        pending: List[Dict[str, Any]] = []
+        async for page_no, markdown in sections:
+            self.stats.sections += 1
+            if page_no is not None:
+                self.stats.pages = max(self.stats.pages or 0, page_no)
+            for piece in await chunker.asplit_chunks(markdown):
+                chunk = {
+                    "index": self.stats.chunks, "page": page_no, "content": piece.text,
+                    "tokens": piece.tokens, "meta": piece.meta, "hash": content_hash(piece.text)
+                }
+                self.stats.chunks += 1
+                self.stats.tokens += piece.tokens
+                if piece.meta.get("resplit"):
+                    self.stats.resplit += 1
+                if self._reuse(chunk):
+                    continue
+                pending.append(chunk)
+                if len(pending) >= self.embed_batch_size:
+                    await out.put(pending)
+                    pending = []
+        if pending:
+            await out.put(pending)
+        await out.put(_DONE)
+
+    async def _embed_stage(self, inp: asyncio.Queue, out: asyncio.Queue) -> None:
+        while (batch := await inp.get()) is not _DONE:
+            # Token counts from the chunker drive NIM batch packing without re-tokenizing
+            vectors = await aget_embeddings([c["content"] for c in batch], "passage", [c["tokens"] for c in batch])
+            await out.put([self._row(c, v) for c, v in zip(batch, vectors)])
+        await out.put(_DONE)
+
+    async def _insert_stage(self, inp: asyncio.Queue) -> None:
+        while (rows := await inp.get()) is not _DONE:
+            for j in range(0, len(rows), self.insert_batch_size):
+                batch = rows[j : j + self.insert_batch_size]
+                await insert_chunk_rows(batch)
+                self.stats.inserted += len(batch)
+                if self.on_progress:
+                    await self.on_progress("streaming", asdict(self.stats))
+
+    def _reuse(self, chunk: Dict[str, Any]) -> bool:
+        candidates = self._reusable.get(chunk["hash"])
+        if not candidates:
+            return False
+        row = candidates.pop()
+        metadata = self._metadata(chunk)
+        if row.get("metadata") != metadata:
+            self.metadata_updates.append((row["id"], metadata))
+        self.stats.reused += 1
+        return True
+
+    @property
+    def vanished_ids(self) -> List[int]:
+        """Existing chunk ids not matched by the new revision (valid after run())."""
+        return [row["id"] for rows in self._reusable.values() for row in rows]
+
+    def _metadata(self, chunk: Dict[str, Any]) -> Dict[str, Any]:
+        metadata: Dict[str, Any] = {
+            "index": chunk["index"], "source": self.filename, "engine": self.engine_tag,
+            # Measured once by the chunker; returned by the search RPCs for context budgeting
+            "token_count": chunk["tokens"],
+        }
+        if chunk["page"] is not None:
+            metadata["page"] = chunk["page"]
+        # Table row groups carry {"table": n, "rows": [first, last]} (n counts tables on the page)
+        metadata.update(chunk.get("meta") or {})
+        return metadata
+
+    def _row(self, chunk: Dict[str, Any], vector: Any) -> Dict[str, Any]:
+        return {
+            "document_id": self.document_id, "user_id": self.user_id, "content": chunk["content"],
+            "content_hash": chunk["hash"], "embedding": to_pgvector(vector), "metadata": self._metadata(chunk)
+        }
+
+
+async def insert_chunk_rows(rows: List[Dict[str, Any]]) -> None:
+    if repo:
+        await repo.insert("document_chunks", rows)
+
+async def delete_document_chunks(document_id: int, after_id: int = 0) -> None:
+    """Rolls back a partially streamed document (only rows newer than after_id)."""
+    if repo:
+        await repo.delete("document_chunks", {"document_id": document_id, "id": ("gt", after_id)})
+
+async def fetch_chunk_fingerprints(document_id: int) -> List[Dict[str, Any]]:
+    """Existing chunks of a document without their vectors: {id, content_hash, metadata}."""
+    if not repo: return []
+    rows: List[Dict[str, Any]] = []
+    page_size = 1000 # PostgREST max-rows default
+    while True:
+        # Keyset pagination on id: each page is an index range scan, however deep
+        after = rows[-1]["id"] if rows else 0
+        page = await repo.select(
+            "document_chunks", "id, content_hash, metadata",
+            {"document_id": document_id, "id": ("gt", after)}, order="id", limit=page_size,
+        )
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+
+async def delete_chunks(chunk_ids: List[int]) -> None:
+    if not repo: return
+    for i in range(0, len(chunk_ids), 500):
+        await repo.delete("document_chunks", {"id": chunk_ids[i : i + 500]})
+
+async def update_chunk_metadata(updates: List[Tuple[int, Dict[str, Any]]]) -> None:
+    """Bulk position refresh for reused chunks (one RPC per 500 rows)."""
+    if not repo: return
+    for i in range(0, len(updates), 500):
+        part = updates[i : i + 500]
+        await repo.rpc("update_chunk_metadata", {
+            "chunk_ids": [chunk_id for chunk_id, _ in part],
+            "metadatas": [metadata for _, metadata in part],
+        })
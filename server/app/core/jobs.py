@@ -0,0 +1,343 @@
+import os
+import json
+import time
+import sqlite3
+import asyncio
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, cast
+
+from app.core.repository import repo
+
+# Job lifecycle: queued -> running -> done | (queued again with backoff) | failed
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+@dataclass
+class IngestJob:
+    id: int
+    user_id: str
+    filename: str
+    file_path: str
+    document_id: Optional[int] = None
+    status: str = QUEUED
+    stage: str = "queued"
+    progress: Dict[str, Any] = field(default_factory=dict)
+    attempts: int = 0
+    max_attempts: int = 3
+    error: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "IngestJob":
+        progress = row.get("progress") or {}
+        if isinstance(progress, str):
+            progress = json.loads(progress)
+        return cls(
+            id=int(row["id"]), user_id=row["user_id"], filename=row["filename"],
+            file_path=row["file_path"], document_id=row.get("document_id"),
+            status=row.get("status", QUEUED), stage=row.get("stage", "queued"),
+            progress=progress, attempts=int(row.get("attempts", 0)),
+            max_attempts=int(row.get("max_attempts", 3)), error=row.get("error"),
+        )
+
+    def public_view(self) -> Dict[str, Any]:
+        """Fields safe to return from /status (no server paths)."""
+        return {
+            "job_status": self.status, "stage": self.stage, "progress": self.progress,
+            "attempts": self.attempts, "max_attempts": self.max_attempts,
+        }
+
+
+# Error recorded on a job whose worker died on its final attempt (OOM kill, SIGKILL)
+LEASE_EXHAUSTED = "Lease expired on the final attempt (worker lost)"
+
+class JobQueue(ABC):
+    """
+    Durable Ingestion Queue contract.
+    Methods are coroutines: the SQLite queue runs its local file I/O in a thread,
+    the Supabase queue awaits the shared PostgREST pool.
+    A claimed job holds a lease renewed by report()/heartbeat(); a job whose
+    worker died is re-claimed once the lease expires, unless that was its last
+    attempt: claim() then fails it terminally and returns it with status FAILED
+    so the worker can finalize it (a poison PDF must not kill workers forever).
+    """
+    def __init__(self, lease_seconds: float = 120.0, retry_base_seconds: float = 5.0, retry_max_seconds: float = 300.0):
+        self.lease_seconds = lease_seconds
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+
+    def backoff(self, attempts: int) -> float:
+        """Exponential backoff: base, 2*base, 4*base ... capped."""
+        return min(self.retry_base_seconds * (2 ** max(attempts - 1, 0)), self.retry_max_seconds)
+
+    @abstractmethod
+    async def enqueue(self, user_id: str, filename: str, file_path: str,
+                document_id: Optional[int] = None, max_attempts: int = 3) -> IngestJob:
+        ...
+
+    @abstractmethod
+    async def claim(self, worker_id: str) -> Optional[IngestJob]:
+        """Leases the next due job (status RUNNING), or returns an exhausted orphan (status FAILED)."""
+
+    @abstractmethod
+    async def report(self, job_id: int, stage: str, progress: Optional[Dict[str, Any]] = None) -> None:
+        ...
+
+    @abstractmethod
+    async def heartbeat(self, job_id: int) -> None:
+        ...
+
+    @abstractmethod
+    async def complete(self, job_id: int) -> None:
+        ...
+
+    @abstractmethod
+    async def fail(self, job: IngestJob, error: str) -> bool:
+        """Records a failed attempt. Returns True when the job is terminally failed."""
+
+    @abstractmethod
+    async def latest(self, user_id: str, filename: str) -> Optional[IngestJob]:
+        ...
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Single-host queue on a local SQLite file (WAL). Shared safely between the
+    API process and worker processes; BEGIN IMMEDIATE serializes claims.
+    Also the implementation used in tests. Each call opens a short-lived
+    connection in a worker thread, keeping file locks off the event loop.
+    """
+    def __init__(self, path: str, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS ingest_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    document_id INTEGER,
+                    user_id TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    stage TEXT NOT NULL DEFAULT 'queued',
+                    progress TEXT NOT NULL DEFAULT '{}',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL DEFAULT 3,
+                    error TEXT,
+                    worker_id TEXT,
+                    run_after REAL NOT NULL,
+                    lease_until REAL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_claim ON ingest_jobs(status, run_after)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_owner ON ingest_jobs(user_id, filename)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    async def enqueue(self, user_id: str, filename: str, file_path: str,
+                      document_id: Optional[int] = None, max_attempts: int = 3) -> IngestJob:
+        return await asyncio.to_thread(self._enqueue, user_id, filename, file_path, document_id, max_attempts)
+
+    async def claim(self, worker_id: str) -> Optional[IngestJob]:
+        return await asyncio.to_thread(self._claim, worker_id)
+
+    async def report(self, job_id: int, stage: str, progress: Optional[Dict[str, Any]] = None) -> None:
+        await asyncio.to_thread(self._report, job_id, stage, progress)
+
+    async def heartbeat(self, job_id: int) -> None:
+        await asyncio.to_thread(self._heartbeat, job_id)
+
+    async def complete(self, job_id: int) -> None:
+        await asyncio.to_thread(self._complete, job_id)
+
+    async def fail(self, job: IngestJob, error: str) -> bool:
+        return await asyncio.to_thread(self._fail, job, error)
+
+    async def latest(self, user_id: str, filename: str) -> Optional[IngestJob]:
+        return await asyncio.to_thread(self._latest, user_id, filename)
+
+    def _enqueue(self, user_id: str, filename: str, file_path: str,
+                document_id: Optional[int] = None, max_attempts: int = 3) -> IngestJob:
+        now = time.time()
+        with self._connect() as conn:
+            cur = conn.execute(
+                "INSERT INTO ingest_jobs (document_id, user_id, filename, file_path, max_attempts, run_after, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (document_id, user_id, filename, file_path, max_attempts, now, now, now),
+            )
+            job_id = cast(int, cur.lastrowid)
+        return IngestJob(id=job_id, user_id=user_id, filename=filename, file_path=file_path,
+                         document_id=document_id, max_attempts=max_attempts)
+
+    def _claim(self, worker_id: str) -> Optional[IngestJob]:
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM ingest_jobs WHERE (status = ? AND run_after <= ?) OR (status = ? AND lease_until < ?) "
+                "ORDER BY run_after, id LIMIT 1",
+                (QUEUED, now, RUNNING, now),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            exhausted = row["status"] == RUNNING and row["attempts"] >= row["max_attempts"]
+            if exhausted:
+                conn.execute(
+                    "UPDATE ingest_jobs SET status = ?, stage = 'failed', error = ?, lease_until = NULL, updated_at = ? WHERE id = ?",
+                    (FAILED, LEASE_EXHAUSTED, now, row["id"]),
+                )
+            else:
+                conn.execute(
+                    "UPDATE ingest_jobs SET status = ?, stage = 'claimed', attempts = attempts + 1, worker_id = ?, "
+                    "lease_until = ?, updated_at = ? WHERE id = ?",
+                    (RUNNING, worker_id, now + self.lease_seconds, now, row["id"]),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        job = IngestJob.from_row(dict(row))
+        if exhausted:
+            job.status, job.stage, job.error = FAILED, "failed", LEASE_EXHAUSTED
+        else:
+            job.status, job.stage, job.attempts = RUNNING, "claimed", job.attempts + 1
+        return job
+
+    def _report(self, job_id: int, stage: str, progress: Optional[Dict[str, Any]] = None) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE ingest_jobs SET stage = ?, progress = ?, lease_until = ?, updated_at = ? WHERE id = ?",
+                (stage, json.dumps(progress or {}), now + self.lease_seconds, now, job_id),
+            )
+
+    def _heartbeat(self, job_id: int) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE ingest_jobs SET lease_until = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (now + self.lease_seconds, now, job_id, RUNNING),
+            )
+
+    def _complete(self, job_id: int) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE ingest_jobs SET status = ?, stage = 'done', error = NULL, lease_until = NULL, updated_at = ? WHERE id = ?",
+                (DONE, now, job_id),
+            )
+
+    def _fail(self, job: IngestJob, error: str) -> bool:
+        now = time.time()
+        terminal = job.attempts >= job.max_attempts
+        with self._connect() as conn:
+            if terminal:
+                conn.execute(
+                    "UPDATE ingest_jobs SET status = ?, stage = 'failed', error = ?, lease_until = NULL, updated_at = ? WHERE id = ?",
+                    (FAILED, error, now, job.id),
+                )
+            else:
+                conn.execute(
+                    "UPDATE ingest_jobs SET status = ?, stage = 'retry_scheduled', error = ?, run_after = ?, "
+                    "lease_until = NULL, updated_at = ? WHERE id = ?",
+                    (QUEUED, error, now + self.backoff(job.attempts), now, job.id),
+                )
+        return terminal
+
+    def _latest(self, user_id: str, filename: str) -> Optional[IngestJob]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM ingest_jobs WHERE user_id = ? AND filename = ? ORDER BY id DESC LIMIT 1",
+                (user_id, filename),
+            ).fetchone()
+        return IngestJob.from_row(dict(row)) if row else None
+
+
+class SupabaseJobQueue(JobQueue):
+    """
+    Multi-host queue on the `ingest_jobs` table (migrations/002_ingest_jobs.sql).
+    Claims go through the `claim_ingest_job` RPC (FOR UPDATE SKIP LOCKED), which
+    also fails exhausted orphans and errors their documents (migrations/010).
+    """
+    @staticmethod
+    def _require() -> None:
+        if not repo:
+            raise RuntimeError("Vault DB Offline")
+
+    @staticmethod
+    def _iso(offset_seconds: float = 0.0) -> str:
+        return time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(time.time() + offset_seconds))
+
+    async def enqueue(self, user_id: str, filename: str, file_path: str,
+                      document_id: Optional[int] = None, max_attempts: int = 3) -> IngestJob:
+        self._require()
+        rows = await repo.insert("ingest_jobs", {
+            "user_id": user_id, "filename": filename, "file_path": file_path,
+            "document_id": document_id, "max_attempts": max_attempts,
+        }, returning=True)
+        return IngestJob.from_row(rows[0])
+
+    async def claim(self, worker_id: str) -> Optional[IngestJob]:
+        if not repo:
+            return None
+        rows = await repo.rpc("claim_ingest_job", {"worker": worker_id, "lease_seconds": int(self.lease_seconds)})
+        return IngestJob.from_row(rows[0]) if rows else None
+
+    async def report(self, job_id: int, stage: str, progress: Optional[Dict[str, Any]] = None) -> None:
+        self._require()
+        await repo.update("ingest_jobs", {
+            "stage": stage, "progress": progress or {}, "lease_until": self._iso(self.lease_seconds)
+        }, {"id": job_id})
+
+    async def heartbeat(self, job_id: int) -> None:
+        self._require()
+        await repo.update("ingest_jobs", {"lease_until": self._iso(self.lease_seconds)}, {"id": job_id, "status": RUNNING})
+
+    async def complete(self, job_id: int) -> None:
+        self._require()
+        await repo.update("ingest_jobs", {"status": DONE, "stage": "done", "error": None, "lease_until": None}, {"id": job_id})
+
+    async def fail(self, job: IngestJob, error: str) -> bool:
+        self._require()
+        terminal = job.attempts >= job.max_attempts
+        if terminal:
+            patch = {"status": FAILED, "stage": "failed", "error": error, "lease_until": None}
+        else:
+            patch = {"status": QUEUED, "stage": "retry_scheduled", "error": error,
+                     "run_after": self._iso(self.backoff(job.attempts)), "lease_until": None}
+        await repo.update("ingest_jobs", patch, {"id": job.id})
+        return terminal
+
+    async def latest(self, user_id: str, filename: str) -> Optional[IngestJob]:
+        self._require()
+        rows = await repo.select("ingest_jobs", "*", {"user_id": user_id, "filename": filename}, order="id.desc", limit=1)
+        return IngestJob.from_row(rows[0]) if rows else None
+
+
+_queue: Optional[JobQueue] = None
+
+def get_job_queue() -> JobQueue:
+    """
+    INGEST_QUEUE=sqlite (default, single host) or supabase (multi-host workers).
+    The SQLite file lives next to the upload spool so API and workers share it.
+    """
+    global _queue
+    if _queue is None:
+        settings = {
+            "lease_seconds": float(os.getenv("INGEST_LEASE_SECONDS", "120")),
+            "retry_base_seconds": float(os.getenv("INGEST_RETRY_BASE_SECONDS", "5")),
+        }
+        if os.getenv("INGEST_QUEUE", "sqlite") == "supabase":
+            _queue = SupabaseJobQueue(**settings)
+        else:
+            _queue = SQLiteJobQueue(os.getenv("INGEST_QUEUE_PATH", "/tmp/axiom_ingest/jobs.sqlite"), **settings)
+    return _queue
@@ -1,15 +1,37 @@
+import os
+import threading
 import tiktoken
-from typing import List, Optional
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Sequence
+
+@dataclass
+class PackedContext:
+    text: str
+    included: List[int] = field(default_factory=list) # indices into the input, in input order
+    dropped: List[int] = field(default_factory=list)  # indices that did not fit
+    tokens: int = 0
+    budget: int = 0
 
 class ContextMonitor:
-    """SOTA Token Sentry V4.6. Enterprise-grade context truncation."""
+    """
+    SOTA Token Sentry V4.6. Enterprise-grade context truncation.
+    Token counts are memoized in a bounded LRU keyed by text; retrieval seeds
+    it with the counts the chunker stored at ingest time, so evidence that was
+    measured once is never re-encoded during context assembly.
+    """
     _instance: Optional["ContextMonitor"] = None
     encoder: Optional[tiktoken.Encoding] = None
-    LIMIT: int = 100000 
+    LIMIT: int = 100000
+    CACHE_SIZE: int = int(os.getenv("TOKEN_COUNT_CACHE_SIZE", "8192"))
+    _counts: "OrderedDict[str, int]"
+    _lock: threading.Lock
 
     def __new__(cls) -> "ContextMonitor":
         if cls._instance is None:
             cls._instance = super(ContextMonitor, cls).__new__(cls)
+            cls._instance._counts = OrderedDict()
+            cls._instance._lock = threading.Lock()
         return cls._instance
 
     def _lazy_init(self) -> None:
@@ -17,25 +39,87 @@ class ContextMonitor:
             print("AXIOM-CORE: Materializing Token Sentry...")
             self.encoder = tiktoken.get_encoding("cl100k_base")
 
+    def remember(self, text: str, tokens: int) -> None:
+        """Seeds the LRU with a count measured elsewhere (e.g. stored chunk metadata)."""
+        with self._lock:
+            self._counts[text] = tokens
+            self._counts.move_to_end(text)
+            while len(self._counts) > self.CACHE_SIZE:
+                self._counts.popitem(last=False)
+
     def count_tokens(self, text: str) -> int:
         if not text: return 0
+        with self._lock:
+            cached = self._counts.get(text)
+            if cached is not None:
+                self._counts.move_to_end(text)
+                return cached
         self._lazy_init()
-        return len(self.encoder.encode(text)) # type: ignore
+        tokens = len(self.encoder.encode(text)) # type: ignore
+        self.remember(text, tokens)
+        return tokens
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counts.clear()
 
     def guard_context(self, context_list: List[str]) -> str:
-        self._lazy_init()
         current_parts: List[str] = []
         total_tokens = 0
-        
+
         for chunk in context_list:
-            tokens = self.count_tokens(chunk) + 4 
+            tokens = self.count_tokens(chunk) + 4
             if total_tokens + tokens > self.LIMIT:
                 break
             current_parts.append(chunk)
             total_tokens += tokens
-        
+
         pressure = (total_tokens / self.LIMIT) * 100
         print(f"CONTEXT_PRESSURE: {pressure:.1f}% ({total_tokens} tokens)")
         return "\n\n".join(current_parts)
 
+    def pack_context(
+        self,
+        context_list: Sequence[str],
+        model: Any,
+        reserve_output: Optional[int] = None,
+        prompt_tokens: int = 0,
+        scores: Optional[Sequence[float]] = None,
+    ) -> PackedContext:
+        """
+        Budget-aware packing for one LLM call.
+        Budget = model.context_window - reserved output (default model.max_tokens)
+        - prompt_tokens (template, question, draft under review ...).
+        Items are visited best-score-first (default: input order, i.e. reranker
+        rank) and an item that does not fit is skipped rather than ending the
+        fill, so smaller high-value evidence behind it still gets in. Included
+        items keep their input order so exhibit numbering stays monotonic.
+        """
+        window = getattr(model, "context_window", None) or self.LIMIT
+        reserved = reserve_output if reserve_output is not None else getattr(model, "max_tokens", 0)
+        budget = max(window - reserved - prompt_tokens, 0)
+
+        order = range(len(context_list))
+        if scores is not None:
+            order = sorted(order, key=lambda i: scores[i], reverse=True) # type: ignore[assignment]
+
+        chosen: List[int] = []
+        dropped: List[int] = []
+        total = 0
+        for i in order:
+            tokens = self.count_tokens(context_list[i]) + 4 # separator overhead
+            if total + tokens > budget:
+                dropped.append(i)
+                continue
+            chosen.append(i)
+            total += tokens
+
+        chosen.sort()
+        pressure = (total / budget) * 100 if budget else 100.0
+        print(f"CONTEXT_PRESSURE: {pressure:.1f}% ({total}/{budget} tokens, {len(dropped)} dropped)")
+        return PackedContext(
+            text="\n\n".join(context_list[i] for i in chosen),
+            included=chosen, dropped=sorted(dropped), tokens=total, budget=budget,
+        )
+
 monitor = ContextMonitor()
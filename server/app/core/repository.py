@@ -0,0 +1,327 @@
+import os
+import asyncio
+import httpx
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+Row = Dict[str, Any]
+# Filter values: scalars become eq.<v>, lists become in.(...); a (op, value) tuple passes an explicit operator
+Filters = Dict[str, Any]
+
+class RepositoryError(RuntimeError):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(f"PostgREST {status_code}: {detail}")
+        self.status_code = status_code
+
+def _literal(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+def _in_list(values: Sequence[Any]) -> str:
+    # Quote every item: filenames may contain commas, dots or parentheses
+    quoted = ('"' + _literal(v).replace("\\", "\\\\").replace('"', '\\"') + '"' for v in values)
+    return f"in.({','.join(quoted)})"
+
+def _params(filters: Optional[Filters] = None, **extra: Any) -> httpx.QueryParams:
+    params = httpx.QueryParams({k: str(v) for k, v in extra.items() if v is not None})
+    for column, value in (filters or {}).items():
+        if isinstance(value, tuple):
+            params = params.add(column, f"{value[0]}.{_literal(value[1])}")
+        elif isinstance(value, (list, set)):
+            params = params.add(column, _in_list(list(value)))
+        else:
+            params = params.add(column, f"eq.{_literal(value)}")
+    return params
+
+
+class Repository:
+    """
+    Async Vault Repository (V4.6).
+    PostgREST over one shared HTTP/2 connection pool: request handlers await
+    the database directly instead of parking a default-executor thread per
+    call, so concurrency is bounded by the pool, not by the thread count.
+    Typed methods cover the queries the API actually runs; falsy when the
+    Supabase credentials are missing (same contract as `db`).
+    """
+    def __init__(
+        self,
+        url: Optional[str],
+        key: Optional[str],
+        max_connections: int = 100,
+        max_keepalive: int = 20,
+        timeout: float = 30.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self._base_url = f"{url.rstrip('/')}/rest/v1" if url and key else None
+        self._key = key
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.timeout = timeout
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def from_env(cls) -> "Repository":
+        return cls(
+            os.environ.get("SUPABASE_URL"),
+            os.environ.get("SUPABASE_SERVICE_KEY"),
+            max_connections=int(os.getenv("SUPABASE_MAX_CONNECTIONS", "100")),
+            max_keepalive=int(os.getenv("SUPABASE_MAX_KEEPALIVE", "20")),
+            timeout=float(os.getenv("SUPABASE_TIMEOUT_SECONDS", "30")),
+        )
+
+    def __bool__(self) -> bool:
+        return self._base_url is not None
+
+    # ------------------------------------------------------------------
+    # Transport
+    # ------------------------------------------------------------------
+
+    def _http(self) -> httpx.AsyncClient:
+        """Pool is created lazily and re-created if the running event loop changes (pools are loop-bound)."""
+        loop = asyncio.get_running_loop()
+        if self._client is not None and self._loop is loop:
+            return self._client
+        if self._client is not None:
+            self._discard_client()
+
+        self._client = httpx.AsyncClient(
+            http2=True,
+            transport=self._transport,
+            timeout=httpx.Timeout(self.timeout, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive,
+                keepalive_expiry=30.0,
+            ),
+            headers={
+                "apikey": self._key or "",
+                "Authorization": f"Bearer {self._key}",
+                "Content-Type": "application/json",
+            },
+        )
+        self._loop = loop
+        return self._client
+
+    def _discard_client(self) -> None:
+        """Closes a pool bound to another event loop on that loop, or drops it if the loop is gone."""
+        stale, stale_loop = self._client, self._loop
+        self._client, self._loop = None, None
+        if stale is not None and stale_loop is not None and stale_loop.is_running() and not stale_loop.is_closed():
+            asyncio.run_coroutine_threadsafe(stale.aclose(), stale_loop)
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[httpx.QueryParams] = None,
+        json: Any = None,
+        prefer: Optional[str] = None,
+    ) -> httpx.Response:
+        if self._base_url is None:
+            raise RepositoryError(503, "Supabase credentials missing")
+        headers = {"Prefer": prefer} if prefer else None
+        response = await self._http().request(method, f"{self._base_url}/{path}", params=params, json=json, headers=headers)
+        if response.status_code >= 400:
+            raise RepositoryError(response.status_code, response.text)
+        return response
+
+    async def aclose(self) -> None:
+        """Releases the HTTP/2 pool (called at lifespan / worker shutdown)."""
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
+
+    # ------------------------------------------------------------------
+    # PostgREST verbs
+    # ------------------------------------------------------------------
+
+    async def select(
+        self,
+        table: str,
+        columns: str,
+        filters: Optional[Filters] = None,
+        order: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Row]:
+        """order is "column" or "column.desc"."""
+        response = await self._request("GET", table, _params(filters, select=columns, order=order, limit=limit))
+        return response.json()
+
+    async def count(self, table: str, filters: Optional[Filters] = None) -> int:
+        response = await self._request("HEAD", table, _params(filters, select="id"), prefer="count=exact")
+        total = response.headers.get("content-range", "*/0").rsplit("/", 1)[-1]
+        return int(total) if total.isdigit() else 0
+
+    async def insert(self, table: str, rows: Any, returning: bool = False) -> List[Row]:
+        response = await self._request(
+            "POST", table, json=rows, prefer="return=representation" if returning else "return=minimal"
+        )
+        return response.json() if returning else []
+
+    async def update(self, table: str, fields: Row, filters: Filters, returning: bool = False) -> List[Row]:
+        response = await self._request(
+            "PATCH", table, _params(filters), json=fields, prefer="return=representation" if returning else "return=minimal"
+        )
+        return response.json() if returning else []
+
+    async def delete(self, table: str, filters: Filters) -> None:
+        await self._request("DELETE", table, _params(filters), prefer="return=minimal")
+
+    async def rpc(self, function: str, args: Row) -> Any:
+        response = await self._request("POST", f"rpc/{function}", json=args)
+        return response.json()
+
+    # ------------------------------------------------------------------
+    # Documents
+    # ------------------------------------------------------------------
+
+    async def latest_document(self, user_id: str, filename: Optional[str] = None, columns: str = "id") -> Optional[Row]:
+        filters: Filters = {"user_id": user_id}
+        if filename is not None:
+            filters["filename"] = filename
+        rows = await self.select("documents", columns, filters, order="created_at.desc", limit=1)
+        return rows[0] if rows else None
+
+    async def document_id(self, user_id: str, filename: str) -> Optional[int]:
+        row = await self.latest_document(user_id, filename)
+        return int(row["id"]) if row else None
+
+    async def list_documents(self, user_id: str, limit: int, columns: str = "filename, status, created_at") -> List[Row]:
+        return await self.select("documents", columns, {"user_id": user_id}, order="created_at.desc", limit=limit)
+
+    async def documents_named(self, user_id: str, filenames: Sequence[str]) -> List[Row]:
+        return await self.select("documents", "id, filename", {"user_id": user_id, "filename": list(filenames)})
+
+    async def indexed_documents_with_hash(self, user_id: str, file_hash: str, limit: int = 20) -> List[Row]:
+        return await self.select(
+            "documents", "id, filename",
+            {"user_id": user_id, "file_hash": file_hash, "status": "indexed"},
+            order="created_at.desc", limit=limit,
+        )
+
+    async def insert_document(self, row: Row) -> Optional[int]:
+        rows = await self.insert("documents", row, returning=True)
+        return int(rows[0]["id"]) if rows else None
+
+    async def update_document(self, document_id: int, fields: Row) -> None:
+        await self.update("documents", fields, {"id": document_id})
+
+    async def acquire_document(self, document_id: int, fields: Row) -> bool:
+        """
+        Applies fields unless the document is mid-ingestion (one conditional
+        UPDATE, so two uploads cannot both win). False when another run holds it.
+        """
+        rows = await self.update("documents", fields, {"id": document_id, "status": ("neq", "processing")}, returning=True)
+        return bool(rows)
+
+    async def update_documents_named(self, user_id: str, filename: str, fields: Row) -> None:
+        await self.update("documents", fields, {"user_id": user_id, "filename": filename})
+
+    async def delete_documents_named(self, user_id: str, filename: str) -> None:
+        await self.delete("documents", {"user_id": user_id, "filename": filename})
+
+    async def clone_document_chunks(self, source_id: int, target_id: int) -> int:
+        cloned = await self.rpc("clone_document_chunks", {"source_document_id": source_id, "target_document_id": target_id})
+        return int(cloned or 0)
+
+    async def document_counts(self, document_id: int) -> Optional[Row]:
+        """Sizes written when ingestion completes (migration 009)."""
+        rows = await self.select("documents", "chunk_count, token_count, page_count", {"id": document_id}, limit=1)
+        return rows[0] if rows else None
+
+    async def count_chunks(self, document_id: Optional[int] = None, user_id: Optional[str] = None) -> int:
+        filters: Filters = {}
+        if document_id is not None: filters["document_id"] = document_id
+        if user_id is not None: filters["user_id"] = user_id
+        return await self.count("document_chunks", filters)
+
+    # ------------------------------------------------------------------
+    # Retrieval
+    # ------------------------------------------------------------------
+
+    async def hybrid_vault_search(self, query_text: str, embedding: str, match_count: int, user_id: str) -> List[Row]:
+        return await self.rpc("hybrid_vault_search", {
+            "query_text": query_text,
+            "query_embedding": embedding,
+            "match_count": match_count,
+            "target_user_id": user_id,
+        })
+
+    async def match_multi_document_chunks(
+        self, embedding: str, match_limit: int, document_ids: Sequence[int], user_id: str
+    ) -> List[Row]:
+        return await self.rpc("match_multi_document_chunks", {
+            "query_embedding": embedding,
+            "match_limit": match_limit,
+            "target_document_ids": list(document_ids),
+            "target_user_id": user_id,
+        })
+
+    async def corpus_version(self, user_id: str) -> int:
+        rows = await self.select("corpus_versions", "version", {"user_id": user_id}, limit=1)
+        return int(rows[0]["version"]) if rows else 0
+
+    # ------------------------------------------------------------------
+    # Chat memory & audit logs
+    # ------------------------------------------------------------------
+
+    async def recent_messages(
+        self, document_id: int, limit: int, user_id: Optional[str] = None, columns: str = "role, content"
+    ) -> List[Row]:
+        """Newest first."""
+        filters: Filters = {"document_id": document_id}
+        if user_id is not None:
+            filters["user_id"] = user_id
+        return await self.select("chat_messages", columns, filters, order="created_at.desc", limit=limit)
+
+    async def user_telemetry(self, user_id: str) -> Optional[Row]:
+        """Trigger-maintained counters, rolling blocked count and metric averages (migrations 008, 011)."""
+        rows = await self.select(
+            "user_telemetry",
+            "documents, permanent_documents, chunks, blocked, faithfulness, precision, relevance, latency",
+            {"user_id": user_id}, limit=1,
+        )
+        return rows[0] if rows else None
+
+    # ------------------------------------------------------------------
+    # API keys
+    # ------------------------------------------------------------------
+
+    async def find_api_key(self, key_hash: str) -> Optional[Row]:
+        rows = await self.select("api_keys", "user_id, is_active", {"key_value": key_hash}, limit=1)
+        return rows[0] if rows else None
+
+    async def touch_api_key(self, key_hash: str) -> None:
+        await self.update("api_keys", {"last_used_at": datetime.utcnow().isoformat()}, {"key_value": key_hash})
+
+    async def create_api_key(self, user_id: str, name: str, key_hash: str, key_hint: str) -> None:
+        await self.insert("api_keys", {"user_id": user_id, "name": name, "key_value": key_hash, "key_hint": key_hint})
+
+    async def list_api_keys(self, user_id: str) -> List[Row]:
+        return await self.select(
+            "api_keys", "id, name, created_at, last_used_at, is_active, key_hint",
+            {"user_id": user_id}, order="created_at.desc",
+        )
+
+    async def revoke_api_key(self, user_id: str, key_id: str) -> None:
+        await self.update("api_keys", {"is_active": False}, {"id": key_id, "user_id": user_id})
+
+    # ------------------------------------------------------------------
+    # Structured datasets
+    # ------------------------------------------------------------------
+
+    async def replace_dataset(self, user_id: str, dataset_name: str, columns: List[str], data: List[Row]) -> None:
+        await self.delete("user_datasets", {"user_id": user_id, "dataset_name": dataset_name})
+        await self.insert("user_datasets", {"user_id": user_id, "dataset_name": dataset_name, "columns": columns, "data": data})
+
+    async def get_dataset(self, user_id: str, dataset_name: str) -> Optional[Row]:
+        rows = await self.select("user_datasets", "columns, data", {"user_id": user_id, "dataset_name": dataset_name}, limit=1)
+        return rows[0] if rows else None
+
+
+# Singleton Instance (one pool per process; SUPABASE_MAX_CONNECTIONS bounds in-flight queries)
+repo = Repository.from_env()
@@ -1,8 +1,19 @@
 import os
 import asyncio
-from typing import List, Optional
+from dataclasses import replace
+from typing import Any, List, Optional, Sequence
 from langchain_nvidia_ai_endpoints import NVIDIARerank
 from langchain_core.documents import Document
+from app.core.exhibits import Evidence, Exhibit
+
+def _text(doc: Evidence) -> str:
+    # Exhibits are scored on their content, not on the citation envelope
+    return doc.content if isinstance(doc, Exhibit) else doc
+
+def _scored(doc: Evidence, score: Any) -> Evidence:
+    if isinstance(doc, Exhibit) and score is not None:
+        return replace(doc, score=float(score))
+    return doc
 
 class AxiomReranker:
     """
@@ -35,25 +46,29 @@ class AxiomReranker:
         else:
             self._client.top_n = top_k
 
-    async def rerank(self, query: str, documents: List[str], top_k: int = 10) -> List[str]:
+    async def rerank(self, query: str, documents: Sequence[Evidence], top_k: int = 10) -> List[Evidence]:
         if not documents: return []
-        if len(documents) <= top_k: return documents
+        if len(documents) <= top_k: return list(documents)
             
         self._lazy_init(top_k=top_k)
         
-        def perform_rerank() -> List[str]:
-            if not self._client: return documents[:top_k]
-            lc_docs = [Document(page_content=txt) for txt in documents]
+        def perform_rerank() -> List[Evidence]:
+            if not self._client: return list(documents[:top_k])
+            lc_docs = [Document(page_content=_text(doc), metadata={"position": i}) for i, doc in enumerate(documents)]
             compressed_docs = self._client.compress_documents(query=query, documents=lc_docs)
-            return [doc.page_content for doc in compressed_docs]
+            # Map back to the original evidence, keeping the relevance score on Exhibits
+            return [
+                _scored(documents[doc.metadata["position"]], doc.metadata.get("relevance_score"))
+                for doc in compressed_docs
+            ]
 
         try:
             return await asyncio.to_thread(perform_rerank)
         except Exception as e:
             print(f"⚠️ RERANKER FAILSAFE: {e}")
-            return documents[:top_k]
+            return list(documents[:top_k])
 
 _reranker_instance = AxiomReranker()
 
-async def get_reranked_scores(query: str, documents: List[str], top_k: int = 10) -> List[str]:
+async def get_reranked_scores(query: str, documents: Sequence[Evidence], top_k: int = 10) -> List[Evidence]:
     return await _reranker_instance.rerank(query, documents, top_k=top_k)
@@ -0,0 +1,70 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple, Union
+
+from app.core.exhibits import Exhibit
+
+CacheKey = Tuple[str, str, Tuple[str, ...], int]
+
+class RetrievalCache:
+    """
+    Corpus-Versioned Retrieval Cache (V4.6).
+    Maps (user_id, normalized query, filenames, limit) to the Exhibits that
+    hybrid_search returned. Each entry remembers the user's corpus version at
+    search time (bumped by database triggers on ingest, delete and save), so a
+    hit is only served while the vault is unchanged: repeat audits skip both
+    the NIM embedding call and the Postgres RPC. The TTL is a backstop only.
+    """
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lru: "OrderedDict[CacheKey, Tuple[int, float, List[Exhibit]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(
+        user_id: str, query: str, filename: Optional[Union[str, Sequence[str]]], limit: int
+    ) -> CacheKey:
+        normalized = " ".join(query.split()).lower()
+        if not filename or filename in ("vault", ["vault"]):
+            files: Tuple[str, ...] = ()
+        elif isinstance(filename, str):
+            files = (filename,)
+        else:
+            files = tuple(sorted(set(filename)))
+        return (user_id, normalized, files, limit)
+
+    def get(self, key: CacheKey, version: int) -> Optional[List[Exhibit]]:
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None:
+                cached_version, stored_at, exhibits = entry
+                if cached_version == version and time.monotonic() - stored_at < self.ttl_seconds:
+                    self._lru.move_to_end(key)
+                    self.hits += 1
+                    return list(exhibits)
+                del self._lru[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: CacheKey, version: int, exhibits: Sequence[Exhibit]) -> None:
+        with self._lock:
+            self._lru[key] = (version, time.monotonic(), list(exhibits))
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._lru.clear()
+
+
+# Singleton Instance (RETRIEVAL_CACHE_SIZE=0 disables caching)
+retrieval_cache = RetrievalCache(
+    max_entries=int(os.getenv("RETRIEVAL_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("RETRIEVAL_CACHE_TTL_SECONDS", "3600")),
+)
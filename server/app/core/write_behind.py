@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core.repository import RepositoryError, repo
+
+Row = Dict[str, Any]
+Sink = Callable[[str, List[Row]], Awaitable[Any]]
+
+def _rejected(error: Exception) -> bool:
+    """A 4xx from PostgREST (FK/NOT NULL/check violation) will fail on every retry; 408/429 are transient."""
+    return isinstance(error, RepositoryError) and 400 <= error.status_code < 500 and error.status_code not in (408, 429)
+
+class WriteBehindBuffer:
+    """
+    Write-Behind Persistence Buffer (V4.6).
+    Request handlers `add()` rows and return immediately; a background flusher
+    coalesces rows across requests into one bulk INSERT per table (and column
+    set), triggered by batch size or by time. The buffer is bounded: overflow
+    and batches that hit transport/5xx errors are appended to a local JSONL
+    spill file, which is replayed once the database accepts writes again.
+    Rows the database rejects outright (4xx) are isolated by bisection and
+    dropped, so they never hold valid rows hostage. Flushed on shutdown.
+    """
+    def __init__(
+        self,
+        sink: Sink,
+        batch_rows: int = 100,
+        flush_seconds: float = 1.0,
+        max_rows: int = 5000,
+        spill_path: Optional[str] = None,
+        replay_seconds: float = 30.0,
+    ):
+        self._sink = sink
+        self.batch_rows = batch_rows
+        self.flush_seconds = flush_seconds
+        self.max_rows = max_rows
+        self.spill_path = spill_path
+        self.replay_seconds = replay_seconds
+        self.flushed = 0
+        self.spilled = 0
+        self.dropped = 0
+        self._rows: List[Tuple[str, Row]] = []
+        self._overflow: List[Tuple[str, Row]] = []
+        self._next_replay = 0.0
+        self._closing = False
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def start(self) -> None:
+        """Starts the flusher on the running loop (idempotent; add() also calls it)."""
+        loop = asyncio.get_running_loop()
+        if self._task is not None and self._loop is loop and not self._task.done():
+            return
+        self._loop = loop
+        self._closing = False
+        self._wake = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task = loop.create_task(self._run())
+
+    def add(self, table: str, row: Row) -> None:
+        """Queues one row; never awaits the database."""
+        self.start()
+        if len(self._rows) >= self.max_rows:
+            # Database slower than traffic: the flusher moves overflow to disk (no file I/O on the loop)
+            self._overflow.append((table, row))
+            if self._wake is not None:
+                self._wake.set()
+            return
+        self._rows.append((table, row))
+        if len(self._rows) >= self.batch_rows and self._wake is not None:
+            self._wake.set()
+
+    async def _run(self) -> None:
+        assert self._wake is not None
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"⚠️ WRITE-BEHIND FLUSHER ERROR: {e}")
+
+    async def flush(self) -> None:
+        if self._lock is None:
+            self.start()
+        assert self._lock is not None
+        async with self._lock:
+            overflow, self._overflow = self._overflow, []
+            if overflow:
+                await asyncio.to_thread(self._spill, overflow)
+            rows, self._rows = self._rows, []
+            failed = await self._write(rows) if rows else []
+            if failed:
+                await asyncio.to_thread(self._spill, failed)
+                self._next_replay = time.monotonic() + self.replay_seconds
+            elif time.monotonic() >= self._next_replay:
+                await self._replay()
+
+    async def _write(self, rows: List[Tuple[str, Row]]) -> List[Tuple[str, Row]]:
+        """Bulk-inserts rows grouped by table and column set; returns the rows to spill."""
+        groups: Dict[Tuple[str, Tuple[str, ...]], List[Row]] = {}
+        for table, row in rows:
+            groups.setdefault((table, tuple(sorted(row))), []).append(row)
+
+        failed: List[Tuple[str, Row]] = []
+        for (table, _), group in groups.items():
+            for i in range(0, len(group), self.batch_rows):
+                part = group[i : i + self.batch_rows]
+                if failed:
+                    # Database unreachable: spill the rest without stacking timeouts
+                    failed.extend((table, row) for row in part)
+                    continue
+                failed.extend((table, row) for row in await self._insert(table, part))
+        return failed
+
+    async def _insert(self, table: str, rows: List[Row]) -> List[Row]:
+        """
+        Writes one bulk INSERT. A rejected batch is bisected until the offending
+        rows are isolated and dropped; returns the rows left unwritten by a
+        transient failure (the first one stops the bisection).
+        """
+        try:
+            await self._sink(table, rows)
+            self.flushed += len(rows)
+            return []
+        except Exception as e:
+            if not _rejected(e):
+                print(f"⚠️ WRITE-BEHIND FLUSH FAILED ({table}, {len(rows)} rows): {e}")
+                return rows
+            if len(rows) == 1:
+                print(f"❌ WRITE-BEHIND DROPPED 1 {table} row rejected by the database: {e}")
+                self.dropped += 1
+                return []
+
+        mid = len(rows) // 2
+        unwritten = await self._insert(table, rows[:mid])
+        if unwritten:
+            return unwritten + rows[mid:]
+        return await self._insert(table, rows[mid:])
+
+    def _spill(self, rows: List[Tuple[str, Row]]) -> None:
+        if not self.spill_path:
+            print(f"❌ WRITE-BEHIND DROPPED {len(rows)} rows (no spill file configured)")
+            return
+        os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+        with open(self.spill_path, "a", encoding="utf-8") as f:
+            for table, row in rows:
+                f.write(json.dumps({"table": table, "row": row}, default=str) + "\n")
+        self.spilled += len(rows)
+
+    def _take_spill(self) -> List[Tuple[str, Row]]:
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return []
+        replaying = f"{self.spill_path}.replay"
+        os.replace(self.spill_path, replaying)
+        with open(replaying, encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        os.remove(replaying)
+        return [(entry["table"], entry["row"]) for entry in entries]
+
+    async def _replay(self) -> None:
+        """Caller holds the lock. Re-sends spilled rows; whatever still fails is spilled again."""
+        rows = await asyncio.to_thread(self._take_spill)
+        if not rows:
+            return
+        print(f"AXIOM-CORE: Replaying {len(rows)} spilled rows.")
+        failed = await self._write(rows)
+        if failed:
+            await asyncio.to_thread(self._spill, failed)
+            self._next_replay = time.monotonic() + self.replay_seconds
+
+    async def aclose(self) -> None:
+        """Stops the flusher after its in-flight flush, then writes (or spills) what is left."""
+        if self._task is not None and self._wake is not None:
+            self._closing = True
+            self._wake.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._rows or self._overflow:
+            await self.flush()
+
+
+# Singleton Instance (chat memory + audit logs from /verify)
+write_behind = WriteBehindBuffer(
+    sink=lambda table, rows: repo.insert(table, rows),
+    batch_rows=int(os.getenv("WRITE_BEHIND_BATCH_ROWS", "100")),
+    flush_seconds=float(os.getenv("WRITE_BEHIND_FLUSH_SECONDS", "1.0")),
+    max_rows=int(os.getenv("WRITE_BEHIND_MAX_ROWS", "5000")),
+    spill_path=os.getenv("WRITE_BEHIND_SPILL_PATH", "/tmp/axiom_ingest/write_behind.jsonl"),
+)
@@ -26,6 +26,7 @@ class LLMConfig(BaseModel):
     temperature: float = Field(0.0, ge=0.0, le=2.0)
     top_p: float = Field(0.95, ge=0.0, le=1.0)
     max_tokens: int = Field(4096, gt=0, le=32768)
+    context_window: int = Field(131072, gt=0, description="Total prompt + completion tokens the model accepts")
     response_format: Optional[Literal["json_object"]] = None
     thinking: bool = False
 
@@ -9,6 +9,7 @@ import nest_asyncio
 nest_asyncio.apply()
 
 import time
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
@@ -16,14 +17,31 @@ from fastapi.middleware.gzip import GZipMiddleware
 
 # Axiom Core Imports
 from app.api import ingest, run, history, vault, keys 
-from app.core.database import db
+from app.core.repository import repo
+from app.core import background
+from app.core.write_behind import write_behind
+from app.core.embedding_cache import embedding_cache
+from app.core.embeddings import _engine as embedding_engine
+from app import worker as ingest_worker
 
 # --- SOTA: Lifespan Management ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("AXIOM_CORE: Logic Core Initialized. Dependencies Warm.")
     print("AXIOM_CORE: LangSmith Telemetry Active." if os.getenv("LANGCHAIN_TRACING_V2") == "true" else "AXIOM_CORE: Telemetry Offline.")
+    # Single-container deploys (HF Spaces) run the ingestion pool alongside the API;
+    # docker-compose runs it as its own service with INGEST_WORKER_MODE=external
+    workers = [] if os.getenv("INGEST_WORKER_MODE") == "external" else ingest_worker.start_pool(int(os.getenv("INGEST_WORKERS", "1")))
+    supervisor = asyncio.create_task(ingest_worker.supervise_pool(workers)) if workers else None
+    write_behind.start()
     yield
+    if supervisor is not None:
+        supervisor.cancel()
+    ingest_worker.stop_pool(workers)
+    await background.drain()
+    await write_behind.aclose()
+    await embedding_engine.aclose()
+    await repo.aclose()
     print("AXIOM_CORE: System Offboarding Complete.")
 
 app = FastAPI(
@@ -72,12 +90,13 @@ app.include_router(keys.router, prefix="/api/v1/keys", tags=["API Keys"])
 # --- System Health Monitoring ---
 @app.get("/health")
 async def health_check():
-    db_status = "online" if db else "offline"
+    db_status = "online" if repo else "offline"
     return {
         "status": "operational",
         "version": "4.6.0",
         "vault_link": db_status,
         "engine": "Axiom Sovereign V4.6",
         "architect": "meta/llama-3.3-70b-instruct",
-        "vector_core": "nvidia/llama-nemotron-embed-1b-v2"
+        "vector_core": "nvidia/llama-nemotron-embed-1b-v2",
+        "embedding_cache": embedding_cache.stats()
     }
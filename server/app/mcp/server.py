@@ -15,6 +15,7 @@ load_dotenv(ENV_PATH)
 from app.agents.graph import app_graph
 from app.agents.state import AgentState  # CRITICAL: For MyPy type safety
 from app.core.retriever import hybrid_search
+from app.core.exhibits import render_all
 from app.skills.github import execute_github_audit
 from app.skills.database import upload_local_csv_to_vault, execute_dataset_audit
 
@@ -64,7 +65,7 @@ async def search_axiom_vault(
     """Performs a high-speed hybrid vector search."""
     try:
         results = await hybrid_search(query=query, user_id=SYSTEM_USER, filename=filenames)
-        return "\n\n".join(results) if results else "No evidence found."
+        return "\n\n".join(render_all(results)) if results else "No evidence found."
     except Exception as e:
         return f"Retrieval Error: {str(e)}"
 
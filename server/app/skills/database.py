@@ -2,12 +2,13 @@ import os
 import json
 import asyncio
 import pandas as pd
-from typing import List, Dict, Any, cast
+from typing import List
 
-from app.core.database import db
+from app.core.repository import repo
 from app.agents.graph import app_graph
 from app.agents.state import AgentState
 from app.core.retriever import hybrid_search
+from app.core.exhibits import Evidence
 
 # ==========================================
 # 1. SKILL-SPECIFIC PROMPT ADAPTERS
@@ -36,7 +37,7 @@ async def upload_local_csv_to_vault(
     system_user: str
 ) -> str:
     """Reads a local CSV and securely uploads it to the user's JSONB vault."""
-    if not db:
+    if not repo:
         return "CRITICAL ERROR: Database offline."
     
     if not os.path.exists(file_path):
@@ -51,22 +52,7 @@ async def upload_local_csv_to_vault(
         columns, records = await asyncio.to_thread(parse_csv)
         
         # 2. Non-blocking Database ops
-        await asyncio.to_thread(
-            lambda: db.table("user_datasets")
-            .delete()
-            .eq("user_id", system_user)
-            .eq("dataset_name", dataset_name)
-            .execute()
-        )
-        
-        await asyncio.to_thread(
-            lambda: db.table("user_datasets").insert({
-                "user_id": system_user,
-                "dataset_name": dataset_name,
-                "columns": columns,
-                "data": records
-            }).execute()
-        )
+        await repo.replace_dataset(system_user, dataset_name, columns, records)
         
         return f"SUCCESS: Ingested {len(records)} rows into dataset '{dataset_name}'."
         
@@ -81,24 +67,17 @@ async def execute_dataset_audit(
     system_user: str
 ) -> str:
     """Pulls live JSONB data and cross-references it with PDF context."""
-    if not db:
+    if not repo:
         return "CRITICAL ERROR: Database offline."
     
     try:
         # 1. Non-blocking fetch
-        res = await asyncio.to_thread(
-            lambda: db.table("user_datasets")
-            .select("columns, data")
-            .eq("user_id", system_user)
-            .eq("dataset_name", dataset_name)
-            .execute()
-        )
-        rows = cast(List[Dict[str, Any]], res.data)
+        dataset = await repo.get_dataset(system_user, dataset_name)
         
-        if not rows:
+        if not dataset:
             return f"Dataset '{dataset_name}' not found. Upload it first."
             
-        dataset_content = json.dumps(rows[0]["data"][:500], indent=2)
+        dataset_content = json.dumps(dataset["data"][:500], indent=2)
         
         # 2. Formatting
         formatted_query = DATASET_QUERY_WRAPPER.format(
@@ -111,7 +90,7 @@ async def execute_dataset_audit(
         
         # 3. PDF Retrieval
         pdf_context = await hybrid_search(query=audit_query, user_id=system_user, filename=vault_filenames) if vault_filenames else []
-        all_context = pdf_context + [db_exhibit]
+        all_context: List[Evidence] = [*pdf_context, db_exhibit]
         
         # 4. Strictly Typed State
         # Skip the Librarian's hybrid_search since documents are pre-loaded.
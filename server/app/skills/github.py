@@ -2,6 +2,7 @@ import os
 from typing import List
 from app.agents.graph import app_graph
 from app.core.retriever import hybrid_search
+from app.core.exhibits import Evidence
 from app.agents.state import AgentState
 
 # --- PROMPT ADAPTERS ---
@@ -53,7 +54,7 @@ async def execute_github_audit(
         ) if vault_filenames else []
 
         # 3. Merge Local Code with Cloud PDFs into the context stream
-        all_context = pdf_context + [code_exhibit]
+        all_context: List[Evidence] = [*pdf_context, code_exhibit]
         
         # 4. Initialize State for V4.6 Graph (Strictly Typed)
         # Skip the Librarian's hybrid_search since documents are pre-loaded.
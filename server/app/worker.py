@@ -0,0 +1,206 @@
+"""
+Axiom Ingestion Worker Pool (V4.6).
+Separate processes that claim jobs from the durable queue (app.core.jobs),
+run the ingestion pipeline and retry failures with exponential backoff.
+
+Standalone:  python -m app.worker            (INGEST_WORKERS processes)
+Embedded:    started by the API lifespan unless INGEST_WORKER_MODE=external
+Either way, workers that exit are respawned by their parent.
+"""
+import os
+import socket
+import signal
+import asyncio
+import threading
+import multiprocessing as mp
+from multiprocessing.connection import wait as wait_for_exit
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from app.core.jobs import FAILED, IngestJob, JobQueue, get_job_queue
+
+# Consecutive loop errors back off up to this; exited workers are checked for at this interval
+ERROR_BACKOFF_CAP_SECONDS = 60.0
+SUPERVISE_SECONDS = float(os.getenv("INGEST_SUPERVISE_SECONDS", "5"))
+
+
+async def run_job(queue: JobQueue, job: IngestJob) -> None:
+    """Runs one claimed job; the lease is renewed while the pipeline works."""
+    from app.api.ingest import process_document
+
+    async def report(stage: str, progress: Dict[str, Any]) -> None:
+        await queue.report(job.id, stage, progress)
+
+    async def keep_lease() -> None:
+        while True:
+            await asyncio.sleep(queue.lease_seconds / 3)
+            try:
+                await queue.heartbeat(job.id)
+            except Exception as e:
+                # Two more renewals fit in the lease; a blip must not kill the renewer
+                print(f"⚠️ JOB {job.id} heartbeat failed: {e}")
+
+    print(f"AXIOM-CORE: Job {job.id} claimed ({job.filename}, attempt {job.attempts}/{job.max_attempts})")
+    lease = asyncio.create_task(keep_lease())
+    try:
+        await process_document(job.file_path, job.filename, job.user_id, document_id=job.document_id, on_progress=report)
+    except Exception as e:
+        # Bookkeeping is best-effort: if the queue is unreachable the lease
+        # expires and the job is re-claimed, so the upload must stay on disk
+        try:
+            terminal = await queue.fail(job, str(e))
+        except Exception as err:
+            print(f"⚠️ JOB {job.id} FAILED ({e}) and could not be recorded, left to lease expiry: {err}")
+            return
+        if terminal:
+            print(f"❌ JOB {job.id} FAILED PERMANENTLY: {e}")
+            await _mark_error(job)
+            _discard(job.file_path)
+        else:
+            # Keep the upload on disk for the next attempt; the document stays "processing"
+            print(f"⚠️ JOB {job.id} FAILED (attempt {job.attempts}), retry in {queue.backoff(job.attempts):.0f}s: {e}")
+    else:
+        try:
+            await queue.complete(job.id)
+        except Exception as err:
+            print(f"⚠️ JOB {job.id} done but could not be recorded, left to lease expiry: {err}")
+            return
+        _discard(job.file_path)
+    finally:
+        lease.cancel()
+
+
+async def abandon_job(job: IngestJob) -> None:
+    """Finalizes a job the queue failed on claim (its worker died on the last attempt)."""
+    print(f"❌ JOB {job.id} FAILED PERMANENTLY: {job.error} ({job.filename}, {job.attempts}/{job.max_attempts} attempts)")
+    await _mark_error(job)
+    _discard(job.file_path)
+
+
+async def _mark_error(job: IngestJob) -> None:
+    from app.api.ingest import mark_document_error
+
+    try:
+        await mark_document_error(job.document_id, job.filename, job.user_id)
+    except Exception as e:
+        # The job is already terminal in the queue; the document row just keeps its stale status
+        print(f"⚠️ JOB {job.id} could not mark document {job.document_id} as errored: {e}")
+
+
+def _discard(file_path: str) -> None:
+    if os.path.exists(file_path): os.remove(file_path)
+
+
+async def worker_loop(worker_id: str, poll_interval: float = 1.0, stop: Optional[asyncio.Event] = None) -> None:
+    from app.core.embeddings import _engine as embedding_engine
+    from app.core.conversion import conversion_pool
+    from app.core.repository import repo
+
+    queue = get_job_queue()
+    conversion_pool.start()
+    print(f"AXIOM-CORE: Ingestion worker {worker_id} online.")
+    errors = 0
+    try:
+        while not (stop and stop.is_set()):
+            try:
+                job = await queue.claim(worker_id)
+                if job is None:
+                    await asyncio.sleep(poll_interval)
+                elif job.status == FAILED:
+                    await abandon_job(job)
+                else:
+                    await run_job(queue, job)
+                errors = 0
+            except Exception as e:
+                # Queue / database outages are transient: back off instead of letting the worker die
+                errors += 1
+                delay = min(poll_interval * 2 ** errors, ERROR_BACKOFF_CAP_SECONDS)
+                print(f"⚠️ Ingestion worker {worker_id} error ({errors} in a row), retry in {delay:.0f}s: {e}")
+                await asyncio.sleep(delay)
+    finally:
+        conversion_pool.shutdown()
+        await embedding_engine.aclose()
+        await repo.aclose()
+
+
+def _terminate(*_: Any) -> None:
+    for child in mp.active_children():
+        child.terminate()
+    os._exit(0)
+
+
+def _worker_main(index: int) -> None:
+    load_dotenv()
+    # Die quietly on shutdown (taking the Docling pool with us);
+    # an interrupted job is re-claimed once its lease expires
+    signal.signal(signal.SIGTERM, _terminate)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+    poll = float(os.getenv("INGEST_POLL_SECONDS", "1.0"))
+    try:
+        asyncio.run(worker_loop(worker_id, poll_interval=poll))
+    except KeyboardInterrupt:
+        pass
+
+
+def _spawn(index: int) -> mp.process.BaseProcess:
+    # spawn: children must not inherit the API's event loop or open sockets.
+    # Not daemonic, because each worker owns its own Docling process pool.
+    process = mp.get_context("spawn").Process(target=_worker_main, args=(index,), name=f"axiom-ingest-{index}")
+    process.start()
+    return process
+
+
+def start_pool(workers: int) -> List[mp.process.BaseProcess]:
+    processes: List[mp.process.BaseProcess] = [_spawn(i) for i in range(workers)]
+    print(f"AXIOM-CORE: Ingestion pool started ({workers} workers).")
+    return processes
+
+
+def respawn_exited(processes: List[mp.process.BaseProcess]) -> int:
+    """Replaces workers that died (OOM kill, native crash) in place; returns how many."""
+    respawned = 0
+    for index, p in enumerate(processes):
+        if p.exitcode is None:
+            continue
+        print(f"⚠️ Ingestion worker {p.name} exited with code {p.exitcode}, respawning.")
+        processes[index] = _spawn(index)
+        respawned += 1
+    return respawned
+
+
+async def supervise_pool(processes: List[mp.process.BaseProcess]) -> None:
+    """Embedded mode: keeps the pool at size for the lifetime of the API (cancel before stop_pool)."""
+    while True:
+        await asyncio.sleep(SUPERVISE_SECONDS)
+        respawn_exited(processes)
+
+
+def stop_pool(processes: List[mp.process.BaseProcess], timeout: float = 10.0) -> None:
+    for p in processes:
+        if p.is_alive(): p.terminate()
+    for p in processes:
+        p.join(timeout)
+
+
+def main() -> None:
+    load_dotenv()
+    processes = start_pool(int(os.getenv("INGEST_WORKERS", "2")))
+    stopping = threading.Event()
+
+    def shutdown(*_: Any) -> None:
+        stopping.set()
+        stop_pool(processes)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    try:
+        while not stopping.is_set():
+            wait_for_exit([p.sentinel for p in processes], timeout=SUPERVISE_SECONDS)
+            if not stopping.is_set():
+                respawn_exited(processes)
+    except KeyboardInterrupt:
+        shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+-- ==============================================================================
+-- AXIOM V4.6 DURABLE INGESTION QUEUE (INGEST_QUEUE=supabase)
+-- ==============================================================================
+
+BEGIN;
+
+-- ------------------------------------------------------------------------------
+-- 1. JOB TABLE
+-- One row per upload. Workers lease rows; an expired lease is re-claimable.
+-- ------------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS ingest_jobs (
+  id BIGSERIAL PRIMARY KEY,
+  document_id BIGINT REFERENCES documents(id) ON DELETE CASCADE,
+  user_id TEXT NOT NULL,
+  filename TEXT NOT NULL,
+  file_path TEXT NOT NULL,
+  status TEXT NOT NULL DEFAULT 'queued',      -- queued | running | done | failed
+  stage TEXT NOT NULL DEFAULT 'queued',
+  progress JSONB NOT NULL DEFAULT '{}'::jsonb,
+  attempts INT NOT NULL DEFAULT 0,
+  max_attempts INT NOT NULL DEFAULT 3,
+  error TEXT,
+  worker_id TEXT,
+  run_after TIMESTAMPTZ NOT NULL DEFAULT now(),
+  lease_until TIMESTAMPTZ,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_ingest_jobs_claim ON ingest_jobs(status, run_after);
+CREATE INDEX IF NOT EXISTS idx_ingest_jobs_owner ON ingest_jobs(user_id, filename, id DESC);
+
+-- ------------------------------------------------------------------------------
+-- 2. CLAIM RPC
+-- SKIP LOCKED lets any number of workers poll without blocking each other.
+-- ------------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION claim_ingest_job(
+  worker TEXT,
+  lease_seconds INT DEFAULT 120
+) RETURNS SETOF ingest_jobs LANGUAGE plpgsql AS $$
+BEGIN
+  RETURN QUERY
+  UPDATE ingest_jobs j
+  SET status = 'running',
+      stage = 'claimed',
+      attempts = j.attempts + 1,
+      worker_id = worker,
+      lease_until = now() + make_interval(secs => lease_seconds),
+      updated_at = now()
+  WHERE j.id = (
+    SELECT q.id FROM ingest_jobs q
+    WHERE (q.status = 'queued' AND q.run_after <= now())
+       OR (q.status = 'running' AND q.lease_until < now())
+    ORDER BY q.run_after, q.id
+    FOR UPDATE SKIP LOCKED
+    LIMIT 1
+  )
+  RETURNING j.*;
+END;
+$$;
+
+COMMIT;
@@ -0,0 +1,28 @@
+-- ==============================================================================
+-- AXIOM V4.6 INCREMENTAL RE-INGESTION: CHUNK FINGERPRINTS
+-- ==============================================================================
+
+BEGIN;
+
+-- ------------------------------------------------------------------------------
+-- 1. CONTENT HASH (sha256 hex of the chunk text)
+-- Legacy rows stay NULL and are simply re-embedded on their next re-upload.
+-- ------------------------------------------------------------------------------
+ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_chunks_doc_hash ON document_chunks(document_id, content_hash);
+
+-- ------------------------------------------------------------------------------
+-- 2. BULK POSITION REFRESH FOR REUSED CHUNKS
+-- ------------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION update_chunk_metadata(
+  chunk_ids BIGINT[],
+  metadatas JSONB[]
+) RETURNS VOID LANGUAGE sql AS $$
+  UPDATE document_chunks c
+  SET metadata = u.metadata
+  FROM unnest(chunk_ids, metadatas) AS u(id, metadata)
+  WHERE c.id = u.id;
+$$;
+
+COMMIT;
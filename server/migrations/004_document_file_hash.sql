@@ -0,0 +1,47 @@
+-- ==============================================================================
+-- AXIOM V4.6 UPLOAD DEDUPLICATION: FILE CONTENT HASH
+-- ==============================================================================
+
+BEGIN;
+
+-- ------------------------------------------------------------------------------
+-- 1. FILE HASH (sha256 hex of the uploaded bytes)
+-- ------------------------------------------------------------------------------
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS file_hash TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_docs_user_hash ON documents(user_id, file_hash);
+
+-- ------------------------------------------------------------------------------
+-- 2. CHUNK CLONING (same bytes, new filename: no Docling or NIM work)
+-- Replaces the target's chunks with a copy of the source's, vectors included.
+-- ------------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION clone_document_chunks(
+  source_document_id BIGINT,
+  target_document_id BIGINT
+) RETURNS INT LANGUAGE plpgsql AS $$
+DECLARE
+  target_filename TEXT;
+  cloned INT;
+BEGIN
+  SELECT filename INTO target_filename FROM documents WHERE id = target_document_id;
+
+  DELETE FROM document_chunks WHERE document_id = target_document_id;
+
+  INSERT INTO document_chunks (document_id, user_id, content, content_hash, embedding, metadata)
+  SELECT
+    target_document_id,
+    c.user_id,
+    c.content,
+    c.content_hash,
+    c.embedding,
+    jsonb_set(COALESCE(c.metadata, '{}'::jsonb), '{source}', to_jsonb(target_filename))
+  FROM document_chunks c
+  WHERE c.document_id = source_document_id
+  ORDER BY c.id;
+
+  GET DIAGNOSTICS cloned = ROW_COUNT;
+  RETURN cloned;
+END;
+$$;
+
+COMMIT;
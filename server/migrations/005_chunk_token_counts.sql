@@ -0,0 +1,74 @@
+-- ==============================================================================
+-- AXIOM V4.6 TOKEN BUDGETING: RETURN INGEST-TIME TOKEN COUNTS FROM SEARCH
+-- Chunk metadata carries "token_count" (cl100k, measured by the chunker).
+-- A changed RETURNS TABLE needs DROP + CREATE rather than CREATE OR REPLACE.
+-- ==============================================================================
+
+BEGIN;
+
+-- ------------------------------------------------------------------------------
+-- 1. HYBRID VAULT SEARCH (+ token_count)
+-- ------------------------------------------------------------------------------
+DROP FUNCTION IF EXISTS hybrid_vault_search(TEXT, VECTOR(1024), INT, TEXT);
+
+CREATE FUNCTION hybrid_vault_search(
+  query_text TEXT,
+  query_embedding VECTOR(1024),
+  match_count INT,
+  target_user_id TEXT
+) RETURNS TABLE (
+  id BIGINT,
+  document_id BIGINT,
+  filename TEXT,
+  content TEXT,
+  similarity FLOAT,
+  fts_rank REAL,
+  token_count INT
+) LANGUAGE plpgsql AS $$
+BEGIN
+  RETURN QUERY
+  SELECT 
+    c.id,
+    c.document_id,
+    d.filename,
+    c.content,
+    (c.embedding <#> query_embedding) * -1 AS similarity,
+    ts_rank_cd(c.fts_content, websearch_to_tsquery('simple', query_text)) AS fts_rank,
+    (c.metadata->>'token_count')::INT AS token_count
+  FROM document_chunks c
+  JOIN documents d ON c.document_id = d.id
+  WHERE c.user_id = target_user_id
+  ORDER BY (0.7 * ((c.embedding <#> query_embedding) * -1) + 0.3 * ts_rank_cd(c.fts_content, websearch_to_tsquery('simple', query_text))) DESC
+  LIMIT match_count;
+END;
+$$;
+
+-- ------------------------------------------------------------------------------
+-- 2. SINGLE-DOCUMENT MATCHING (+ token_count)
+-- ------------------------------------------------------------------------------
+DROP FUNCTION IF EXISTS match_document_chunks(VECTOR(1024), INT, BIGINT, TEXT);
+
+CREATE FUNCTION match_document_chunks(
+  query_embedding VECTOR(1024),
+  match_limit INT,
+  target_document_id BIGINT,
+  target_user_id TEXT
+) RETURNS TABLE (
+  content TEXT,
+  similarity FLOAT,
+  token_count INT
+) LANGUAGE plpgsql AS $$
+BEGIN
+  RETURN QUERY
+  SELECT
+    c.content,
+    (c.embedding <#> query_embedding) * -1 AS similarity,
+    (c.metadata->>'token_count')::INT AS token_count
+  FROM document_chunks c
+  WHERE c.document_id = target_document_id AND c.user_id = target_user_id
+  ORDER BY c.embedding <#> query_embedding
+  LIMIT match_limit;
+END;
+$$;
+
+COMMIT;
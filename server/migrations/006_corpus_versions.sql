@@ -0,0 +1,67 @@
+-- ==============================================================================
+-- AXIOM V4.6 RETRIEVAL CACHE: PER-USER CORPUS VERSION
+-- The API caches hybrid_search results under (user, query, filenames, limit)
+-- and serves them only while the user's corpus version is unchanged.
+-- Triggers bump the version on every change that can alter search results:
+-- chunk inserts/deletes (ingest, re-index, clone, purge) and document
+-- inserts, deletes, renames, status flips and saves.
+-- ==============================================================================
+
+BEGIN;
+
+-- ------------------------------------------------------------------------------
+-- 1. VERSION TABLE
+-- ------------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS corpus_versions (
+  user_id TEXT PRIMARY KEY,
+  version BIGINT NOT NULL DEFAULT 0,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- ------------------------------------------------------------------------------
+-- 2. CHUNK TRIGGERS (statement-level: one bump per batch insert/delete)
+-- Transition tables carry the affected rows; one trigger per event.
+-- ------------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION bump_corpus_version_for_chunks()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+BEGIN
+  INSERT INTO corpus_versions (user_id, version)
+  SELECT DISTINCT user_id, 1 FROM changed_chunks
+  ON CONFLICT (user_id) DO UPDATE
+    SET version = corpus_versions.version + 1, updated_at = now();
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS chunks_inserted_bump_corpus ON document_chunks;
+CREATE TRIGGER chunks_inserted_bump_corpus
+  AFTER INSERT ON document_chunks
+  REFERENCING NEW TABLE AS changed_chunks
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_corpus_version_for_chunks();
+
+DROP TRIGGER IF EXISTS chunks_deleted_bump_corpus ON document_chunks;
+CREATE TRIGGER chunks_deleted_bump_corpus
+  AFTER DELETE ON document_chunks
+  REFERENCING OLD TABLE AS changed_chunks
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_corpus_version_for_chunks();
+
+-- ------------------------------------------------------------------------------
+-- 3. DOCUMENT TRIGGER (row-level; documents change one at a time)
+-- ------------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION bump_corpus_version_for_document()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+BEGIN
+  INSERT INTO corpus_versions (user_id, version)
+  VALUES (COALESCE(NEW.user_id, OLD.user_id), 1)
+  ON CONFLICT (user_id) DO UPDATE
+    SET version = corpus_versions.version + 1, updated_at = now();
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS documents_bump_corpus ON documents;
+CREATE TRIGGER documents_bump_corpus
+  AFTER INSERT OR DELETE OR UPDATE OF filename, status, is_permanent ON documents
+  FOR EACH ROW EXECUTE FUNCTION bump_corpus_version_for_document();
+
+COMMIT;
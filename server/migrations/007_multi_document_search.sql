@@ -0,0 +1,53 @@
+-- ==============================================================================
+-- AXIOM V4.6 TARGETED SEARCH: ONE RPC FOR ANY NUMBER OF DOCUMENTS
+-- Replaces the per-document match_document_chunks fan-out in hybrid_search.
+-- A LATERAL join runs the top-k vector probe once per requested document,
+-- so latency stays flat as the selection grows.
+-- ==============================================================================
+
+BEGIN;
+
+-- ------------------------------------------------------------------------------
+-- 1. MULTI-DOCUMENT MATCHING (top match_limit chunks per document)
+-- Rows come back grouped in the order of target_document_ids, best match first.
+-- ------------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION match_multi_document_chunks(
+  query_embedding VECTOR(1024),
+  match_limit INT,
+  target_document_ids BIGINT[],
+  target_user_id TEXT
+) RETURNS TABLE (
+  id BIGINT,
+  document_id BIGINT,
+  filename TEXT,
+  content TEXT,
+  similarity FLOAT,
+  token_count INT
+) LANGUAGE plpgsql AS $$
+BEGIN
+  RETURN QUERY
+  SELECT
+    m.id,
+    d.id AS document_id,
+    d.filename,
+    m.content,
+    m.similarity,
+    m.token_count
+  FROM unnest(target_document_ids) WITH ORDINALITY AS t(doc_id, ord)
+  JOIN documents d ON d.id = t.doc_id AND d.user_id = target_user_id
+  CROSS JOIN LATERAL (
+    SELECT
+      c.id,
+      c.content,
+      (c.embedding <#> query_embedding) * -1 AS similarity,
+      (c.metadata->>'token_count')::INT AS token_count
+    FROM document_chunks c
+    WHERE c.document_id = d.id AND c.user_id = target_user_id
+    ORDER BY c.embedding <#> query_embedding
+    LIMIT match_limit
+  ) m
+  ORDER BY t.ord, m.similarity DESC;
+END;
+$$;
+
+COMMIT;
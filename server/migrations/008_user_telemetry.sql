@@ -0,0 +1,208 @@
+-- ==============================================================================
+-- AXIOM V4.6 MATERIALIZED TELEMETRY: PER-USER COUNTERS
+-- /telemetry used to download every document row, run an exact count over
+-- document_chunks and average the last 50 audit_logs on every dashboard poll.
+-- Triggers now keep one row per user up to date as data changes, so the
+-- endpoint is a single primary-key read.
+--   * documents / permanent_documents / chunks: exact running counters
+--   * blocked: lifetime count of audits with faithfulness < 0.8
+--   * faithfulness / precision / relevance / latency: EWMA with
+--     alpha = 2 / (50 + 1), the smoothing equivalent of the old 50-row window
+-- ==============================================================================
+
+BEGIN;
+
+-- ------------------------------------------------------------------------------
+-- 1. TELEMETRY TABLE
+-- ------------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS user_telemetry (
+  user_id TEXT PRIMARY KEY,
+  documents BIGINT NOT NULL DEFAULT 0,
+  permanent_documents BIGINT NOT NULL DEFAULT 0,
+  chunks BIGINT NOT NULL DEFAULT 0,
+  audits BIGINT NOT NULL DEFAULT 0,
+  blocked BIGINT NOT NULL DEFAULT 0,
+  faithfulness DOUBLE PRECISION NOT NULL DEFAULT 0,
+  precision DOUBLE PRECISION NOT NULL DEFAULT 0,
+  relevance DOUBLE PRECISION NOT NULL DEFAULT 0,
+  latency DOUBLE PRECISION, -- NULL until the first audit with a recorded latency
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- NULL, NaN and +/-Infinity count as 0 (same rule as sanitize_float in the API)
+CREATE OR REPLACE FUNCTION telemetry_finite(value DOUBLE PRECISION)
+RETURNS DOUBLE PRECISION LANGUAGE sql IMMUTABLE AS $$
+  SELECT CASE
+    WHEN value IS NULL OR value = 'NaN'::float8 OR value IN ('Infinity'::float8, '-Infinity'::float8) THEN 0
+    ELSE value
+  END;
+$$;
+
+-- ------------------------------------------------------------------------------
+-- 2. DOCUMENT TRIGGER (row-level; documents change one at a time)
+-- ------------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION track_document_telemetry()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+DECLARE
+  doc_delta BIGINT := 0;
+  permanent_delta BIGINT := 0;
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    doc_delta := 1;
+    permanent_delta := CASE WHEN COALESCE(NEW.is_permanent, false) THEN 1 ELSE 0 END;
+  ELSIF TG_OP = 'DELETE' THEN
+    doc_delta := -1;
+    permanent_delta := CASE WHEN COALESCE(OLD.is_permanent, false) THEN -1 ELSE 0 END;
+  ELSE
+    permanent_delta := (CASE WHEN COALESCE(NEW.is_permanent, false) THEN 1 ELSE 0 END)
+                     - (CASE WHEN COALESCE(OLD.is_permanent, false) THEN 1 ELSE 0 END);
+  END IF;
+
+  INSERT INTO user_telemetry (user_id, documents, permanent_documents)
+  VALUES (COALESCE(NEW.user_id, OLD.user_id), GREATEST(doc_delta, 0), GREATEST(permanent_delta, 0))
+  ON CONFLICT (user_id) DO UPDATE SET
+    documents = GREATEST(user_telemetry.documents + doc_delta, 0),
+    permanent_documents = GREATEST(user_telemetry.permanent_documents + permanent_delta, 0),
+    updated_at = now();
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS documents_track_telemetry ON documents;
+CREATE TRIGGER documents_track_telemetry
+  AFTER INSERT OR DELETE OR UPDATE OF is_permanent ON documents
+  FOR EACH ROW EXECUTE FUNCTION track_document_telemetry();
+
+-- ------------------------------------------------------------------------------
+-- 3. CHUNK TRIGGERS (statement-level: one counter update per user per batch)
+-- ------------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION track_chunk_telemetry()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+DECLARE
+  direction BIGINT := CASE WHEN TG_OP = 'INSERT' THEN 1 ELSE -1 END;
+BEGIN
+  INSERT INTO user_telemetry (user_id)
+  SELECT DISTINCT user_id FROM changed_chunks
+  ON CONFLICT (user_id) DO NOTHING;
+
+  UPDATE user_telemetry t
+  SET chunks = GREATEST(t.chunks + direction * c.changed, 0), updated_at = now()
+  FROM (SELECT user_id, COUNT(*) AS changed FROM changed_chunks GROUP BY user_id) c
+  WHERE t.user_id = c.user_id;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS chunks_inserted_track_telemetry ON document_chunks;
+CREATE TRIGGER chunks_inserted_track_telemetry
+  AFTER INSERT ON document_chunks
+  REFERENCING NEW TABLE AS changed_chunks
+  FOR EACH STATEMENT EXECUTE FUNCTION track_chunk_telemetry();
+
+DROP TRIGGER IF EXISTS chunks_deleted_track_telemetry ON document_chunks;
+CREATE TRIGGER chunks_deleted_track_telemetry
+  AFTER DELETE ON document_chunks
+  REFERENCING OLD TABLE AS changed_chunks
+  FOR EACH STATEMENT EXECUTE FUNCTION track_chunk_telemetry();
+
+-- ------------------------------------------------------------------------------
+-- 4. AUDIT TRIGGER (row-level: the EWMA folds samples in insertion order)
+-- ------------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION track_audit_telemetry()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+DECLARE
+  alpha CONSTANT DOUBLE PRECISION := 2.0 / 51.0;
+  faith DOUBLE PRECISION := telemetry_finite(NEW.faithfulness);
+  prec DOUBLE PRECISION := telemetry_finite(NEW.precision);
+  rel DOUBLE PRECISION := telemetry_finite(NEW.relevance);
+  lat DOUBLE PRECISION := telemetry_finite(NEW.latency);
+BEGIN
+  INSERT INTO user_telemetry (user_id, audits, blocked, faithfulness, precision, relevance, latency)
+  VALUES (
+    NEW.user_id, 1, CASE WHEN faith < 0.8 THEN 1 ELSE 0 END,
+    faith, prec, rel, CASE WHEN lat > 0 THEN lat END
+  )
+  ON CONFLICT (user_id) DO UPDATE SET
+    audits = user_telemetry.audits + 1,
+    blocked = user_telemetry.blocked + EXCLUDED.blocked,
+    -- The first audit seeds the averages instead of decaying from 0
+    faithfulness = CASE WHEN user_telemetry.audits = 0 THEN faith
+                   ELSE user_telemetry.faithfulness + alpha * (faith - user_telemetry.faithfulness) END,
+    precision = CASE WHEN user_telemetry.audits = 0 THEN prec
+                ELSE user_telemetry.precision + alpha * (prec - user_telemetry.precision) END,
+    relevance = CASE WHEN user_telemetry.audits = 0 THEN rel
+                ELSE user_telemetry.relevance + alpha * (rel - user_telemetry.relevance) END,
+    -- Latency only averages audits that recorded one (matches the old filter)
+    latency = CASE WHEN lat <= 0 THEN user_telemetry.latency
+              WHEN user_telemetry.latency IS NULL THEN lat
+              ELSE user_telemetry.latency + alpha * (lat - user_telemetry.latency) END,
+    updated_at = now();
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS audit_logs_track_telemetry ON audit_logs;
+CREATE TRIGGER audit_logs_track_telemetry
+  AFTER INSERT ON audit_logs
+  FOR EACH ROW EXECUTE FUNCTION track_audit_telemetry();
+
+-- ------------------------------------------------------------------------------
+-- 5. BACKFILL (writers wait until the counters are seeded, so no delta is lost)
+-- Averages are seeded from each user's last 50 audits, as /telemetry reported them.
+-- ------------------------------------------------------------------------------
+LOCK TABLE documents, document_chunks, audit_logs IN SHARE MODE;
+
+INSERT INTO user_telemetry (
+  user_id, documents, permanent_documents, chunks, audits, blocked,
+  faithfulness, precision, relevance, latency
+)
+SELECT
+  u.user_id,
+  COALESCE(d.documents, 0), COALESCE(d.permanent_documents, 0), COALESCE(c.chunks, 0),
+  COALESCE(a.audits, 0), COALESCE(a.blocked, 0),
+  COALESCE(w.faithfulness, 0), COALESCE(w.precision, 0), COALESCE(w.relevance, 0), w.latency
+FROM (
+  SELECT user_id FROM documents
+  UNION SELECT user_id FROM document_chunks
+  UNION SELECT user_id FROM audit_logs
+) u
+LEFT JOIN (
+  SELECT user_id, COUNT(*) AS documents, COUNT(*) FILTER (WHERE is_permanent) AS permanent_documents
+  FROM documents GROUP BY user_id
+) d USING (user_id)
+LEFT JOIN (
+  SELECT user_id, COUNT(*) AS chunks FROM document_chunks GROUP BY user_id
+) c USING (user_id)
+LEFT JOIN (
+  SELECT user_id, COUNT(*) AS audits,
+         COUNT(*) FILTER (WHERE telemetry_finite(faithfulness) < 0.8) AS blocked
+  FROM audit_logs GROUP BY user_id
+) a USING (user_id)
+LEFT JOIN (
+  SELECT user_id,
+         AVG(telemetry_finite(faithfulness)) AS faithfulness,
+         AVG(telemetry_finite(precision)) AS precision,
+         AVG(telemetry_finite(relevance)) AS relevance,
+         AVG(telemetry_finite(latency)) FILTER (WHERE telemetry_finite(latency) > 0) AS latency
+  FROM (
+    SELECT user_id, faithfulness, precision, relevance, latency,
+           ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY created_at DESC) AS recency
+    FROM audit_logs
+  ) recent
+  WHERE recency <= 50
+  GROUP BY user_id
+) w USING (user_id)
+WHERE u.user_id IS NOT NULL
+ON CONFLICT (user_id) DO UPDATE SET
+  documents = EXCLUDED.documents,
+  permanent_documents = EXCLUDED.permanent_documents,
+  chunks = EXCLUDED.chunks,
+  audits = EXCLUDED.audits,
+  blocked = EXCLUDED.blocked,
+  faithfulness = EXCLUDED.faithfulness,
+  precision = EXCLUDED.precision,
+  relevance = EXCLUDED.relevance,
+  latency = EXCLUDED.latency,
+  updated_at = now();
+
+COMMIT;
@@ -0,0 +1,39 @@
+-- ==============================================================================
+-- AXIOM V4.6 DOCUMENT SIZES: CACHED CHUNK / TOKEN / PAGE COUNTS
+-- process_document (and clone_document) write these when a document flips to
+-- "indexed", so /metadata reads one row instead of counting document_chunks.
+-- NULL means the document has not finished its first ingestion yet.
+-- ==============================================================================
+
+BEGIN;
+
+-- ------------------------------------------------------------------------------
+-- 1. COLUMNS
+-- ------------------------------------------------------------------------------
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS chunk_count INT;
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS token_count BIGINT;
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS page_count INT;
+
+-- ------------------------------------------------------------------------------
+-- 2. BACKFILL (indexed documents; token and page numbers come from chunk metadata)
+-- ------------------------------------------------------------------------------
+UPDATE documents d
+SET chunk_count = s.chunk_count,
+    token_count = s.token_count,
+    page_count = s.page_count
+FROM (
+  SELECT
+    document_id,
+    COUNT(*) AS chunk_count,
+    SUM((metadata->>'token_count')::BIGINT) AS token_count,
+    MAX((metadata->>'page')::INT) AS page_count
+  FROM document_chunks
+  GROUP BY document_id
+) s
+WHERE d.id = s.document_id AND d.status = 'indexed' AND d.chunk_count IS NULL;
+
+UPDATE documents
+SET chunk_count = 0
+WHERE status = 'indexed' AND chunk_count IS NULL;
+
+COMMIT;
@@ -0,0 +1,61 @@
+-- ==============================================================================
+-- AXIOM V4.6 DURABLE INGESTION QUEUE: EXHAUSTED ORPHANS
+-- A job whose worker is OOM-killed or SIGKILLed never reaches fail(); its lease
+-- simply expires. claim_ingest_job used to re-lease such rows regardless of
+-- attempts, so a poison PDF killed one worker after another forever.
+-- An expired lease on the final attempt is now failed terminally (and its
+-- document flipped to "error") instead of being leased again.
+-- ==============================================================================
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION claim_ingest_job(
+  worker TEXT,
+  lease_seconds INT DEFAULT 120
+) RETURNS SETOF ingest_jobs LANGUAGE plpgsql AS $$
+DECLARE
+  candidate ingest_jobs%ROWTYPE;
+BEGIN
+  SELECT * INTO candidate FROM ingest_jobs q
+  WHERE (q.status = 'queued' AND q.run_after <= now())
+     OR (q.status = 'running' AND q.lease_until < now())
+  ORDER BY q.run_after, q.id
+  FOR UPDATE SKIP LOCKED
+  LIMIT 1;
+
+  IF NOT FOUND THEN
+    RETURN;
+  END IF;
+
+  -- Orphan on its last attempt: fail it and hand it back for cleanup (status 'failed')
+  IF candidate.status = 'running' AND candidate.attempts >= candidate.max_attempts THEN
+    IF candidate.document_id IS NOT NULL THEN
+      UPDATE documents SET status = 'error' WHERE id = candidate.document_id;
+    END IF;
+
+    RETURN QUERY
+    UPDATE ingest_jobs j
+    SET status = 'failed',
+        stage = 'failed',
+        error = 'Lease expired on the final attempt (worker lost)',
+        lease_until = NULL,
+        updated_at = now()
+    WHERE j.id = candidate.id
+    RETURNING j.*;
+    RETURN;
+  END IF;
+
+  RETURN QUERY
+  UPDATE ingest_jobs j
+  SET status = 'running',
+      stage = 'claimed',
+      attempts = j.attempts + 1,
+      worker_id = worker,
+      lease_until = now() + make_interval(secs => lease_seconds),
+      updated_at = now()
+  WHERE j.id = candidate.id
+  RETURNING j.*;
+END;
+$$;
+
+COMMIT;
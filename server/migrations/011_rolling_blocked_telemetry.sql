@@ -0,0 +1,74 @@
+-- ==============================================================================
+-- AXIOM V4.6 MATERIALIZED TELEMETRY: ROLLING BLOCKED COUNT
+-- Before migration 008, /telemetry reported "blocked" as the number of audits
+-- with faithfulness < 0.8 among the user's last 50. The 008 trigger turned it
+-- into a lifetime counter. This restores the old 50-audit window exactly.
+--   * blocked_window: one bit per recent audit, bit 0 = newest, bit 49 = oldest
+--   * blocked: number of set bits; each audit adds its own bit and subtracts
+--     the bit that slides out of the window
+-- ==============================================================================
+
+BEGIN;
+
+ALTER TABLE user_telemetry ADD COLUMN IF NOT EXISTS blocked_window BIGINT NOT NULL DEFAULT 0;
+
+-- ------------------------------------------------------------------------------
+-- 1. AUDIT TRIGGER (same EWMAs as 008; blocked now slides over 50 audits)
+-- ------------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION track_audit_telemetry()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+DECLARE
+  alpha CONSTANT DOUBLE PRECISION := 2.0 / 51.0;
+  window_mask CONSTANT BIGINT := (1::BIGINT << 50) - 1;
+  faith DOUBLE PRECISION := telemetry_finite(NEW.faithfulness);
+  prec DOUBLE PRECISION := telemetry_finite(NEW.precision);
+  rel DOUBLE PRECISION := telemetry_finite(NEW.relevance);
+  lat DOUBLE PRECISION := telemetry_finite(NEW.latency);
+  is_blocked BIGINT := CASE WHEN faith < 0.8 THEN 1 ELSE 0 END;
+BEGIN
+  INSERT INTO user_telemetry (user_id, audits, blocked, blocked_window, faithfulness, precision, relevance, latency)
+  VALUES (NEW.user_id, 1, is_blocked, is_blocked, faith, prec, rel, CASE WHEN lat > 0 THEN lat END)
+  ON CONFLICT (user_id) DO UPDATE SET
+    audits = user_telemetry.audits + 1,
+    -- The audit that was 50th-newest slides out as this one comes in
+    blocked = user_telemetry.blocked + is_blocked - ((user_telemetry.blocked_window >> 49) & 1),
+    blocked_window = ((user_telemetry.blocked_window << 1) | is_blocked) & window_mask,
+    -- The first audit seeds the averages instead of decaying from 0
+    faithfulness = CASE WHEN user_telemetry.audits = 0 THEN faith
+                   ELSE user_telemetry.faithfulness + alpha * (faith - user_telemetry.faithfulness) END,
+    precision = CASE WHEN user_telemetry.audits = 0 THEN prec
+                ELSE user_telemetry.precision + alpha * (prec - user_telemetry.precision) END,
+    relevance = CASE WHEN user_telemetry.audits = 0 THEN rel
+                ELSE user_telemetry.relevance + alpha * (rel - user_telemetry.relevance) END,
+    -- Latency only averages audits that recorded one (matches the old filter)
+    latency = CASE WHEN lat <= 0 THEN user_telemetry.latency
+              WHEN user_telemetry.latency IS NULL THEN lat
+              ELSE user_telemetry.latency + alpha * (lat - user_telemetry.latency) END,
+    updated_at = now();
+  RETURN NULL;
+END;
+$$;
+
+-- ------------------------------------------------------------------------------
+-- 2. BACKFILL (audit writers wait, so no audit slips between seed and trigger)
+-- The window is seeded from each user's last 50 audits, newest first.
+-- ------------------------------------------------------------------------------
+LOCK TABLE audit_logs IN SHARE MODE;
+
+UPDATE user_telemetry t
+SET blocked = w.blocked, blocked_window = w.blocked_window, updated_at = now()
+FROM (
+  SELECT user_id,
+         COUNT(*) FILTER (WHERE telemetry_finite(faithfulness) < 0.8) AS blocked,
+         COALESCE(BIT_OR(1::BIGINT << (recency - 1)::INT) FILTER (WHERE telemetry_finite(faithfulness) < 0.8), 0) AS blocked_window
+  FROM (
+    SELECT user_id, faithfulness,
+           ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY created_at DESC) AS recency
+    FROM audit_logs
+  ) recent
+  WHERE recency <= 50
+  GROUP BY user_id
+) w
+WHERE t.user_id = w.user_id;
+
+COMMIT;
@@ -76,16 +76,20 @@ from typing import Dict, Any
 
 @pytest.fixture(autouse=True)
 def mock_db_singleton():
-    """Mock Database singleton so no Supabase connection is attempted."""
+    """Mock Database singleton and async repository so no Supabase connection is attempted."""
+    from app.core.repository import repo
     with patch('app.core.database.Database._init_client', return_value=None), \
          patch('app.core.database.Database.client', None), \
-         patch('app.core.database.db', None):
+         patch('app.core.database.db', None), \
+         patch.object(repo, '_base_url', None):
         yield
 
 @pytest.fixture(autouse=True)
 def mock_embedding_singleton():
-    """Mock EmbeddingAdapter singleton to avoid NVIDIA API calls."""
+    """Mock EmbeddingAdapter singleton to avoid NVIDIA API calls (fresh cache per test)."""
+    from app.core.embedding_cache import EmbeddingCache
     with patch('app.core.embeddings._engine._client', None), \
+         patch('app.core.embeddings._engine._cache', EmbeddingCache()), \
          patch('app.core.embeddings.get_embedding', return_value=[0.0] * 1024):
         yield
 
@@ -105,8 +109,10 @@ def mock_content_monitor():
     orig = app.core.monitor.monitor.encoder
     app.core.monitor.monitor.encoder = MagicMock()
     app.core.monitor.monitor.encoder.encode.return_value = [1] * 100
+    app.core.monitor.monitor.clear()
     yield
     app.core.monitor.monitor.encoder = orig
+    app.core.monitor.monitor.clear()
 
 @pytest.fixture
 def agent_state_factory():
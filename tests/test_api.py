@@ -1,6 +1,6 @@
 import pytest
 import json
-from unittest.mock import patch
+from unittest.mock import patch, AsyncMock, MagicMock
 from httpx import AsyncClient, ASGITransport
 
 from app.main import app
@@ -94,3 +94,214 @@ async def test_sse_stream_error_resilience(mock_astream_events):
         assert "event: error" in response.text, "SSE stream should emit error event to UI"
         assert "Simulated stream failure" in response.text, "Exception message didn't reach UI"
         print("\n✅ SSE Stream Error Resilience Verified")
+
+
+# ---------------------------------------------------------
+# 2b. CONVERSATION MEMORY OFF THE TOKEN PATH
+# ---------------------------------------------------------
+@pytest.mark.asyncio
+@patch("app.api.run.app_graph.astream_events")
+async def test_verify_prefetches_history_and_persists_in_background(mock_astream_events):
+
+    seen_state = {}
+
+    async def generator(state, *args, **kwargs):
+        seen_state.update(state)
+        yield {"event": "on_chain_end", "name": "generate_node", "data": {"output": {"generation": "ANSWER"}}}
+
+    mock_astream_events.side_effect = generator
+    repo = MagicMock()
+    repo.document_id = AsyncMock(return_value=4)
+    repo.recent_messages = AsyncMock(return_value=[{"role": "assistant", "content": "a1"}, {"role": "user", "content": "q1"}])
+
+    with patch("app.api.run.repo", repo), patch("app.api.run.write_behind") as buffer:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            response = await ac.post("/api/v1/verify", json={"question": "Q2", "filenames": ["10k.pdf"]})
+
+    assert "event: audit_complete" in response.text
+    assert seen_state["history"] == [{"role": "user", "content": "q1"}, {"role": "assistant", "content": "a1"}]
+    repo.document_id.assert_awaited_once_with("test-sovereign-user", "10k.pdf")  # one lookup serves both ends
+    queued = [c.args for c in buffer.add.call_args_list]
+    assert [table for table, _ in queued] == ["chat_messages", "chat_messages", "audit_logs"]
+    user_row, answer_row = queued[0][1], queued[1][1]
+    assert answer_row["content"] == "ANSWER" and user_row["created_at"] <= answer_row["created_at"]
+
+
+@pytest.mark.asyncio
+async def test_abandoned_stream_cancels_memory_prefetch():
+    import asyncio
+    from app.api.run import run_verification, VerificationRequest
+    from app.core import background
+
+    released = asyncio.Event()
+
+    async def slow_memory(*args, **kwargs):
+        await released.wait()
+        return None, []
+
+    with patch("app.api.run.load_memory", side_effect=slow_memory), \
+         patch("app.api.run.EventSourceResponse", side_effect=lambda stream, **kwargs: stream):
+        stream = await run_verification(VerificationRequest(question="Q", filenames=["10k.pdf"]), user_id="u")
+        prefetch = next(t for t in background._tasks if not t.done())  # tracked, not orphaned
+
+        await stream.__anext__()  # "connected" sent, then the client disconnects
+        await stream.aclose()
+        await asyncio.sleep(0)
+
+    assert prefetch.cancelled()
+
+# ---------------------------------------------------------
+# 3. UPLOAD DEDUPLICATION BY CONTENT HASH
+# ---------------------------------------------------------
+PDF_BYTES = b"%PDF-1.7 sovereign test bytes"
+
+@pytest.mark.asyncio
+async def test_upload_duplicate_skips_ingestion(tmp_path):
+    import hashlib
+    with patch("app.api.ingest.TEMP_DIR", str(tmp_path)), \
+         patch("app.api.ingest.find_indexed_duplicate", return_value={"id": 5, "filename": "old.pdf"}) as find_dup, \
+         patch("app.api.ingest.clone_document") as clone, \
+         patch("app.api.ingest.get_job_queue") as queue:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            response = await ac.post("/api/v1/upload", files={"file": ("new.pdf", PDF_BYTES, "application/pdf")})
+
+    assert response.json() == {"status": "indexed", "filename": "new.pdf", "deduplicated": True}
+    file_hash = hashlib.sha256(PDF_BYTES).hexdigest()
+    find_dup.assert_called_once_with("test-sovereign-user", file_hash, "new.pdf")
+    clone.assert_called_once_with(5, "new.pdf", "test-sovereign-user", file_hash)
+    queue.return_value.enqueue.assert_not_called()
+    assert list(tmp_path.iterdir()) == []
+
+@pytest.mark.asyncio
+async def test_upload_new_content_is_queued(tmp_path):
+    with patch("app.api.ingest.TEMP_DIR", str(tmp_path)), \
+         patch("app.api.ingest.find_indexed_duplicate", return_value=None), \
+         patch("app.api.ingest.register_document", return_value=9) as register, \
+         patch("app.api.ingest.get_job_queue") as queue:
+        queue.return_value.enqueue = AsyncMock(return_value=MagicMock(id=1))
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            response = await ac.post("/api/v1/upload", files={"file": ("new.pdf", PDF_BYTES, "application/pdf")})
+
+    assert response.json()["status"] == "queued"
+    assert len(register.call_args.args[2]) == 64  # sha256 hex stored on the document
+    spooled = list(tmp_path.iterdir())
+    assert len(spooled) == 1 and spooled[0].read_bytes() == PDF_BYTES
+
+@pytest.mark.asyncio
+async def test_upload_over_limit_is_rejected_without_residue(tmp_path):
+    with patch("app.api.ingest.TEMP_DIR", str(tmp_path)), \
+         patch("app.api.ingest.MAX_UPLOAD_BYTES", 16), \
+         patch("app.api.ingest.get_job_queue") as queue:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            response = await ac.post("/api/v1/upload", files={"file": ("big.pdf", PDF_BYTES, "application/pdf")})
+
+    assert response.status_code == 413
+    queue.return_value.enqueue.assert_not_called()
+    assert list(tmp_path.iterdir()) == []
+
+@pytest.mark.asyncio
+async def test_spool_upload_streams_in_chunks(tmp_path):
+    import hashlib
+    from app.api.ingest import spool_upload
+
+    class FakeUpload:
+        def __init__(self, data):
+            self.data, self.reads = data, []
+        async def read(self, size=-1):
+            self.reads.append(size)
+            chunk, self.data = self.data[:size], self.data[size:]
+            return chunk
+
+    data = bytes(range(256)) * 10
+    upload = FakeUpload(data)
+    with patch("app.api.ingest.UPLOAD_CHUNK_BYTES", 1000):
+        digest = await spool_upload(upload, str(tmp_path / "a.pdf"), max_bytes=len(data))
+
+    assert digest == hashlib.sha256(data).hexdigest()
+    assert (tmp_path / "a.pdf").read_bytes() == data
+    assert upload.reads == [1000, 1000, 1000, 1000]  # never a whole-file read()
+
+# ---------------------------------------------------------
+# 4. MATERIALIZED TELEMETRY
+# ---------------------------------------------------------
+@pytest.mark.asyncio
+async def test_telemetry_reads_one_row_and_caches_it():
+    from app.api import ingest
+
+    repo = MagicMock()
+    repo.user_telemetry = AsyncMock(return_value={
+        "documents": 4, "permanent_documents": 1, "chunks": 120, "blocked": 2,
+        "faithfulness": 0.9, "precision": None, "relevance": float("nan"), "latency": 3.25,
+    })
+    ingest._telemetry_cache.clear()
+    with patch("app.api.ingest.repo", repo):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            first = (await ac.get("/api/v1/telemetry")).json()
+            second = (await ac.get("/api/v1/telemetry")).json()
+    ingest._telemetry_cache.clear()
+
+    assert first == second == {
+        "chunks": "120", "persistence": "25%", "blocked": "2", "latency": "3.2s",
+        "ragas": {"faithfulness": 0.9, "precision": 0.0, "relevance": 0.0},
+    }
+    repo.user_telemetry.assert_awaited_once_with("test-sovereign-user")
+
+# ---------------------------------------------------------
+# 5. DOCUMENT METADATA FROM CACHED SIZES
+# ---------------------------------------------------------
+@pytest.mark.asyncio
+async def test_metadata_reads_cached_sizes_without_counting():
+
+    repo = MagicMock()
+    repo.latest_document = AsyncMock(return_value={
+        "id": 3, "status": "indexed", "created_at": "2026-01-01", "is_permanent": True,
+        "chunk_count": 812, "token_count": 250000, "page_count": 96,
+    })
+    repo.count_chunks = AsyncMock()
+    with patch("app.api.ingest.repo", repo):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            body = (await ac.get("/api/v1/metadata/10k.pdf")).json()
+
+    assert body["chunk_count"] == 812 and body["token_count"] == 250000 and body["page_count"] == 96
+    assert "*" not in repo.latest_document.await_args.kwargs["columns"]
+    repo.count_chunks.assert_not_awaited()
+
+# ---------------------------------------------------------
+# 6. ONE INGEST RUN PER DOCUMENT
+# ---------------------------------------------------------
+@pytest.mark.asyncio
+async def test_reupload_while_processing_is_refused(tmp_path):
+    from app.core.jobs import IngestJob, RUNNING
+
+    repo = MagicMock()
+    repo.document_id = AsyncMock(return_value=9)
+    repo.acquire_document = AsyncMock(return_value=False)  # row is "processing"
+    queue = MagicMock()
+    queue.latest = AsyncMock(return_value=IngestJob(id=1, user_id="u", filename="new.pdf", file_path="/x", status=RUNNING))
+    queue.enqueue = AsyncMock()
+
+    with patch("app.api.ingest.TEMP_DIR", str(tmp_path)), \
+         patch("app.api.ingest.repo", repo), \
+         patch("app.api.ingest.find_indexed_duplicate", return_value=None), \
+         patch("app.api.ingest.get_job_queue", return_value=queue):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            response = await ac.post("/api/v1/upload", files={"file": ("new.pdf", PDF_BYTES, "application/pdf")})
+
+    assert response.status_code == 409
+    queue.enqueue.assert_not_awaited()
+    assert list(tmp_path.iterdir()) == []  # spooled upload discarded
+
+@pytest.mark.asyncio
+async def test_stale_processing_row_is_taken_over():
+    from app.api.ingest import register_document
+
+    repo = MagicMock()
+    repo.document_id = AsyncMock(return_value=9)
+    repo.acquire_document = AsyncMock(return_value=False)
+    repo.update_document = AsyncMock()
+    queue = MagicMock()
+    queue.latest = AsyncMock(return_value=None)  # no live job owns the row
+
+    with patch("app.api.ingest.repo", repo), patch("app.api.ingest.get_job_queue", return_value=queue):
+        assert await register_document("new.pdf", "u", "abc") == 9
+    repo.update_document.assert_awaited_once_with(9, {"status": "processing", "file_hash": "abc"})
@@ -5,6 +5,7 @@ import hashlib
 import os
 from datetime import datetime
 from app.core.auth import get_current_user, ClerkKeyManager, key_manager
+from app.core.repository import Repository
 from fastapi import HTTPException
 from fastapi.security import HTTPAuthorizationCredentials
 
@@ -65,7 +66,7 @@ class TestGetCurrentUserAxiomKey:
             scheme="Bearer",
             credentials="axm_live_testabcdef1234567890"
         )
-        with patch("app.core.auth.db", None):
+        with patch("app.core.auth.repo", Repository(None, None)):
             with pytest.raises(HTTPException) as exc:
                 await get_current_user(auth=creds)
             assert exc.value.status_code == 503
@@ -76,14 +77,14 @@ class TestGetCurrentUserAxiomKey:
         monkeypatch.setenv("SUPABASE_URL", "https://test.supabase.co")
         monkeypatch.setenv("SUPABASE_SERVICE_KEY", "test-key")
 
-        fake_db = MagicMock()
-        fake_db.table.return_value.select.return_value.eq.return_value.execute.return_value.data = []
+        fake_repo = MagicMock()
+        fake_repo.find_api_key = AsyncMock(return_value=None)
 
         creds = HTTPAuthorizationCredentials(
             scheme="Bearer",
             credentials="axm_live_testabcdef1234567890"
         )
-        with patch("app.core.auth.db", fake_db):
+        with patch("app.core.auth.repo", fake_repo):
             with pytest.raises(HTTPException) as exc:
                 await get_current_user(auth=creds)
             assert exc.value.status_code == 401
@@ -63,4 +63,166 @@ class TestAxiomChunker:
     async def test_async_split_offloads(self):
         result = await chunker.asplit_text("Async test chunk content.")
         assert len(result) == 1
-        assert "Async test" in result[0]
\ No newline at end of file
+        assert "Async test" in result[0]
+
+@pytest.fixture
+def byte_chunker():
+    """Offline chunker: a real tiktoken Encoding where every UTF-8 byte is one token."""
+    import tiktoken
+    encoding = tiktoken.Encoding(
+        name="axiom-test-bytes", pat_str=r"\S+|\s+",
+        mergeable_ranks={bytes([i]): i for i in range(256)}, special_tokens={},
+    )
+    c = AxiomChunker(chunk_size=40, chunk_overlap=10)
+    c.tokenizer = encoding
+    return c
+
+
+class TestTokenNativeSplitting:
+    """Single-encode splitting on token offsets (byte-level tokenizer, no network)."""
+
+    def test_counts_match_tokenizer(self, byte_chunker):
+        text = "\n\n".join(f"Clause {i}. " + "liability " * 9 for i in range(5))
+        for chunk in byte_chunker.split_chunks(text):
+            assert chunk.tokens == len(byte_chunker.tokenizer.encode(chunk.text))
+            assert chunk.tokens <= byte_chunker.chunk_size
+
+    def test_paragraph_boundaries_preferred(self, byte_chunker):
+        text = "First short paragraph.\n\nSecond short paragraph."
+        byte_chunker.chunk_size = 30
+        assert byte_chunker.split_text(text) == ["First short paragraph.", "Second short paragraph."]
+
+    def test_word_level_overlap_carried(self, byte_chunker):
+        words = [f"w{i:02d}" for i in range(30)]
+        chunks = byte_chunker.split_text(" ".join(words))
+        assert len(chunks) > 1
+        for prev, nxt in zip(chunks, chunks[1:]):
+            assert prev.split()[-1] in nxt.split()  # overlap keeps the tail word
+        assert {w for c in chunks for w in c.split()} == set(words)
+
+    def test_unbroken_text_falls_back_to_token_windows(self, byte_chunker):
+        pieces = byte_chunker.split_chunks("x" * 100)
+        assert [c.tokens for c in pieces] == [40, 40, 40]
+
+    def test_encodes_once_per_page(self, byte_chunker):
+        from unittest.mock import patch
+        text = "\n\n".join("row " * 20 for _ in range(10))
+        with patch.object(byte_chunker.tokenizer, "encode", wraps=byte_chunker.tokenizer.encode) as encode:
+            byte_chunker.split_text(text)
+        assert encode.call_count == 1
+
+
+class TestOversizedResplit:
+    """Nothing over the NIM guardrail reaches the embedder, and nothing is dropped."""
+
+    def test_prose_windows_respect_max_tokens(self, byte_chunker):
+        byte_chunker.chunk_size, byte_chunker.max_tokens = 400, 60
+        text = " ".join(f"term{i:03d}" for i in range(40))
+        chunks = byte_chunker.split_chunks(text)
+        assert all(c.tokens <= 60 and "resplit" not in c.meta for c in chunks)
+        assert {w for c in chunks for w in c.text.split()} == set(text.split())
+
+    def test_wide_row_is_resplit_under_repeated_header(self, byte_chunker):
+        byte_chunker.chunk_size, byte_chunker.max_tokens, byte_chunker.resplit_overlap = 1000, 80, 0
+        wide = "| 2025 | " + " ".join(f"note{i:02d}" for i in range(30)) + " |"
+        table = "| Year | Revenue |\n|------|---------|\n| 2024 | $1M |\n" + wide + "\n| 2026 | $3M |"
+        chunks = byte_chunker.split_chunks("Fiscal summary follows.\n\n" + table)
+
+        resplit = [c for c in chunks if c.meta.get("resplit")]
+        assert len(resplit) > 1
+        assert all(c.text.startswith("| Year | Revenue |\n|------|---------|\n") for c in resplit)
+        assert all(c.meta["rows"] == [2, 2] for c in resplit)
+        assert all(c.tokens <= 80 for c in chunks)
+        assert all(f"note{i:02d}" in "".join(c.text for c in resplit) for i in range(30))
+        assert not any(c.meta.get("resplit") for c in chunks if "| 2024 |" in c.text or "| 2026 |" in c.text)
+
+
+class TestTableAwareChunking:
+    """Markdown tables become header-carrying row groups with row-range metadata."""
+
+    TABLE = "| Year | Revenue |\n|------|---------|\n" + "\n".join(f"| 20{i:02d} | ${i}M |" for i in range(12))
+
+    def test_row_groups_carry_header_and_row_ranges(self, byte_chunker):
+        byte_chunker.chunk_size = 80
+        chunks = byte_chunker.split_chunks("Intro paragraph.\n\n" + self.TABLE + "\n\nClosing note.")
+
+        assert chunks[0].text == "Intro paragraph." and chunks[0].meta == {}
+        assert chunks[-1].text == "Closing note."
+        groups = chunks[1:-1]
+        assert len(groups) > 1
+        for group in groups:
+            assert group.text.startswith("| Year | Revenue |\n|------|---------|\n| 20")
+            assert group.meta["table"] == 0 and group.tokens <= 80
+        ranges = [g.meta["rows"] for g in groups]
+        assert ranges[0][0] == 1 and ranges[-1][1] == 12
+        assert all(a[1] + 1 == b[0] for a, b in zip(ranges, ranges[1:]))  # contiguous, no overlap
+
+    def test_rows_never_cut_mid_row(self, byte_chunker):
+        byte_chunker.chunk_size = 80
+        for group in byte_chunker.split_chunks(self.TABLE):
+            assert all(line.startswith("|") and line.endswith("|") for line in group.text.split("\n"))
+
+    def test_table_mode_off_treats_table_as_text(self, byte_chunker):
+        byte_chunker.chunk_size, byte_chunker.table_mode = 80, False
+        assert all(c.meta == {} for c in byte_chunker.split_chunks(self.TABLE))
+
+
+def _legacy_sanitize(text):
+    """The pre-V4.6 four-pass sanitizer, kept as the equivalence reference."""
+    import re
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    text = text.replace('\u200b', '').replace('\ufeff', '')
+    text = re.sub(r'[ \t]+$', '', text, flags=re.MULTILINE)
+    return text.strip()
+
+
+def _filing_page(i):
+    return (
+        f"## Item {i}. Risk Factors  \n\n\n\nRevenue\u200b grew {i}% year over year.\t \n"
+        "| Year | Revenue |\n|------|---------|\n| 2024 | $1.2M   |  \n\ufeffNote\n\n\n\n"
+        + "The company liability is capped at the fees paid. " * 20 + "   \n"
+    )
+
+
+SANITIZER_CORPUS = [
+    "",
+    "   \n\t\n",
+    "a\n \n\nb",                  # whitespace-only line splits a newline run
+    "a\n\n\u200b\n\nb",         # so does a zero-width-only line
+    "a\n\n\n\n\n\nb",
+    "\ufeff# Title\t\n\nBody  \n",
+    "row | a |\t \r\nrow | b |  ",  # CR is not whitespace to strip
+    "trailing tabs\t\t\n\n\n\t\n",
+    "".join(_filing_page(i) for i in range(20)),
+]
+
+
+class TestSanitizer:
+    """Line-sweep sanitizer and its streaming variant versus the legacy four-pass reference."""
+
+    @pytest.mark.parametrize("text", SANITIZER_CORPUS)
+    def test_matches_legacy_output(self, text):
+        from app.core.chunking import sanitize_markdown
+        assert sanitize_markdown(text) == _legacy_sanitize(text)
+
+    def test_blank_lines_with_spaces_are_not_collapsed(self):
+        from app.core.chunking import sanitize_markdown
+        assert sanitize_markdown("a\n \n\nb") == "a\n\n\nb"
+
+    @pytest.mark.parametrize("size", [1, 7, 64])
+    @pytest.mark.parametrize("text", SANITIZER_CORPUS)
+    def test_streaming_equals_whole_document(self, text, size):
+        from app.core.chunking import MarkdownSanitizer, sanitize_markdown
+        sanitizer = MarkdownSanitizer()
+        streamed = "".join(sanitizer.feed(text[i : i + size]) for i in range(0, len(text), size))
+        assert streamed + sanitizer.flush() == sanitize_markdown(text)
+
+    @pytest.mark.slow
+    def test_benchmark_against_legacy(self):
+        """Measurement only (run with -s to see it); wall-clock timings are too noisy to assert on."""
+        import timeit
+        from app.core.chunking import sanitize_markdown
+        doc = "".join(_filing_page(i) for i in range(500))  # ~600 KB, a large filing
+        legacy = min(timeit.repeat(lambda: _legacy_sanitize(doc), number=5, repeat=3))
+        sweep = min(timeit.repeat(lambda: sanitize_markdown(doc), number=5, repeat=3))
+        print(f"\nsanitize {len(doc) / 1e6:.1f} MB x5: legacy {legacy * 1e3:.1f} ms, line sweep {sweep * 1e3:.1f} ms")
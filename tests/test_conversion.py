@@ -0,0 +1,101 @@
+import os
+import time
+import asyncio
+import pytest
+
+from app.core.conversion import ConversionPool
+
+
+def _fake_pages(file_path):
+    return [(1, f"{file_path}@{os.getpid()}"), (2, "tail")]
+
+
+class TestConversionPool:
+    """Unit tests for the Docling process pool wrapper (converter injected)."""
+
+    @pytest.mark.asyncio
+    async def test_disabled_pool_converts_in_thread(self):
+        pool = ConversionPool(workers=0, task=_fake_pages, initializer=None)
+        pool.start()
+        pages = [page async for page in pool.convert("a.pdf")]
+        assert pages == [(1, f"a.pdf@{os.getpid()}"), (2, "tail")]
+
+    @pytest.mark.asyncio
+    async def test_pool_converts_in_worker_process(self):
+        pool = ConversionPool(workers=1, task=_fake_pages, initializer=None)
+        pool.start()
+        try:
+            pages = [page async for page in pool.convert("a.pdf")]
+        finally:
+            pool.shutdown()
+        assert [p for p, _ in pages] == [1, 2]
+        assert pages[0][1].startswith("a.pdf@") and pages[0][1] != f"a.pdf@{os.getpid()}"
+
+
+def _fake_pdf_pages(file_path):
+    """Stands in for Docling: one section per page, tagged with the sub-PDF's page count."""
+    from pypdf import PdfReader
+    total = len(PdfReader(file_path).pages)
+    return [(n, f"{total}:{n}") for n in range(1, total + 1)]
+
+
+def _held_tail_pages(file_path):
+    """The last range (sub-PDF from page 5) waits until the test releases it."""
+    if file_path.endswith(".p5.pdf"):
+        release = os.path.join(os.path.dirname(file_path), "release")
+        deadline = time.time() + 10
+        while not os.path.exists(release) and time.time() < deadline:
+            time.sleep(0.02)
+    return _fake_pdf_pages(file_path)
+
+
+def _write_pdf(path, pages):
+    from pypdf import PdfWriter
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=72, height=72)
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+class TestPageParallelConversion:
+    """Range splitting, in-order stitching and page offsets."""
+
+    def test_small_pdf_is_not_split(self, tmp_path):
+        from app.core.conversion import split_pdf
+        pdf = tmp_path / "doc.pdf"
+        _write_pdf(pdf, 3)
+        assert split_pdf(str(pdf), 5) == [(0, str(pdf))]
+
+    @pytest.mark.asyncio
+    async def test_ranges_are_stitched_with_real_page_numbers(self, tmp_path):
+        pdf = tmp_path / "doc.pdf"
+        _write_pdf(pdf, 5)
+        pool = ConversionPool(workers=2, pages_per_range=2, task=_fake_pdf_pages, initializer=None)
+        pool.start()
+        try:
+            pages = [page async for page in pool.convert(str(pdf))]
+        finally:
+            pool.shutdown()
+
+        assert [p for p, _ in pages] == [1, 2, 3, 4, 5]
+        assert [m for _, m in pages] == ["2:1", "2:2", "2:1", "2:2", "1:1"]
+        assert sorted(os.listdir(tmp_path)) == ["doc.pdf"]  # sub-PDFs cleaned up
+
+    @pytest.mark.asyncio
+    async def test_head_is_yielded_before_tail_is_parsed(self, tmp_path):
+        pdf = tmp_path / "doc.pdf"
+        _write_pdf(pdf, 5)
+        pool = ConversionPool(workers=2, pages_per_range=2, task=_held_tail_pages, initializer=None)
+        pool.start()
+        pages = pool.convert(str(pdf))
+        try:
+            head = await asyncio.wait_for(pages.__anext__(), timeout=5)
+            assert head == (1, "2:1")  # tail range still blocked in its worker
+            (tmp_path / "release").touch()
+            rest = [page async for page in pages]
+        finally:
+            await pages.aclose()
+            pool.shutdown()
+
+        assert [p for p, _ in rest] == [2, 3, 4, 5]
@@ -0,0 +1,225 @@
+import pytest
+import numpy as np
+from types import SimpleNamespace
+import asyncio
+import threading
+from unittest.mock import patch, MagicMock, AsyncMock
+import base64
+from app.core.embeddings import EmbeddingAdapter, to_pgvector
+from app.core.embedding_cache import EmbeddingCache
+
+
+def _fake_response(inputs):
+    """Mimics an OpenAI embeddings response (one-hot at len(text)), in reverse index order."""
+    data = [
+        SimpleNamespace(index=i, embedding=[1.0 if d == len(text) else 0.0 for d in range(1024)])
+        for i, text in enumerate(inputs)
+    ]
+    return SimpleNamespace(data=data[::-1])
+
+
+@pytest.fixture
+def adapter():
+    engine = EmbeddingAdapter()
+    client = MagicMock()
+    client.embeddings.create.side_effect = lambda input, **kwargs: _fake_response(input)
+    with patch.object(EmbeddingAdapter, "_lazy_init", return_value=None), \
+         patch.object(engine, "_client", client):
+        yield engine, client
+
+
+class TestEmbedBatch:
+    """Unit tests for request packing in EmbeddingAdapter.embed_batch (no API keys needed)."""
+
+    def test_empty_input_makes_no_calls(self, adapter):
+        engine, client = adapter
+        assert engine.embed_batch([]) == []
+        client.embeddings.create.assert_not_called()
+
+    def test_packs_by_item_budget(self, adapter):
+        engine, client = adapter
+        with patch.object(EmbeddingAdapter, "max_batch_items", 4):
+            vectors = engine.embed_batch([f"chunk {i}" for i in range(10)])
+        assert len(vectors) == 10
+        assert client.embeddings.create.call_count == 3
+        sizes = [len(c.kwargs["input"]) for c in client.embeddings.create.call_args_list]
+        assert sizes == [4, 4, 2]
+
+    def test_packs_by_token_budget(self, adapter):
+        engine, client = adapter
+        with patch.object(EmbeddingAdapter, "max_batch_tokens", 1000):
+            engine.embed_batch(["a", "b", "c", "d"], token_counts=[400, 400, 400, 400])
+        sizes = [len(c.kwargs["input"]) for c in client.embeddings.create.call_args_list]
+        assert sizes == [2, 2]
+
+    def test_output_order_matches_input(self, adapter):
+        engine, _ = adapter
+        texts = ["a", "bbb", "cc"]
+        vectors = engine.embed_batch(texts)
+        assert [int(np.argmax(v)) for v in vectors] == [1, 3, 2]
+
+    def test_query_input_type_forwarded(self, adapter):
+        engine, client = adapter
+        engine.embed_batch(["what is the cap?"], input_type="query")
+        assert client.embeddings.create.call_args.kwargs["extra_body"]["input_type"] == "query"
+
+    def test_failed_batch_degrades_to_zero_vectors(self, adapter):
+        engine, client = adapter
+        client.embeddings.create.side_effect = RuntimeError("429 Too Many Requests")
+        vectors = engine.embed_batch(["x", "y"])
+        assert len(vectors) == 2
+        assert all(all(x == 0.0 for x in v) for v in vectors)
+
+    def test_repeat_text_served_from_cache(self, adapter):
+        engine, client = adapter
+        first = engine.embed_batch(["same clause", "other clause"])
+        second = engine.embed_batch(["same clause"])
+        assert client.embeddings.create.call_count == 1
+        assert second[0] == pytest.approx(first[0])
+        assert engine._cache.stats()["hits"] == 1
+
+    def test_duplicate_texts_embedded_once(self, adapter):
+        engine, client = adapter
+        vectors = engine.embed_batch(["header", "body", "header"])
+        assert client.embeddings.create.call_args.kwargs["input"] == ["header", "body"]
+        assert np.array_equal(vectors[0], vectors[2])
+
+    def test_failed_vectors_are_not_cached(self, adapter):
+        engine, client = adapter
+        client.embeddings.create.side_effect = RuntimeError("timeout")
+        engine.embed_batch(["flaky"])
+        assert engine._cache.stats()["entries"] == 0
+
+
+@pytest.fixture
+def async_adapter():
+    engine = EmbeddingAdapter()
+    client = MagicMock()
+    client.embeddings.create = AsyncMock(side_effect=lambda input, **kwargs: _fake_response(input))
+
+    def fake_init(self):
+        self._async_gate = asyncio.Semaphore(2)
+
+    with patch.object(EmbeddingAdapter, "_lazy_init_async", fake_init), \
+         patch.object(engine, "_async_client", client):
+        yield engine, client
+
+
+class TestAsyncEmbedBatch:
+    """The native async path shares packing and caching with the sync path."""
+
+    @pytest.mark.asyncio
+    async def test_aembed_batch_packs_and_orders(self, async_adapter):
+        engine, client = async_adapter
+        with patch.object(EmbeddingAdapter, "max_batch_items", 2):
+            vectors = await engine.aembed_batch(["a", "bbb", "cc", "dddd", "e"])
+        assert client.embeddings.create.await_count == 3
+        assert [int(np.argmax(v)) for v in vectors] == [1, 3, 2, 4, 1]
+
+    @pytest.mark.asyncio
+    async def test_aembed_uses_cache(self, async_adapter):
+        engine, client = async_adapter
+        await engine.aembed("liability cap")
+        await engine.aembed("liability cap")
+        assert client.embeddings.create.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_one_failed_batch_does_not_sink_the_rest(self, async_adapter):
+        engine, client = async_adapter
+        calls = {"n": 0}
+
+        async def flaky(input, **kwargs):
+            calls["n"] += 1
+            if calls["n"] == 1:
+                raise RuntimeError("connection reset")
+            return _fake_response(input)
+
+        client.embeddings.create = AsyncMock(side_effect=flaky)
+        with patch.object(EmbeddingAdapter, "max_batch_items", 1):
+            vectors = await engine.aembed_batch(["x", "yy"])
+        assert sum(1 for v in vectors if max(v) == 0.0) == 1
+
+
+class TestFloat32VectorPath:
+    """Vectors stay contiguous float32 arrays and serialize once for pgvector."""
+
+    def test_vectors_are_unit_float32(self, adapter):
+        engine, _ = adapter
+        vector = engine.embed_batch(["abc"])[0]
+        assert isinstance(vector, np.ndarray)
+        assert vector.dtype == np.float32 and vector.shape == (1024,)
+        assert vector.flags["C_CONTIGUOUS"]
+        assert float(np.linalg.norm(vector)) == pytest.approx(1.0)
+
+    def test_base64_payload_decoded(self, adapter):
+        engine, client = adapter
+        raw = np.zeros(1024, dtype=np.float32)
+        raw[7] = 3.0
+        client.embeddings.create.side_effect = lambda input, **kwargs: SimpleNamespace(
+            data=[SimpleNamespace(index=0, embedding=base64.b64encode(raw.tobytes()).decode())]
+        )
+        vector = engine.embed_batch(["b64"])[0]
+        assert client.embeddings.create.call_args.kwargs["encoding_format"] == "base64"
+        assert int(np.argmax(vector)) == 7 and vector[7] == pytest.approx(1.0)
+
+    def test_to_pgvector_text_form(self):
+        literal = to_pgvector(np.array([0.5, -0.25, 0.0], dtype=np.float32))
+        assert literal == "[0.5,-0.25,0]"
+
+    def test_to_pgvector_round_trip_precision(self):
+        vector = np.random.default_rng(7).standard_normal(1024).astype(np.float32)
+        vector /= np.linalg.norm(vector)
+        back = np.array(to_pgvector(vector)[1:-1].split(","), dtype=np.float32)
+        assert np.max(np.abs(back - vector)) < 1e-6
+
+
+class TestEmbeddingCache:
+    """Unit tests for the two-tier content-addressed cache."""
+
+    def test_key_separates_model_config(self):
+        base = EmbeddingCache.make_key("m", "passage", 1024, "text")
+        assert base != EmbeddingCache.make_key("m", "query", 1024, "text")
+        assert base != EmbeddingCache.make_key("m", "passage", 512, "text")
+        assert base != EmbeddingCache.make_key("m2", "passage", 1024, "text")
+        assert base == EmbeddingCache.make_key("m", "passage", 1024, "text")
+
+    def test_lru_eviction_and_counters(self):
+        cache = EmbeddingCache(max_entries=2)
+        cache.put_many({"a": [1.0], "b": [2.0]})
+        cache.get("a")
+        cache.put("c", [3.0])
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        stats = cache.stats()
+        assert stats["entries"] == 2
+        assert stats["hits"] == 2 and stats["misses"] == 1
+
+    def test_disk_tier_survives_new_instance(self, tmp_path):
+        path = str(tmp_path / "embeddings.sqlite")
+        EmbeddingCache(path=path).put("k", [0.5, 0.25])
+        reborn = EmbeddingCache(path=path)
+        vector = reborn.get("k")
+        assert vector is not None
+        assert vector.dtype == np.float32
+        assert vector.tolist() == [0.5, 0.25]
+        assert reborn.stats()["disk_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_async_disk_tier_runs_off_the_event_loop(self, tmp_path):
+        cache = EmbeddingCache(path=str(tmp_path / "embeddings.sqlite"))
+        loop_thread = threading.get_ident()
+        seen = []
+        get_many, put_many = cache.get_many, cache.put_many
+
+        def spy(fn):
+            def wrapper(*args):
+                seen.append(threading.get_ident())
+                return fn(*args)
+            return wrapper
+
+        with patch.object(cache, "get_many", spy(get_many)), patch.object(cache, "put_many", spy(put_many)):
+            await cache.aput_many({"k": np.array([0.5, 0.25], dtype=np.float32)})
+            found = await cache.aget_many(["k", "missing"])
+
+        assert found["k"].tolist() == [0.5, 0.25] and "missing" not in found
+        assert len(seen) == 2 and loop_thread not in seen
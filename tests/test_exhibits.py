@@ -0,0 +1,69 @@
+import pytest
+from unittest.mock import MagicMock, patch
+
+from app.core.exhibits import Exhibit, from_rows, render_all, scores_of
+from app.core.reranker import AxiomReranker
+
+
+ROWS = [
+    {"id": 11, "document_id": 2, "filename": "10k.pdf", "content": "Liability capped.", "similarity": 0.8, "fts_rank": 0.1},
+    {"id": 12, "document_id": 2, "filename": "10k.pdf", "content": "Term is five years.", "similarity": 0.6, "fts_rank": 0.0},
+    {"id": 13, "document_id": 3, "filename": "msa.pdf", "content": "Governing law: Delaware.", "similarity": 0.5, "fts_rank": 0.0},
+]
+
+
+class TestExhibit:
+    """Structured evidence carried through the graph."""
+
+    def test_rows_keep_ids_and_scores(self):
+        first = from_rows(ROWS)[0]
+        assert (first.ref, first.chunk_id, first.document_id, first.similarity) == (1, 11, 2, 0.8)
+        assert not hasattr(first, "__dict__")  # slotted
+
+    def test_render_matches_legacy_envelope(self):
+        assert render_all(from_rows(ROWS[:1])) == [
+            "--- EXHIBIT_START_ID_1 ---\nFILE_SOURCE: 10k.pdf\nDATA_CONTENT: Liability capped.\n--- EXHIBIT_END_ID_1 ---"
+        ]
+
+    def test_strings_pass_through(self):
+        docs = [*from_rows(ROWS[:1]), "--- EXHIBIT_START_ID_CODE ---"]
+        assert render_all(docs)[1] == "--- EXHIBIT_START_ID_CODE ---"
+        assert scores_of(docs) is None
+
+
+class TestRerankExhibits:
+    """Reranker maps scored results back onto the original Exhibits."""
+
+    @pytest.mark.asyncio
+    async def test_scores_attached_and_ids_preserved(self):
+        from langchain_core.documents import Document
+
+        def compress(query, documents):
+            picked = [documents[2], documents[0]]
+            return [Document(page_content=d.page_content, metadata={**d.metadata, "relevance_score": s})
+                    for d, s in zip(picked, (3.5, 1.25))]
+
+        reranker = AxiomReranker()
+        client = MagicMock()
+        client.compress_documents.side_effect = compress
+        with patch.object(AxiomReranker, "_client", client):
+            ranked = await reranker.rerank("law?", from_rows(ROWS), top_k=2)
+
+        assert [ex.chunk_id for ex in ranked] == [13, 11]
+        assert scores_of(ranked) == [3.5, 1.25]
+        sent = client.compress_documents.call_args.kwargs["documents"]
+        assert sent[0].page_content == "Liability capped."  # content, not the envelope
+
+
+class TestMcpVaultSearch:
+    """The MCP gateway renders Exhibits before joining them into its text reply."""
+
+    @pytest.mark.asyncio
+    async def test_search_tool_renders_exhibits(self):
+        from app.mcp.server import search_axiom_vault
+
+        with patch("app.mcp.server.hybrid_search", return_value=from_rows(ROWS[:2])):
+            reply = await search_axiom_vault(query="liability", filenames=["10k.pdf"])
+
+        assert not reply.startswith("Retrieval Error")
+        assert reply == "\n\n".join(render_all(from_rows(ROWS[:2])))
@@ -0,0 +1,164 @@
+import asyncio
+import pytest
+import numpy as np
+from unittest.mock import patch
+
+from app.core.chunking import Chunk
+from app.core.ingestion import StreamingIngestor, _DONE
+
+
+async def _sections(pages):
+    for page_no, markdown in pages:
+        yield page_no, markdown
+
+
+async def _fake_split(text):
+    return [Chunk(part, len(part)) for part in text.split("|") if part]
+
+
+async def _fake_embed(texts, input_type="passage", token_counts=None):
+    return [np.full(4, 0.5, dtype=np.float32) for _ in texts]
+
+
+@pytest.fixture
+def inserted():
+    rows = []
+    with patch("app.core.ingestion.chunker.asplit_chunks", side_effect=_fake_split), \
+         patch("app.core.ingestion.aget_embeddings", side_effect=_fake_embed), \
+         patch("app.core.ingestion.insert_chunk_rows", side_effect=lambda batch: rows.extend(batch)):
+        yield rows
+
+
+class TestStreamingIngestor:
+    """Unit tests for the bounded-queue parse → chunk → embed → insert pipeline."""
+
+    @pytest.mark.asyncio
+    async def test_rows_carry_global_index_and_page(self, inserted):
+        ingestor = StreamingIngestor(document_id=7, user_id="u1", filename="10k.pdf", embed_batch_size=2)
+        stats = await ingestor.run(_sections([(1, "a|b|c"), (2, "d")]))
+
+        assert stats.sections == 2 and stats.chunks == 4 and stats.inserted == 4
+        assert stats.tokens == 4 and stats.pages == 2  # sizes written onto the document row
+        assert [r["metadata"]["index"] for r in inserted] == [0, 1, 2, 3]
+        assert [r["metadata"]["page"] for r in inserted] == [1, 1, 1, 2]
+        assert all(r["document_id"] == 7 and r["user_id"] == "u1" for r in inserted)
+        assert inserted[0]["embedding"].startswith("[0.5,")
+
+    @pytest.mark.asyncio
+    async def test_resplit_windows_are_counted_per_document(self, inserted):
+        async def split(text):
+            return [Chunk("a", 1), Chunk("b", 1, {"table": 0, "rows": [1, 1], "resplit": True}),
+                    Chunk("c", 1, {"table": 0, "rows": [1, 1], "resplit": True})]
+
+        with patch("app.core.ingestion.chunker.asplit_chunks", side_effect=split):
+            stats = await StreamingIngestor(document_id=1, user_id="u", filename="f.pdf").run(_sections([(1, "x")]))
+        assert stats.resplit == 2
+
+    @pytest.mark.asyncio
+    async def test_unpaged_sections_omit_page_metadata(self, inserted):
+        ingestor = StreamingIngestor(document_id=1, user_id="u", filename="f.pdf")
+        stats = await ingestor.run(_sections([(None, "only")]))
+        assert "page" not in inserted[0]["metadata"]
+        assert stats.pages is None  # page_count stays NULL (unknown), not 0
+
+    @pytest.mark.asyncio
+    async def test_backpressure_bounds_parser_lead(self, inserted):
+        """A stalled inserter must stop the parser after a few queued batches."""
+        consumed = []
+        gate = asyncio.Event()
+
+        async def pages():
+            for i in range(50):
+                consumed.append(i)
+                yield i, "x"
+
+        async def stalled_insert_stage(self, queue):
+            await gate.wait()
+            while (await queue.get()) is not _DONE:
+                pass
+
+        with patch.object(StreamingIngestor, "_insert_stage", stalled_insert_stage):
+            ingestor = StreamingIngestor(document_id=1, user_id="u", filename="f.pdf",
+                                         embed_batch_size=1, queue_depth=2)
+            task = asyncio.create_task(ingestor.run(pages()))
+            await asyncio.sleep(0.05)
+            # chunk queue (2) + row queue (2) + one batch held by each stage
+            assert len(consumed) <= 8
+            gate.set()
+            await task
+        assert len(consumed) == 50
+
+    @pytest.mark.asyncio
+    async def test_stage_failure_propagates_and_cancels(self, inserted):
+        async def broken_embed(texts, input_type="passage", token_counts=None):
+            raise RuntimeError("NIM down")
+
+        with patch("app.core.ingestion.aget_embeddings", side_effect=broken_embed):
+            ingestor = StreamingIngestor(document_id=1, user_id="u", filename="f.pdf", embed_batch_size=1)
+            with pytest.raises(RuntimeError, match="NIM down"):
+                await asyncio.wait_for(ingestor.run(_sections([(i, "x") for i in range(20)])), timeout=2)
+        assert inserted == []
+
+
+
+class TestIncrementalIngestion:
+    """Chunk-level diffing against a previous revision of the document."""
+
+    @pytest.mark.asyncio
+    async def test_unchanged_chunks_are_reused_not_reembedded(self, inserted):
+        from app.core.ingestion import content_hash
+        existing = [
+            {"id": 10, "content_hash": content_hash("a"), "metadata": {"index": 0, "source": "f.pdf", "engine": "docling-v2-nim", "page": 1}},
+            {"id": 11, "content_hash": content_hash("b"), "metadata": {"index": 1, "source": "f.pdf", "engine": "docling-v2-nim", "page": 1}},
+            {"id": 12, "content_hash": content_hash("gone"), "metadata": {}},
+            {"id": 13, "content_hash": None, "metadata": {}},
+        ]
+        embedded = []
+
+        async def counting_embed(texts, input_type="passage", token_counts=None):
+            embedded.extend(texts)
+            return await _fake_embed(texts)
+
+        with patch("app.core.ingestion.aget_embeddings", side_effect=counting_embed):
+            ingestor = StreamingIngestor(document_id=1, user_id="u", filename="f.pdf", existing=existing)
+            stats = await ingestor.run(_sections([(1, "new|a"), (2, "b")]))
+
+        assert embedded == ["new"]
+        assert [r["content"] for r in inserted] == ["new"]
+        assert inserted[0]["content_hash"] == content_hash("new")
+        assert stats.reused == 2 and stats.inserted == 1
+        # "a" moved from index 0 to 1, "b" moved to page 2; unchanged metadata is not rewritten
+        assert sorted(chunk_id for chunk_id, _ in ingestor.metadata_updates) == [10, 11]
+        assert sorted(ingestor.vanished_ids) == [12, 13]
+
+
+class TestChunkStore:
+    """document_chunks helpers go through the async repository (no executor threads)."""
+
+    @pytest.mark.asyncio
+    async def test_fingerprints_page_by_id_and_rollback_filters(self):
+        import httpx
+        from app.core.repository import Repository
+        from app.core.ingestion import fetch_chunk_fingerprints, delete_document_chunks
+
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            if request.method == "GET":
+                after = int(request.url.params["id"].split(".")[1])
+                ids = range(after + 1, min(after + 1000, 1500) + 1)
+                return httpx.Response(200, json=[{"id": i, "content_hash": None, "metadata": {}} for i in ids])
+            return httpx.Response(204)
+
+        repo = Repository("https://vault.example.co", "k", transport=httpx.MockTransport(handler))
+        with patch("app.core.ingestion.repo", repo):
+            rows = await fetch_chunk_fingerprints(7)
+            await delete_document_chunks(7, after_id=1500)
+        await repo.aclose()
+
+        assert len(rows) == 1500
+        assert [r.url.params["id"] for r in requests[:2]] == ["gt.0", "gt.1000"]  # keyset, not OFFSET
+        delete = requests[-1]
+        assert delete.method == "DELETE" and delete.url.params["id"] == "gt.1500"
+        assert delete.url.params["document_id"] == "eq.7"
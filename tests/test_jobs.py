@@ -0,0 +1,199 @@
+import time
+import asyncio
+import pytest
+from unittest.mock import MagicMock, patch
+
+from app.core.jobs import SQLiteJobQueue, QUEUED, RUNNING, DONE, FAILED
+from app.core.jobs import JobQueue, LEASE_EXHAUSTED
+from app.worker import run_job, abandon_job, worker_loop, respawn_exited
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return SQLiteJobQueue(str(tmp_path / "jobs.sqlite"), lease_seconds=60, retry_base_seconds=10)
+
+
+def _row(queue, job_id):
+    with queue._connect() as conn:
+        return dict(conn.execute("SELECT * FROM ingest_jobs WHERE id = ?", (job_id,)).fetchone())
+
+
+class TestSQLiteJobQueue:
+    """Unit tests for the local durable ingestion queue."""
+
+    @pytest.mark.asyncio
+    async def test_claim_is_exclusive_and_fifo(self, queue):
+        first = await queue.enqueue("u1", "a.pdf", "/tmp/a.pdf", document_id=1)
+        await queue.enqueue("u1", "b.pdf", "/tmp/b.pdf", document_id=2)
+
+        claimed = await queue.claim("w1")
+        assert claimed.id == first.id and claimed.status == RUNNING and claimed.attempts == 1
+        assert (await queue.claim("w2")).filename == "b.pdf"
+        assert await queue.claim("w3") is None
+
+    @pytest.mark.asyncio
+    async def test_failure_backs_off_then_terminates(self, queue):
+        await queue.enqueue("u1", "a.pdf", "/tmp/a.pdf", max_attempts=2)
+        job = await queue.claim("w1")
+        assert await queue.fail(job, "NIM down") is False
+
+        row = _row(queue, job.id)
+        assert row["status"] == QUEUED and row["stage"] == "retry_scheduled"
+        assert row["run_after"] >= time.time() + 9  # first backoff = base
+        assert await queue.claim("w1") is None  # not due yet
+
+        with queue._connect() as conn:
+            conn.execute("UPDATE ingest_jobs SET run_after = 0")
+        job = await queue.claim("w1")
+        assert job.attempts == 2
+        assert await queue.fail(job, "NIM down") is True
+        assert _row(queue, job.id)["status"] == FAILED
+
+    def test_backoff_is_exponential_and_capped(self, queue):
+        assert [queue.backoff(n) for n in (1, 2, 3)] == [10, 20, 40]
+        assert queue.backoff(20) == queue.retry_max_seconds
+
+    @pytest.mark.asyncio
+    async def test_expired_lease_is_reclaimed(self, queue):
+        await queue.enqueue("u1", "a.pdf", "/tmp/a.pdf")
+        job = await queue.claim("w1")
+        with queue._connect() as conn:
+            conn.execute("UPDATE ingest_jobs SET lease_until = 0 WHERE id = ?", (job.id,))
+        reclaimed = await queue.claim("w2")
+        assert reclaimed.id == job.id and reclaimed.attempts == 2
+
+    @pytest.mark.asyncio
+    async def test_expired_lease_on_last_attempt_fails_terminally(self, queue):
+        """A worker killed mid-run (OOM, SIGKILL) must not get a poison PDF re-leased forever."""
+        await queue.enqueue("u1", "a.pdf", "/tmp/a.pdf", max_attempts=1)
+        job = await queue.claim("w1")
+        with queue._connect() as conn:
+            conn.execute("UPDATE ingest_jobs SET lease_until = 0 WHERE id = ?", (job.id,))
+
+        orphan = await queue.claim("w2")
+        assert orphan.id == job.id and orphan.status == FAILED and orphan.error == LEASE_EXHAUSTED
+        row = _row(queue, job.id)
+        assert row["status"] == FAILED and row["attempts"] == 1 and row["worker_id"] == "w1"
+        assert await queue.claim("w3") is None
+
+    def test_contract_is_abstract(self):
+        with pytest.raises(TypeError):
+            JobQueue()
+
+    @pytest.mark.asyncio
+    async def test_report_exposes_stage_progress(self, queue):
+        await queue.enqueue("u1", "a.pdf", "/tmp/a.pdf")
+        job = await queue.claim("w1")
+        await queue.report(job.id, "streaming", {"chunks": 40, "inserted": 20})
+
+        view = (await queue.latest("u1", "a.pdf")).public_view()
+        assert view["stage"] == "streaming" and view["progress"] == {"chunks": 40, "inserted": 20}
+        assert "file_path" not in view
+        assert await queue.latest("u2", "a.pdf") is None
+
+
+class TestWorker:
+    """run_job wiring between the queue and the ingestion pipeline."""
+
+    @pytest.mark.asyncio
+    async def test_success_completes_and_discards_upload(self, queue, tmp_path):
+        upload = tmp_path / "a.pdf"
+        upload.write_bytes(b"%PDF")
+        await queue.enqueue("u1", "a.pdf", str(upload), document_id=3)
+        job = await queue.claim("w1")
+
+        async def fake_process(file_path, filename, user_id, document_id=None, on_progress=None):
+            await on_progress("streaming", {"inserted": 5})
+
+        with patch("app.api.ingest.process_document", side_effect=fake_process):
+            await run_job(queue, job)
+
+        assert _row(queue, job.id)["status"] == DONE
+        assert not upload.exists()
+
+    @pytest.mark.asyncio
+    async def test_retryable_failure_keeps_upload(self, queue, tmp_path):
+        upload = tmp_path / "a.pdf"
+        upload.write_bytes(b"%PDF")
+        await queue.enqueue("u1", "a.pdf", str(upload), document_id=3)
+        job = await queue.claim("w1")
+
+        with patch("app.api.ingest.process_document", side_effect=RuntimeError("boom")), \
+             patch("app.api.ingest.mark_document_error") as mark_error:
+            await run_job(queue, job)
+
+        assert _row(queue, job.id)["status"] == QUEUED
+        assert upload.exists()
+        mark_error.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_terminal_failure_marks_document_error(self, queue, tmp_path):
+        upload = tmp_path / "a.pdf"
+        upload.write_bytes(b"%PDF")
+        await queue.enqueue("u1", "a.pdf", str(upload), document_id=3, max_attempts=1)
+        job = await queue.claim("w1")
+
+        with patch("app.api.ingest.process_document", side_effect=RuntimeError("boom")), \
+             patch("app.api.ingest.mark_document_error") as mark_error:
+            await run_job(queue, job)
+
+        assert _row(queue, job.id)["status"] == FAILED
+        assert not upload.exists()
+        mark_error.assert_called_once_with(3, "a.pdf", "u1")
+
+    @pytest.mark.asyncio
+    async def test_abandoned_orphan_marks_document_error(self, queue, tmp_path):
+        upload = tmp_path / "a.pdf"
+        upload.write_bytes(b"%PDF")
+        await queue.enqueue("u1", "a.pdf", str(upload), document_id=3, max_attempts=1)
+        job = await queue.claim("w1")
+        with queue._connect() as conn:
+            conn.execute("UPDATE ingest_jobs SET lease_until = 0 WHERE id = ?", (job.id,))
+
+        with patch("app.api.ingest.mark_document_error") as mark_error:
+            await abandon_job(await queue.claim("w2"))
+
+        assert not upload.exists()
+        mark_error.assert_called_once_with(3, "a.pdf", "u1")
+
+    @pytest.mark.asyncio
+    async def test_unrecordable_failure_leaves_job_to_lease_expiry(self, queue, tmp_path):
+        upload = tmp_path / "a.pdf"
+        upload.write_bytes(b"%PDF")
+        await queue.enqueue("u1", "a.pdf", str(upload), document_id=3)
+        job = await queue.claim("w1")
+
+        with patch("app.api.ingest.process_document", side_effect=RuntimeError("boom")), \
+             patch.object(queue, "fail", side_effect=ConnectionError("db down")):
+            await run_job(queue, job)
+
+        assert _row(queue, job.id)["status"] == RUNNING
+        assert upload.exists()
+
+    @pytest.mark.asyncio
+    async def test_loop_survives_transient_queue_errors(self, queue):
+        stop = asyncio.Event()
+        calls = []
+
+        async def flaky_claim(worker_id):
+            calls.append(worker_id)
+            if len(calls) == 1:
+                raise ConnectionError("db down")
+            stop.set()
+            return None
+
+        with patch("app.worker.get_job_queue", return_value=queue), \
+             patch.object(queue, "claim", side_effect=flaky_claim), \
+             patch("app.core.conversion.conversion_pool.start"), \
+             patch("app.core.conversion.conversion_pool.shutdown"):
+            await asyncio.wait_for(worker_loop("w1", poll_interval=0.01, stop=stop), timeout=5)
+
+        assert len(calls) == 2
+
+    def test_exited_workers_are_respawned_in_place(self):
+        alive, dead = MagicMock(exitcode=None), MagicMock(exitcode=-9)
+        processes = [alive, dead]
+        with patch("app.worker._spawn", return_value="fresh") as spawn:
+            assert respawn_exited(processes) == 1
+        spawn.assert_called_once_with(1)
+        assert processes == [alive, "fresh"]
@@ -23,4 +23,65 @@ class TestContextMonitor:
         assert len(result) < len("\n\n".join(chunks))
 
     def test_token_count_zero_for_empty(self):
-        assert monitor.count_tokens("") == 0
\ No newline at end of file
+        assert monitor.count_tokens("") == 0
+
+class TestTokenCountCache:
+    """LRU of token counts seeded from ingest-time metadata."""
+
+    def test_repeat_counts_hit_cache(self):
+        monitor.count_tokens("Revenue was $1.2M.")
+        monitor.count_tokens("Revenue was $1.2M.")
+        assert monitor.encoder.encode.call_count == 1
+
+    def test_guard_context_uses_seeded_counts(self):
+        monitor.remember("seeded exhibit", 7)
+        monitor.guard_context(["seeded exhibit"] * 3)
+        monitor.encoder.encode.assert_not_called()
+
+    def test_lru_is_bounded(self):
+        with patch.object(ContextMonitor, "CACHE_SIZE", 2):
+            for text in ("a", "b", "c"):
+                monitor.count_tokens(text)
+            monitor.encoder.encode.reset_mock()
+            monitor.count_tokens("a")  # evicted
+            monitor.count_tokens("c")  # still cached
+        assert monitor.encoder.encode.call_count == 1
+
+    def test_exhibit_render_seeds_monitor(self):
+        from app.core.exhibits import from_rows, render_all
+        exhibits = render_all(from_rows([
+            {"filename": "10k.pdf", "content": "Liability capped.", "token_count": 42},
+            {"filename": "10k.pdf", "content": "Unmeasured legacy chunk."},
+        ]))
+        assert exhibits[0].startswith("--- EXHIBIT_START_ID_1 ---\nFILE_SOURCE: 10k.pdf\nDATA_CONTENT: Liability capped.")
+        monitor.encoder.encode.reset_mock()
+        assert monitor.count_tokens(exhibits[0]) == 42 + 100  # stored count + frame (mock encoder: 100)
+        monitor.encoder.encode.assert_not_called()
+
+
+class TestPackContext:
+    """Budget-aware packing against an LLMConfig window."""
+
+    @staticmethod
+    def _model(window, max_tokens=10):
+        from app.engine.models import LLMConfig
+        return LLMConfig(name="test-model", context_window=window, max_tokens=max_tokens)
+
+    def test_budget_reserves_output_and_prompt(self):
+        packed = monitor.pack_context([], self._model(1000, max_tokens=200), prompt_tokens=300)
+        assert packed.budget == 500 and packed.text == ""
+
+    def test_oversized_item_is_skipped_not_terminal(self):
+        for text, tokens in (("a", 10), ("huge", 500), ("b", 10)):
+            monitor.remember(text, tokens)
+        packed = monitor.pack_context(["a", "huge", "b"], self._model(60))
+        assert packed.text == "a\n\nb"
+        assert packed.included == [0, 2] and packed.dropped == [1]
+        assert packed.tokens == 28
+
+    def test_scores_decide_admission_but_order_is_kept(self):
+        for text in ("low", "high", "mid"):
+            monitor.remember(text, 16)
+        packed = monitor.pack_context(["low", "high", "mid"], self._model(50), scores=[0.1, 0.9, 0.5])
+        assert packed.text == "high\n\nmid"
+        assert packed.dropped == [0]
@@ -0,0 +1,102 @@
+import json
+import httpx
+import pytest
+
+from app.core.repository import Repository, RepositoryError
+
+
+def _repo(handler):
+    return Repository("https://vault.example.co", "service-key", transport=httpx.MockTransport(handler))
+
+
+class TestRepository:
+    """PostgREST request shapes of the async vault repository."""
+
+    def test_missing_credentials_is_falsy(self):
+        assert not Repository(None, None)
+        assert Repository("https://vault.example.co", "k")
+
+    @pytest.mark.asyncio
+    async def test_select_builds_filters(self):
+        seen = {}
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen["url"] = request.url
+            seen["key"] = request.headers["apikey"]
+            return httpx.Response(200, json=[{"id": 1, "filename": 'a, "b".pdf'}])
+
+        repo = _repo(handler)
+        rows = await repo.documents_named("u1", ['a, "b".pdf', "c.pdf"])
+        await repo.aclose()
+
+        params = dict(seen["url"].params)
+        assert seen["url"].path == "/rest/v1/documents"
+        assert params["select"] == "id, filename" and params["user_id"] == "eq.u1"
+        assert params["filename"] == 'in.("a, \\"b\\".pdf","c.pdf")'
+        assert seen["key"] == "service-key" and rows[0]["id"] == 1
+
+    @pytest.mark.asyncio
+    async def test_count_reads_content_range(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            assert request.method == "HEAD" and request.headers["prefer"] == "count=exact"
+            return httpx.Response(200, headers={"content-range": "*/42"})
+
+        repo = _repo(handler)
+        assert await repo.count_chunks(document_id=7) == 42
+        await repo.aclose()
+
+    @pytest.mark.asyncio
+    async def test_rpc_posts_arguments(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            assert request.url.path == "/rest/v1/rpc/match_multi_document_chunks"
+            body = json.loads(request.content)
+            assert body["target_document_ids"] == [1, 2] and body["match_limit"] == 5
+            return httpx.Response(200, json=[])
+
+        repo = _repo(handler)
+        assert await repo.match_multi_document_chunks("[0.1]", 5, (1, 2), "u1") == []
+        await repo.aclose()
+
+    @pytest.mark.asyncio
+    async def test_http_error_raises(self):
+        repo = _repo(lambda request: httpx.Response(401, text="JWT expired"))
+        with pytest.raises(RepositoryError) as err:
+            await repo.latest_document("u1", "a.pdf")
+        assert err.value.status_code == 401
+        await repo.aclose()
+
+    def test_pool_from_a_finished_loop_is_dropped(self):
+        import asyncio
+        repo = _repo(lambda request: httpx.Response(200, json=[]))
+
+        async def touch():
+            await repo.select("documents", "id")
+            return repo._client
+
+        def run_on_fresh_loop(coro):
+            loop = asyncio.new_event_loop()
+            try:
+                return loop.run_until_complete(coro)
+            finally:
+                loop.close()
+
+        first = run_on_fresh_loop(touch())
+        second = run_on_fresh_loop(touch())
+        assert first is not second and repo._client is second
+        run_on_fresh_loop(repo.aclose())
+
+    @pytest.mark.asyncio
+    async def test_acquire_document_is_a_conditional_update(self):
+        seen = {}
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen["request"] = request
+            return httpx.Response(200, json=[])
+
+        repo = _repo(handler)
+        assert await repo.acquire_document(9, {"status": "processing"}) is False
+        await repo.aclose()
+
+        request = seen["request"]
+        assert request.method == "PATCH" and request.headers["prefer"] == "return=representation"
+        assert dict(request.url.params) == {"id": "eq.9", "status": "neq.processing"}
@@ -0,0 +1,93 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.core.retrieval_cache import RetrievalCache, retrieval_cache
+from app.core.retriever import hybrid_search
+
+ROW = {"id": 1, "document_id": 1, "filename": "10k.pdf", "content": "Liability capped.", "similarity": 0.9, "fts_rank": 0.2}
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    retrieval_cache.clear()
+    yield
+    retrieval_cache.clear()
+
+
+def _repo(version):
+    repo = MagicMock()
+    repo.corpus_version = AsyncMock(side_effect=lambda user_id: version["value"])
+    repo.hybrid_vault_search = AsyncMock(return_value=[ROW])
+    return repo
+
+
+class TestRetrievalCache:
+    """Keying and version checks of the query-result cache."""
+
+    def test_key_normalizes_query_and_filenames(self):
+        a = RetrievalCache.make_key("u1", "  What is  the CAP? ", ["b.pdf", "a.pdf"], 20)
+        b = RetrievalCache.make_key("u1", "what is the cap?", ["a.pdf", "b.pdf"], 20)
+        assert a == b
+        assert RetrievalCache.make_key("u1", "q", "vault", 20) == RetrievalCache.make_key("u1", "q", None, 20)
+        assert RetrievalCache.make_key("u2", "q", None, 20) != RetrievalCache.make_key("u1", "q", None, 20)
+
+    def test_version_mismatch_is_a_miss(self):
+        cache = RetrievalCache()
+        key = cache.make_key("u1", "q", None, 20)
+        cache.put(key, 3, ["hit"])
+        assert cache.get(key, 3) == ["hit"]
+        assert cache.get(key, 4) is None
+        assert cache.get(key, 3) is None  # stale entry was evicted
+
+    def test_lru_is_bounded(self):
+        cache = RetrievalCache(max_entries=1)
+        cache.put(("u1", "a", (), 20), 0, [])
+        cache.put(("u1", "b", (), 20), 0, [])
+        assert cache.get(("u1", "a", (), 20), 0) is None
+
+
+class TestCachedHybridSearch:
+    """hybrid_search skips NIM and Postgres while the corpus version holds."""
+
+    @pytest.mark.asyncio
+    async def test_repeat_query_served_until_corpus_changes(self):
+        version = {"value": 7}
+        repo = _repo(version)
+        embed = AsyncMock(return_value=[0.1] * 4)
+        with patch("app.core.retriever.repo", repo), patch("app.core.retriever.aget_embedding", embed):
+            first = await hybrid_search("What is the cap?", "u1")
+            second = await hybrid_search("what is the  cap?", "u1")
+            assert [ex.chunk_id for ex in second] == [ex.chunk_id for ex in first] == [1]
+            assert embed.await_count == 1 and repo.hybrid_vault_search.await_count == 1
+
+            version["value"] = 8  # e.g. a new upload was indexed
+            await hybrid_search("What is the cap?", "u1")
+            assert embed.await_count == 2 and repo.hybrid_vault_search.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_degraded_embedding_is_not_cached(self):
+        repo = _repo({"value": 1})
+        embed = AsyncMock(return_value=[0.0] * 4)
+        with patch("app.core.retriever.repo", repo), patch("app.core.retriever.aget_embedding", embed):
+            await hybrid_search("q", "u1")
+            await hybrid_search("q", "u1")
+        assert embed.await_count == 2
+
+
+class TestTargetedSearch:
+    """Targeted-document mode issues one RPC regardless of file count."""
+
+    @pytest.mark.asyncio
+    async def test_many_documents_single_rpc(self):
+        repo = _repo({"value": 1})
+        docs = [{"id": i, "filename": f"f{i}.pdf"} for i in range(1, 21)]
+        repo.documents_named = AsyncMock(return_value=docs)
+        repo.match_multi_document_chunks = AsyncMock(return_value=[{**ROW, "id": 9, "document_id": 4, "filename": "f4.pdf"}])
+        embed = AsyncMock(return_value=[0.1] * 4)
+        with patch("app.core.retriever.repo", repo), patch("app.core.retriever.aget_embedding", embed):
+            exhibits = await hybrid_search("q", "u1", filename=[d["filename"] for d in docs], limit=40)
+
+        repo.match_multi_document_chunks.assert_awaited_once()
+        _, match_limit, document_ids, _ = repo.match_multi_document_chunks.call_args.args
+        assert document_ids == list(range(1, 21)) and match_limit == 2
+        assert (exhibits[0].chunk_id, exhibits[0].document_id, exhibits[0].filename) == (9, 4, "f4.pdf")
@@ -0,0 +1,107 @@
+import json
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+
+from app.core.repository import RepositoryError
+from app.core.write_behind import WriteBehindBuffer
+
+
+def _buffer(sink, tmp_path, **kwargs):
+    return WriteBehindBuffer(sink, spill_path=str(tmp_path / "spill.jsonl"), **kwargs)
+
+
+class TestWriteBehindBuffer:
+    """Coalescing, bounding and spill/replay of deferred inserts."""
+
+    @pytest.mark.asyncio
+    async def test_rows_coalesce_into_bulk_inserts(self, tmp_path):
+        sink = AsyncMock()
+        buffer = _buffer(sink, tmp_path, flush_seconds=60)
+        for i in range(3):
+            buffer.add("chat_messages", {"role": "user", "content": f"q{i}"})
+        buffer.add("audit_logs", {"question": "q0"})
+        await buffer.aclose()
+
+        calls = {c.args[0]: c.args[1] for c in sink.await_args_list}
+        assert sink.await_count == 2
+        assert [r["content"] for r in calls["chat_messages"]] == ["q0", "q1", "q2"]
+        assert buffer.flushed == 4 and len(buffer) == 0
+
+    @pytest.mark.asyncio
+    async def test_batch_size_triggers_flush(self, tmp_path):
+        sink = AsyncMock()
+        buffer = _buffer(sink, tmp_path, batch_rows=2, flush_seconds=60)
+        buffer.add("audit_logs", {"question": "a"})
+        buffer.add("audit_logs", {"question": "b"})
+        await asyncio.sleep(0.05)
+        sink.assert_awaited_once()
+        await buffer.aclose()
+
+    @pytest.mark.asyncio
+    async def test_time_triggers_flush(self, tmp_path):
+        sink = AsyncMock()
+        buffer = _buffer(sink, tmp_path, flush_seconds=0.02)
+        buffer.add("audit_logs", {"question": "a"})
+        await asyncio.sleep(0.1)
+        sink.assert_awaited_once()
+        await buffer.aclose()
+
+    @pytest.mark.asyncio
+    async def test_unreachable_db_spills_then_replays(self, tmp_path):
+        sink = AsyncMock(side_effect=ConnectionError("supabase down"))
+        buffer = _buffer(sink, tmp_path, flush_seconds=60, replay_seconds=0)
+        buffer.add("chat_messages", {"content": "kept"})
+        await buffer.flush()
+
+        spilled = [json.loads(line) for line in (tmp_path / "spill.jsonl").read_text().splitlines()]
+        assert spilled == [{"table": "chat_messages", "row": {"content": "kept"}}]
+
+        sink.side_effect = None
+        await buffer.flush()  # nothing buffered, DB back: replay
+        sink.assert_awaited_with("chat_messages", [{"content": "kept"}])
+        assert not (tmp_path / "spill.jsonl").exists()
+        await buffer.aclose()
+
+    @pytest.mark.asyncio
+    async def test_buffer_is_bounded(self, tmp_path):
+        sink = AsyncMock()
+        buffer = _buffer(sink, tmp_path, max_rows=2, batch_rows=10, flush_seconds=60, replay_seconds=0)
+        for i in range(3):
+            buffer.add("audit_logs", {"question": str(i)})
+        assert len(buffer) == 2
+        assert not (tmp_path / "spill.jsonl").exists()  # overflow is written by the flusher, not by add()
+
+        await buffer.aclose()
+        written = [row["question"] for c in sink.await_args_list for row in c.args[1]]
+        assert sorted(written) == ["0", "1", "2"] and buffer.spilled == 1
+
+    @pytest.mark.asyncio
+    async def test_rejected_row_is_isolated_and_dropped(self, tmp_path):
+        """A permanent 4xx (FK violation after a delete) must not hold valid rows hostage."""
+        written = []
+
+        async def sink(table, rows):
+            if any(row["document_id"] == 404 for row in rows):
+                raise RepositoryError(409, "violates foreign key constraint")
+            written.extend(rows)
+
+        buffer = _buffer(sink, tmp_path, flush_seconds=60)
+        for doc_id in (1, 2, 404, 3, 4):
+            buffer.add("chat_messages", {"document_id": doc_id})
+        await buffer.aclose()
+
+        assert sorted(row["document_id"] for row in written) == [1, 2, 3, 4]
+        assert buffer.dropped == 1 and buffer.spilled == 0
+        assert not (tmp_path / "spill.jsonl").exists()
+
+    @pytest.mark.asyncio
+    async def test_throttling_is_transient(self, tmp_path):
+        sink = AsyncMock(side_effect=RepositoryError(429, "rate limited"))
+        buffer = _buffer(sink, tmp_path, flush_seconds=60)
+        buffer.add("audit_logs", {"question": "a"})
+        buffer.add("audit_logs", {"question": "b"})
+        await buffer.aclose()
+
+        assert sink.await_count == 1  # no bisection on a retryable status
+        assert buffer.spilled == 2 and buffer.dropped == 0